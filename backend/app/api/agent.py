@@ -55,7 +55,11 @@ async def run_agent(request: AgentRunRequest):
 
             async for event in runner.run(
                 query=request.query,
-                max_turns=request.max_turns
+                max_turns=request.max_turns,
+                timeout=request.timeout,
+                tool_timeouts=request.tool_timeouts,
+                reuse_sandbox=request.reuse_sandbox,
+                reset_sandbox=request.reset_sandbox
             ):
                 yield event
         except Exception as e:
@@ -81,6 +85,7 @@ async def run_agent_with_files(
     query: str = Form(...),
     model: Optional[str] = Form(None),
     max_turns: int = Form(10),
+    timeout: int = Form(300),
     files: List[UploadFile] = File(...)
 ):
     """
@@ -134,7 +139,8 @@ async def run_agent_with_files(
             async for event in runner.run(
                 query=query,
                 max_turns=max_turns,
-                uploaded_files=uploaded_files
+                uploaded_files=uploaded_files,
+                timeout=timeout
             ):
                 yield event
         except Exception as e:
@@ -7,19 +7,18 @@ from datetime import datetime
 
 from models.schemas import (
     ProjectOpenRequest, ProjectTreeNode, ProjectChanges,
-    FileChange, ApplyChangesRequest, RecentProject, ProjectState
+    FileChange, ApplyChangesRequest, RecentProject, ProjectState, ProjectSyncRequest
 )
 from app.config import get_config, save_config
 from core.project_utils import (
     validate_project_path,
-    get_project_size,
-    load_gitignore_patterns,
-    detect_project_type,
-    MAX_PROJECT_SIZE_MB,
-    MAX_FILES
+    load_ignore_matcher,
+    detect_project_type
 )
+from core.project_manifest import get_project_manifest, manifest_totals, ProjectTooLarge
 from core.project_manager import ProjectManager
 from core.sandbox import create_sandbox
+from core.sandbox_sessions import get_session_manager
 
 router = APIRouter(prefix="/api/project", tags=["project"])
 
@@ -44,25 +43,18 @@ async def open_project(request: ProjectOpenRequest):
 
     project_path = Path(request.project_path).resolve()
 
-    # Load ignore patterns
-    ignore_patterns = load_gitignore_patterns(project_path)
+    # Load ignore rules
+    ignore_matcher = load_ignore_matcher(project_path)
 
-    # Check size
-    size_bytes, file_count = get_project_size(project_path, ignore_patterns)
+    # Check size while building the manifest the first sync and change
+    # detection reuse (the walk stops early once a limit is passed)
+    try:
+        manifest = await get_project_manifest(project_path, ignore_matcher, check_limits=True)
+    except ProjectTooLarge as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    size_bytes, file_count = manifest_totals(manifest)
     size_mb = size_bytes / (1024 * 1024)
 
-    if size_mb > MAX_PROJECT_SIZE_MB:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Project too large: {size_mb:.1f}MB (max {MAX_PROJECT_SIZE_MB}MB)"
-        )
-
-    if file_count > MAX_FILES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Too many files: {file_count} (max {MAX_FILES})"
-        )
-
     # Detect type
     project_type = detect_project_type(project_path)
 
@@ -88,6 +80,11 @@ async def open_project(request: ProjectOpenRequest):
     config.recent_projects.insert(0, recent)
     config.recent_projects = config.recent_projects[:10]
 
+    # Warm sandboxes of the previous project won't be picked up again
+    previous = config.current_project
+    if previous and previous.project_path != str(project_path):
+        await get_session_manager().close(previous.project_path)
+
     # Set current project
     config.current_project = ProjectState(
         project_path=str(project_path),
@@ -125,6 +122,8 @@ async def close_project():
 
     config = get_config()
     if config:
+        if config.current_project:
+            await get_session_manager().close(config.current_project.project_path)
         config.current_project = None
         save_config(config)
 
@@ -148,8 +147,8 @@ async def get_project_tree():
         raise HTTPException(status_code=500, detail=f"Failed to build file tree: {str(e)}")
 
 @router.get("/file")
-async def get_project_file(path: str):
-    """Read a file from the sandbox project."""
+async def get_project_file(path: str, offset: int = 0, length: Optional[int] = None):
+    """Read a file from the sandbox project (optionally a byte range of it)."""
     global _active_project_manager
 
     if not _active_project_manager:
@@ -164,7 +163,13 @@ async def get_project_file(path: str):
 
     try:
         full_path = f"/workspace/{path}"
-        content = await _active_project_manager.sandbox.read_file(full_path)
+        sandbox = _active_project_manager.sandbox
+        if offset or length is not None:
+            # Ranged reads let the UI page through large files
+            data = await sandbox.read_file_range(full_path, offset, length)
+            content = data.decode('utf-8', errors='replace')
+            return {"path": path, "content": content, "offset": offset, "length": len(data)}
+        content = await sandbox.read_file(full_path)
         return {"path": path, "content": content}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
@@ -193,7 +198,8 @@ async def get_project_changes():
         total_files=len(changes),
         created_count=len([c for c in changes if c.type == 'created']),
         modified_count=len([c for c in changes if c.type == 'modified']),
-        deleted_count=len([c for c in changes if c.type == 'deleted'])
+        deleted_count=len([c for c in changes if c.type == 'deleted']),
+        renamed_count=len([c for c in changes if c.type == 'renamed'])
     )
 
 @router.post("/apply-changes")
@@ -248,3 +254,28 @@ async def apply_project_changes(request: ApplyChangesRequest):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to apply changes: {str(e)}")
+
+@router.post("/sync")
+async def sync_project(request: ProjectSyncRequest):
+    """Push local edits into the active sandbox (only changed files are transferred)."""
+    global _active_project_manager
+
+    if not _active_project_manager:
+        raise HTTPException(
+            status_code=400,
+            detail="No active project in sandbox. Run an agent task first to sync the project."
+        )
+
+    if request.reset and _active_project_manager.run_active:
+        # A reset restarts the shell and rewrites the workspace under the agent
+        raise HTTPException(
+            status_code=409,
+            detail="An agent run is using the sandbox. Sync without reset, or wait for the run to finish."
+        )
+
+    try:
+        result = await _active_project_manager.sync(reset=request.reset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to sync project: {str(e)}")
+
+    return {"success": True, **result}
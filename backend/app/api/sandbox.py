@@ -0,0 +1,34 @@
+"""Sandbox infrastructure endpoints."""
+
+from fastapi import APIRouter
+
+from core.docker_executor import get_docker_executor
+from core.docker_hosts import get_docker_hosts
+from core.hash_index import get_hash_index
+from core.image_cache import get_image_cache
+from core.sandbox_pool import get_sandbox_pool
+from core.sandbox_reaper import get_sandbox_reaper
+from core.sandbox_scheduler import get_resource_scheduler
+from core.sandbox_sessions import get_session_manager
+
+router = APIRouter(prefix="/api/sandbox", tags=["sandbox"])
+
+
+@router.get("/stats")
+async def get_sandbox_stats():
+    """
+    Get warm pool occupancy, Docker executor load, image cache usage, parked
+    sessions, teardown/leak counts, resource budgets with per-sandbox usage,
+    Docker endpoint health and the local file hash index. ``pool`` and ``resources`` describe the local
+    daemon; with AGENTDOCKS_DOCKER_HOSTS set, each endpoint reports its own.
+    """
+    return {
+        "pool": get_sandbox_pool().stats(),
+        "docker_executor": get_docker_executor().stats(),
+        "image_cache": await get_image_cache().stats(),
+        "sessions": get_session_manager().stats(),
+        "reaper": get_sandbox_reaper().stats(),
+        "resources": get_resource_scheduler().stats(),
+        "docker_hosts": get_docker_hosts().stats(),
+        "hash_index": get_hash_index().stats()
+    }
@@ -1,7 +1,11 @@
 import logging
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import health, config, agent, verify, runs, project, multi_agent
+from app.api import health, config, agent, verify, runs, project, multi_agent, sandbox
+from core.docker_hosts import get_docker_hosts
+from core.docker_executor import get_docker_executor
+from core.sandbox_sessions import get_session_manager
+from core.sandbox_reaper import get_sandbox_reaper
 
 # Configure logging
 logging.basicConfig(
@@ -40,6 +44,22 @@ async def csrf_middleware(request: Request, call_next):
 
     return response
 
+# Sandbox warm pool lifecycle
+@app.on_event("startup")
+async def start_sandbox_pool():
+    """Pre-start idle sandbox containers on each Docker endpoint (no-op unless configured) and sweep leaked ones."""
+    await get_docker_hosts().start()
+    await get_sandbox_reaper().start()
+
+@app.on_event("shutdown")
+async def stop_sandbox_pool():
+    """Remove idle pooled containers and parked session sandboxes."""
+    await get_session_manager().close()
+    # Let background teardowns finish before the Docker executor goes away
+    await get_sandbox_reaper().stop()
+    await get_docker_hosts().stop()
+    get_docker_executor().shutdown()
+
 # Include routers
 app.include_router(health.router)
 app.include_router(config.router)
@@ -48,3 +68,4 @@ app.include_router(runs.router)
 app.include_router(agent.router)
 app.include_router(project.router)
 app.include_router(multi_agent.router)
+app.include_router(sandbox.router)
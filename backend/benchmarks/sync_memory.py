@@ -0,0 +1,118 @@
+"""
+Peak RSS during Docker project sync: buffered vs streaming tar.
+
+Generates a synthetic project, then packs it once the old way (whole tar in
+an io.BytesIO plus getvalue()) and once with the streaming generator used by
+DockerSandbox.copy_directory. Each mode runs in a fresh subprocess so
+ru_maxrss reflects only that mode.
+
+Usage (from backend/):
+    python -m benchmarks.sync_memory --size-mb 200
+    python -m benchmarks.sync_memory --size-mb 200 --docker   # also put_archive into a container
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.project_utils import iter_project_files, DEFAULT_IGNORE_PATTERNS  # noqa: E402
+from core.sandbox import _iter_tar_stream  # noqa: E402
+
+
+def make_project(root: Path, size_mb: int, file_mb: int = 4) -> None:
+    """Write size_mb of random data split into file_mb files."""
+    chunk = os.urandom(1024 * 1024)
+    for i in range(max(size_mb // file_mb, 1)):
+        sub = root / f"pkg{i % 10}"
+        sub.mkdir(exist_ok=True)
+        with open(sub / f"blob{i}.bin", 'wb') as f:
+            for _ in range(file_mb):
+                f.write(chunk)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return rss / 1024 if sys.platform != "darwin" else rss / (1024 * 1024)
+
+
+def buffered_archive(project: Path) -> bytes:
+    """The previous implementation: build everything in memory."""
+    tar_stream = io.BytesIO()
+    with tarfile.open(fileobj=tar_stream, mode='w') as tar:
+        for file_path, arcname in iter_project_files(project, DEFAULT_IGNORE_PATTERNS):
+            tar.add(file_path, arcname=arcname)
+    return tar_stream.getvalue()
+
+
+def streaming_archive(project: Path):
+    """The current implementation: a generator of tar chunks."""
+    return _iter_tar_stream(
+        (arcname, file_path) for file_path, arcname in iter_project_files(project, DEFAULT_IGNORE_PATTERNS)
+    )
+
+
+def run_mode(mode: str, project: Path, use_docker: bool) -> None:
+    """Pack (and optionally upload) the project, then print timing and peak RSS."""
+    started = time.perf_counter()
+    archive = buffered_archive(project) if mode == "buffered" else streaming_archive(project)
+
+    if use_docker:
+        import docker
+
+        client = docker.from_env()
+        container = client.containers.run(
+            "python:3.11-slim", command="sleep infinity",
+            detach=True, remove=True, working_dir="/workspace"
+        )
+        try:
+            container.put_archive("/workspace", archive)
+        finally:
+            container.kill()
+            client.close()
+    else:
+        # Consume the archive the way put_archive would, without keeping it
+        digest = hashlib.sha256()
+        for chunk in ([archive] if isinstance(archive, bytes) else archive):
+            digest.update(chunk)
+
+    elapsed = time.perf_counter() - started
+    print(f"{mode:>9}: {elapsed:6.2f}s  peak RSS {peak_rss_mb():8.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=200, help="synthetic project size")
+    parser.add_argument("--docker", action="store_true", help="upload into a real container")
+    parser.add_argument("--mode", choices=["buffered", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--project", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, Path(args.project), args.docker)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="agentdocks-bench-") as tmp:
+        project = Path(tmp)
+        make_project(project, args.size_mb)
+        print(f"Synthetic project: {args.size_mb} MB in {project}")
+        for mode in ("buffered", "streaming"):
+            command = [sys.executable, "-m", "benchmarks.sync_memory", "--mode", mode, "--project", tmp]
+            if args.docker:
+                command.append("--docker")
+            subprocess.run(command, check=True, cwd=Path(__file__).resolve().parent.parent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Write-heavy sandbox workloads on the container's writable layer vs tmpfs.
+
+Starts one DockerSandbox with /workspace and /tmp on the overlay writable
+layer and one with both on tmpfs (AGENTDOCKS_WORKSPACE_TMPFS), then times the
+same shell workloads in each: many small files (like a dependency install or
+a test run's caches), a large sequential write, and the file transfer API
+(write_files + download_file) that goes through tar inside the container.
+
+Usage (from backend/):
+    python -m benchmarks.workspace_io
+    python -m benchmarks.workspace_io --files 20000 --large-mb 512 --repeat 3
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.sandbox import DockerSandbox  # noqa: E402
+
+WORKLOADS = {
+    # Many small files in nested directories, then a tree walk and delete
+    "small_files": (
+        "mkdir -p /workspace/bench && cd /workspace/bench && "
+        "for d in $(seq 1 {dirs}); do mkdir -p pkg$d; done && "
+        "for i in $(seq 1 {files}); do echo \"value = $i\" > pkg$((i % {dirs} + 1))/mod$i.py; done && "
+        "find . -name '*.py' | wc -l && rm -rf /workspace/bench"
+    ),
+    # Scratch files in /tmp, the way compilers and test runners use it
+    "tmp_scratch": (
+        "for i in $(seq 1 {files}); do f=$(mktemp); echo $i > $f; rm $f; done"
+    ),
+    # One large sequential file
+    "large_file": (
+        "dd if=/dev/zero of=/workspace/large.bin bs=1M count={large_mb} conv=fsync 2>/dev/null && "
+        "rm /workspace/large.bin"
+    ),
+}
+
+
+async def time_command(sandbox: DockerSandbox, command: str) -> float:
+    started = time.perf_counter()
+    _, stderr, exit_code = await sandbox.execute_bash(command, timeout=600)
+    if exit_code != 0:
+        raise RuntimeError(f"Workload failed ({exit_code}): {stderr}")
+    return time.perf_counter() - started
+
+
+async def time_transfer(sandbox: DockerSandbox, files: int) -> float:
+    """Round-trip small files through write_files and download_file."""
+    payload = {f"/workspace/transfer/file{i}.txt": f"content {i}\n" for i in range(files)}
+    started = time.perf_counter()
+    if not await sandbox.write_files(payload):
+        raise RuntimeError("write_files failed")
+    for path in list(payload)[:100]:
+        if await sandbox.download_file(path) != payload[path].encode():
+            raise RuntimeError(f"Round trip mismatch for {path}")
+    return time.perf_counter() - started
+
+
+async def run_mode(image: str, tmpfs: bool, args) -> dict:
+    timings = {}
+    async with DockerSandbox(image, workspace_tmpfs=tmpfs) as sandbox:
+        for name, template in WORKLOADS.items():
+            command = template.format(files=args.files, dirs=args.dirs, large_mb=args.large_mb)
+            runs = [await time_command(sandbox, command) for _ in range(args.repeat)]
+            timings[name] = min(runs)
+        timings["transfer"] = await time_transfer(sandbox, min(args.files, 2000))
+    return timings
+
+
+async def main_async(args) -> None:
+    results = {}
+    for label, tmpfs in (("overlay", False), ("tmpfs", True)):
+        results[label] = await run_mode(args.image, tmpfs, args)
+
+    print(f"{'workload':>12}  {'overlay':>9}  {'tmpfs':>9}  speedup")
+    for name in results["overlay"]:
+        overlay, tmpfs = results["overlay"][name], results["tmpfs"][name]
+        print(f"{name:>12}  {overlay:8.2f}s  {tmpfs:8.2f}s  {overlay / tmpfs:6.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default="python:3.11-slim")
+    parser.add_argument("--files", type=int, default=5000, help="small files per workload")
+    parser.add_argument("--dirs", type=int, default=50, help="directories the small files are spread over")
+    parser.add_argument("--large-mb", type=int, default=256, help="size of the sequential write")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per workload (best is reported)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,103 @@
 """Core agent loop - the heart of AgentDocks."""
 
-from typing import AsyncGenerator, Dict, Any, List
+from typing import AsyncGenerator, Dict, Any, List, Optional
+from collections import deque
+import asyncio
 import json
+import os
 import shlex
+import time
 from .providers import create_provider
 from .sandbox import create_sandbox
+from .sandbox_sessions import get_session_manager
+from .sandbox_reaper import get_sandbox_reaper
+from .docker_hosts import get_docker_hosts
+from .dependency_cache import PREINSTALL_DEPS
 from .tools import TOOLS
 from .system_prompt import AGENT_SYSTEM_PROMPT
 from .stream import (
     stream_status,
     stream_tool_use,
     stream_tool_result,
+    stream_tool_output,
     stream_text,
     stream_error,
-    stream_done
+    stream_done,
+    stream_sync_progress,
+    stream_resource_usage
 )
 
 
+# Tool output kept for the model per stream; the client still sees everything
+MAX_TOOL_OUTPUT_CHARS = 100_000
+
+# Per-command limits in seconds for tools that run processes in the sandbox;
+# AgentRunRequest.tool_timeouts overrides them for a single run
+DEFAULT_TOOL_TIMEOUTS = {
+    "bash": int(os.getenv("AGENTDOCKS_COMMAND_TIMEOUT", "300")),
+    "glob": 60,
+    "grep": 120,
+    "browser": 180,
+}
+
+
+class _OutputTail:
+    """Keeps the last MAX_TOOL_OUTPUT_CHARS of a command's output stream."""
+
+    def __init__(self, max_chars: int = MAX_TOOL_OUTPUT_CHARS):
+        self.max_chars = max_chars
+        self.parts = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def append(self, text: str) -> None:
+        self.parts.append(text)
+        self.size += len(text)
+        while self.size > self.max_chars:
+            overflow = self.size - self.max_chars
+            first = self.parts[0]
+            if len(first) <= overflow:
+                self.parts.popleft()
+                self.size -= len(first)
+                self.dropped += len(first)
+            else:
+                self.parts[0] = first[overflow:]
+                self.size -= overflow
+                self.dropped += overflow
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        if self.dropped:
+            return f"[... {self.dropped} characters truncated ...]\n{text}"
+        return text
+
+
+class _RunBudget:
+    """Wall-clock budget for one agent run (None means unlimited)."""
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def limit(self, seconds: Optional[float]) -> Optional[float]:
+        """Cap a per-step limit by what is left of the run."""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        if seconds is None:
+            return remaining
+        return min(seconds, remaining)
+
+
 class AgentRunner:
     """Orchestrates the agent execution loop."""
 
@@ -38,9 +119,21 @@ class AgentRunner:
         self,
         query: str,
         max_turns: int = 10,
-        uploaded_files: List[Dict[str, Any]] = None
+        uploaded_files: List[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        reuse_sandbox: bool = False,
+        reset_sandbox: bool = True
     ) -> AsyncGenerator[str, None]:
         """
+        ``timeout`` is a wall-clock budget for the whole run; ``tool_timeouts``
+        overrides DEFAULT_TOOL_TIMEOUTS per tool name.
+
+        With ``reuse_sandbox`` the sandbox is parked after the run and picked up
+        by the next run on the same project. ``reset_sandbox`` decides whether
+        that next run starts from the local project again or keeps the
+        previous run's edits.
+
         Main agent loop:
         1. Create sandbox
         2. Upload any files
@@ -51,6 +144,12 @@ class AgentRunner:
         7. Destroy sandbox
         """
         sandbox = None
+        session = None
+        project_manager = None
+        project_path = None
+        run_failed = False
+        budget = _RunBudget(timeout)
+        limits = {**DEFAULT_TOOL_TIMEOUTS, **(tool_timeouts or {})}
         try:
             # Initialize provider
             yield await stream_status("Initializing AI provider...")
@@ -59,223 +158,346 @@ class AgentRunner:
                 self.provider_api_key
             )
 
-            # Create sandbox
-            yield await stream_status(f"Creating {self.sandbox_type} sandbox...")
-            sandbox_kwargs = {}
-            if self.sandbox_type == "e2b" and self.sandbox_api_key:
-                sandbox_kwargs["api_key"] = self.sandbox_api_key
+            from app.config import get_config
+            from core.project_manager import ProjectManager
+            import app.api.project as project_api
 
-            sandbox = create_sandbox(self.sandbox_type, **sandbox_kwargs)
-            async with sandbox:
-                yield await stream_status("Sandbox ready!")
+            config = get_config()
 
-                # Ensure /workspace/ directory exists
-                await sandbox.execute_bash("mkdir -p /workspace")
+            project_path = config.current_project.project_path if config and config.current_project else None
+            reuse_sandbox = reuse_sandbox and project_path is not None
+            sessions = get_session_manager()
 
-                # Sync project if one is open
-                from app.config import get_config
-                from core.project_manager import ProjectManager
-                import app.api.project as project_api
+            if reuse_sandbox:
+                session = sessions.acquire(self.sandbox_type, project_path)
+            if session:
+                yield await stream_status("Reusing warm sandbox...")
+                sandbox = session.sandbox
+                project_manager = session.project_manager
+                try:
+                    synced = await project_manager.sync(reset=reset_sandbox)
+                    if reset_sandbox:
+                        await project_manager.snapshot_hashes()
+                    project_api._active_project_manager = project_manager
+                    project_manager.run_active = True
+                    yield await stream_status(
+                        f"Project re-synced ({synced['uploaded']} updated, {synced['deleted']} removed)"
+                    )
+                except Exception as e:
+                    # Dead or broken sandbox: start over with a fresh one
+                    yield await stream_status(f"Warning: Warm sandbox unusable, creating a new one: {str(e)}")
+                    sessions.discard(session)
+                    get_sandbox_reaper().schedule(sandbox)
+                    session = sandbox = project_manager = None
+
+            if sandbox is None:
+                # Create sandbox
+                yield await stream_status(f"Creating {self.sandbox_type} sandbox...")
+                if self.sandbox_type == "docker" and get_docker_hosts().saturated:
+                    yield await stream_status("Host is at capacity, waiting for a free sandbox slot...")
+                sandbox_kwargs = {}
+                if self.sandbox_type == "e2b" and self.sandbox_api_key:
+                    sandbox_kwargs["api_key"] = self.sandbox_api_key
+                if config and config.current_project:
+                    # Lets Docker mount the project directly when overlay sync is enabled
+                    sandbox_kwargs["project_path"] = config.current_project.project_path
 
-                config = get_config()
-                project_manager = None
+                sandbox = create_sandbox(self.sandbox_type, **sandbox_kwargs)
+                await sandbox.__aenter__()
+                yield await stream_status("Sandbox ready!")
 
+                # Sync project if one is open
                 if config and config.current_project:
                     yield await stream_status("Loading project into sandbox...")
                     try:
-                        project_path = config.current_project.project_path
                         project_manager = ProjectManager(sandbox, project_path)
 
-                        # Copy project to sandbox
-                        success = await project_manager.copy_to_sandbox()
+                        # Copy project to sandbox, forwarding progress as it happens
+                        progress_queue: asyncio.Queue = asyncio.Queue()
+                        copy_task = asyncio.create_task(
+                            project_manager.copy_to_sandbox(progress_callback=progress_queue.put_nowait)
+                        )
+                        while not copy_task.done() or not progress_queue.empty():
+                            try:
+                                progress = await asyncio.wait_for(progress_queue.get(), timeout=0.5)
+                                yield await stream_sync_progress(progress)
+                            except asyncio.TimeoutError:
+                                continue
+                        success = await copy_task
                         if success:
+                            if PREINSTALL_DEPS:
+                                yield await stream_status("Installing project dependencies...")
+                                installed = await project_manager.install_dependencies()
+                                if installed and installed[2] != 0:
+                                    yield await stream_status(
+                                        f"Warning: Dependency install failed (exit {installed[2]})"
+                                    )
+                                elif installed:
+                                    yield await stream_status("Dependencies installed")
+
+                            if sandbox.project_preloaded:
+                                yield await stream_status("Project restored from cached image")
+                            elif await project_manager.cache_project_image():
+                                yield await stream_status("Cached project image for future runs")
+
                             # Snapshot file hashes for change detection
                             await project_manager.snapshot_hashes()
 
                             # Store in global for API access
                             project_api._active_project_manager = project_manager
+                            project_manager.run_active = True
 
                             yield await stream_status(f"Project '{config.current_project.project_name}' loaded!")
                         else:
+                            project_manager = None
                             yield await stream_status("Warning: Failed to load project")
                     except Exception as e:
+                        project_manager = None
                         yield await stream_status(f"Warning: Failed to sync project: {str(e)}")
 
-                # Upload files if provided
-                if uploaded_files:
-                    yield await stream_status(f"Uploading {len(uploaded_files)} files...")
-                    # Create /workspace/ directory first
-                    await sandbox.execute_bash("mkdir -p /workspace")
-                    for file_data in uploaded_files:
-                        # Upload to /workspace/
-                        file_path = f"/workspace/{file_data['name']}"
-                        await sandbox.upload_file(
-                            file_path,
-                            file_data["content"]
-                        )
-                    yield await stream_status(f"Uploaded {len(uploaded_files)} files to /workspace/")
-
-                # Initialize conversation
-                messages = [
-                    {
-                        "role": "user",
-                        "content": query
-                    }
-                ]
-
-                # Agent loop
-                for turn in range(max_turns):
-                    yield await stream_status(f"AI thinking... (turn {turn + 1}/{max_turns})")
-
-                    # Get AI response
-                    response = await provider.complete(
-                        messages=messages,
-                        tools=TOOLS,
-                        model=self.model,
-                        system=AGENT_SYSTEM_PROMPT
+            # Upload files if provided
+            if uploaded_files:
+                yield await stream_status(f"Uploading {len(uploaded_files)} files...")
+                # Upload to /workspace/ as raw bytes, in one batch
+                uploaded = await sandbox.write_files({
+                    f"/workspace/{file_data['name']}": file_data["content"]
+                    for file_data in uploaded_files
+                })
+                if not uploaded:
+                    raise RuntimeError("Failed to upload files to the sandbox")
+                yield await stream_status(f"Uploaded {len(uploaded_files)} files to /workspace/")
+
+            # Initialize conversation
+            messages = [
+                {
+                    "role": "user",
+                    "content": query
+                }
+            ]
+
+            # Agent loop
+            out_of_time = False
+            for turn in range(max_turns):
+                if budget.expired:
+                    yield await stream_error(f"Run exceeded its {budget.seconds:g}s time budget")
+                    break
+
+                yield await stream_status(f"AI thinking... (turn {turn + 1}/{max_turns})")
+
+                # Get AI response
+                try:
+                    response = await asyncio.wait_for(
+                        provider.complete(
+                            messages=messages,
+                            tools=TOOLS,
+                            model=self.model,
+                            system=AGENT_SYSTEM_PROMPT
+                        ),
+                        budget.remaining()
                     )
+                except asyncio.TimeoutError:
+                    yield await stream_error(f"Run exceeded its {budget.seconds:g}s time budget")
+                    break
+
+                # Process response content blocks
+                assistant_content = []
+                has_tool_use = False
+
+                for block in response.content:
+                    if block.type == "text":
+                        # Stream text to user
+                        yield await stream_text(block.text)
+                        assistant_content.append({
+                            "type": "text",
+                            "text": block.text
+                        })
+
+                    elif block.type == "tool_use":
+                        has_tool_use = True
+                        if budget.expired:
+                            # A zero timeout would mean no limit at all to most tools
+                            yield await stream_error(f"Run exceeded its {budget.seconds:g}s time budget")
+                            out_of_time = True
+                            break
+
+                        # Stream tool use
+                        yield await stream_tool_use(block.name, block.input)
+
+                        # Execute tool
+                        try:
+                            # Stream browser action if it's a browser tool
+                            if block.name == "browser":
+                                from core.stream import stream_browser_action, stream_screenshot
+                                action = block.input.get("action", "unknown")
+                                yield await stream_browser_action(action, block.input)
+
+                            tool_timeout = budget.limit(limits.get(block.name))
+                            if block.name == "bash":
+                                # Forward output while the command is still running
+                                result = {}
+                                async for event in self._stream_bash(
+                                    sandbox, block.input, result, tool_timeout
+                                ):
+                                    yield event
+                            else:
+                                result = await self._execute_tool(
+                                    sandbox,
+                                    block.name,
+                                    block.input,
+                                    timeout=tool_timeout
+                                )
+
+                            # Stream screenshot if browser tool returned one
+                            if block.name == "browser" and result.get("screenshot_data"):
+                                from core.stream import stream_screenshot
+                                yield await stream_screenshot(
+                                    result["screenshot_data"],
+                                    result.get("screenshot_path", "unknown")
+                                )
 
-                    # Process response content blocks
-                    assistant_content = []
-                    has_tool_use = False
+                            yield await stream_tool_result(result, is_error=False)
 
-                    for block in response.content:
-                        if block.type == "text":
-                            # Stream text to user
-                            yield await stream_text(block.text)
+                            usage = await sandbox.resource_usage()
+                            if usage:
+                                yield await stream_resource_usage(usage)
+
+                            # Add to conversation
                             assistant_content.append({
-                                "type": "text",
-                                "text": block.text
+                                "type": "tool_use",
+                                "id": block.id,
+                                "name": block.name,
+                                "input": block.input
                             })
 
-                        elif block.type == "tool_use":
-                            has_tool_use = True
-                            # Stream tool use
-                            yield await stream_tool_use(block.name, block.input)
+                            # Tool result message
+                            messages.append({
+                                "role": "assistant",
+                                "content": assistant_content
+                            })
 
-                            # Execute tool
-                            try:
-                                # Stream browser action if it's a browser tool
-                                if block.name == "browser":
-                                    from core.stream import stream_browser_action, stream_screenshot
-                                    action = block.input.get("action", "unknown")
-                                    yield await stream_browser_action(action, block.input)
+                            messages.append({
+                                "role": "user",
+                                "content": [
+                                    {
+                                        "type": "tool_result",
+                                        "tool_use_id": block.id,
+                                        "content": str(result)
+                                    }
+                                ]
+                            })
 
-                                result = await self._execute_tool(
-                                    sandbox,
-                                    block.name,
-                                    block.input
-                                )
+                            assistant_content = []  # Reset for next turn
 
-                                # Stream screenshot if browser tool returned one
-                                if block.name == "browser" and result.get("screenshot_data"):
-                                    from core.stream import stream_screenshot
-                                    yield await stream_screenshot(
-                                        result["screenshot_data"],
-                                        result.get("screenshot_path", "unknown")
-                                    )
+                        except Exception as e:
+                            error_msg = str(e)
+                            yield await stream_tool_result(error_msg, is_error=True)
 
-                                yield await stream_tool_result(result, is_error=False)
-
-                                # Add to conversation
-                                assistant_content.append({
-                                    "type": "tool_use",
-                                    "id": block.id,
-                                    "name": block.name,
-                                    "input": block.input
-                                })
-
-                                # Tool result message
-                                messages.append({
-                                    "role": "assistant",
-                                    "content": assistant_content
-                                })
-
-                                messages.append({
-                                    "role": "user",
-                                    "content": [
-                                        {
-                                            "type": "tool_result",
-                                            "tool_use_id": block.id,
-                                            "content": str(result)
-                                        }
-                                    ]
-                                })
-
-                                assistant_content = []  # Reset for next turn
-
-                            except Exception as e:
-                                error_msg = str(e)
-                                yield await stream_tool_result(error_msg, is_error=True)
-
-                                # Add error to conversation
-                                messages.append({
-                                    "role": "assistant",
-                                    "content": assistant_content
-                                })
-
-                                messages.append({
-                                    "role": "user",
-                                    "content": [
-                                        {
-                                            "type": "tool_result",
-                                            "tool_use_id": block.id,
-                                            "content": f"Error: {error_msg}",
-                                            "is_error": True
-                                        }
-                                    ]
-                                })
-
-                                assistant_content = []
-
-                    # If no tool use, we're done
-                    if not has_tool_use:
-                        if assistant_content:
+                            # Add error to conversation
                             messages.append({
                                 "role": "assistant",
                                 "content": assistant_content
                             })
-                        break
 
-                # Task complete
-                yield await stream_status("Task complete. Cleaning up...")
+                            messages.append({
+                                "role": "user",
+                                "content": [
+                                    {
+                                        "type": "tool_result",
+                                        "tool_use_id": block.id,
+                                        "content": f"Error: {error_msg}",
+                                        "is_error": True
+                                    }
+                                ]
+                            })
 
-                # Detect changes if project was loaded
-                if project_manager:
-                    try:
-                        import app.api.project as project_api
-                        yield await stream_status("Detecting changes...")
-                        changes = await project_manager.detect_changes()
-                        # Cache changes in global for API access
-                        project_api._cached_changes = changes
-                        if changes:
-                            yield await stream_status(f"Found {len(changes)} file changes")
-                    except Exception as e:
-                        print(f"Error detecting changes: {e}")
+                            assistant_content = []
+
+                if out_of_time:
+                    break
+
+                # If no tool use, we're done
+                if not has_tool_use:
+                    if assistant_content:
+                        messages.append({
+                            "role": "assistant",
+                            "content": assistant_content
+                        })
+                    break
+
+            # Task complete
+            yield await stream_status("Task complete. Cleaning up...")
+
+            # Detect changes if project was loaded
+            if project_manager:
+                try:
+                    import app.api.project as project_api
+                    yield await stream_status("Detecting changes...")
+                    changes = await project_manager.detect_changes()
+                    # Cache changes in global for API access
+                    project_api._cached_changes = changes
+                    if changes:
+                        yield await stream_status(f"Found {len(changes)} file changes")
+                except Exception as e:
+                    print(f"Error detecting changes: {e}")
 
         except Exception as e:
+            run_failed = True
             yield await stream_error(f"Agent error: {str(e)}")
 
         finally:
-            # Ensure sandbox is destroyed
+            if project_manager:
+                project_manager.run_active = False
             if sandbox:
-                try:
-                    await sandbox.destroy()
-                except Exception as e:
-                    print(f"Error destroying sandbox: {e}")
+                # Park the sandbox for the next run, or destroy it in the
+                # background so the client gets "done" without waiting on teardown
+                kept = False
+                if reuse_sandbox and project_manager and not run_failed:
+                    kept = get_session_manager().release(
+                        self.sandbox_type, project_path, sandbox, project_manager,
+                        reset=reset_sandbox
+                    )
+                if not kept:
+                    if session:
+                        get_session_manager().discard(session)
+                    get_sandbox_reaper().schedule(sandbox)
 
             yield await stream_done()
 
+    async def _stream_bash(
+        self,
+        sandbox,
+        tool_input: Dict[str, Any],
+        result: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> AsyncGenerator[str, None]:
+        """Run the bash tool, yielding tool_output events and filling in result."""
+        outputs = {"stdout": _OutputTail(), "stderr": _OutputTail()}
+        exit_code = None
+
+        async for stream, data in sandbox.execute_bash_stream(tool_input["command"], timeout=timeout):
+            if stream == "exit":
+                exit_code = data
+                continue
+            outputs[stream].append(data)
+            yield await stream_tool_output(stream, data)
+
+        result.update({
+            "stdout": outputs["stdout"].getvalue(),
+            "stderr": outputs["stderr"].getvalue(),
+            "exit_code": exit_code
+        })
+
     async def _execute_tool(
         self,
         sandbox,
         tool_name: str,
-        tool_input: Dict[str, Any]
+        tool_input: Dict[str, Any],
+        timeout: Optional[float] = None
     ) -> Any:
-        """Execute a tool call in the sandbox."""
+        """Execute a tool call in the sandbox. ``timeout`` limits commands it runs."""
         if tool_name == "bash":
             command = tool_input["command"]
-            stdout, stderr, exit_code = await sandbox.execute_bash(command)
+            stdout, stderr, exit_code = await sandbox.execute_bash(command, timeout=timeout)
             return {
                 "stdout": stdout,
                 "stderr": stderr,
@@ -326,7 +548,8 @@ class AgentRunner:
 
             # Use bash to run glob with proper escaping
             stdout, _, _ = await sandbox.execute_bash(
-                f"find {shlex.quote(directory)} -name {shlex.quote(pattern)} 2>/dev/null"
+                f"find {shlex.quote(directory)} -name {shlex.quote(pattern)} 2>/dev/null",
+                timeout=timeout
             )
             files = [f.strip() for f in stdout.split('\n') if f.strip()]
             return {"files": files}
@@ -337,7 +560,8 @@ class AgentRunner:
 
             # Use bash grep with proper escaping
             stdout, _, exit_code = await sandbox.execute_bash(
-                f"grep -r {shlex.quote(pattern)} {shlex.quote(path)} 2>/dev/null || true"
+                f"grep -r {shlex.quote(pattern)} {shlex.quote(path)} 2>/dev/null || true",
+                timeout=timeout
             )
             return {"matches": stdout}
 
@@ -351,7 +575,8 @@ class AgentRunner:
             action = tool_input["action"]
             result = await sandbox._browser_manager.execute_action(
                 action=action,
-                **{k: v for k, v in tool_input.items() if k != "action"}
+                command_timeout=timeout,
+                **{k: v for k, v in tool_input.items() if k not in ("action", "command_timeout")}
             )
 
             return result
@@ -13,6 +13,8 @@ import shlex
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+from .shell_session import TIMEOUT_EXIT_CODE
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,6 +65,7 @@ class BrowserManager:
         full_page: bool = False,
         timeout: int = 30000,
         javascript: Optional[str] = None,
+        command_timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Execute a browser action.
@@ -75,6 +78,7 @@ class BrowserManager:
             full_page: Whether to capture full page screenshot
             timeout: Timeout in milliseconds (default 30000)
             javascript: JavaScript code for execute action
+            command_timeout: Limit in seconds for the browser command (default: timeout + 5s)
 
         Returns:
             Dict with action result, may include screenshot_data, screenshot_path, extracted_text, etc.
@@ -109,10 +113,13 @@ class BrowserManager:
         try:
             # Run with timeout protection - use shlex.quote for proper escaping
             command = f'python3 {self.browser_script_path} {shlex.quote(args_json)}'
-            stdout, stderr, exit_code = await asyncio.wait_for(
-                self.sandbox.execute_bash(command),
-                timeout=timeout / 1000 + 5  # Add 5s buffer
-            )
+            limit = timeout / 1000 + 5  # Add 5s buffer
+            if command_timeout is not None:
+                limit = min(limit, command_timeout)
+            # The sandbox kills the browser process once the limit is hit
+            stdout, stderr, exit_code = await self.sandbox.execute_bash(command, timeout=limit)
+            if exit_code == TIMEOUT_EXIT_CODE:
+                raise asyncio.TimeoutError()
 
             # Parse result from stdout
             logger.info(f"📊 Browser command: {command}")
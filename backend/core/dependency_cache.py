@@ -0,0 +1,75 @@
+"""Shared package-manager caches for Docker sandboxes.
+
+Sandboxes are thrown away after every run, so `pip install` and
+`npm install` used to download the same wheels and tarballs each time.
+Named Docker volumes for each package manager's cache directory are mounted
+into every sandbox so repeated installs hit a warm local cache.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+# Comma-separated caches to mount (empty disables them): pip, npm, yarn, cargo
+DEPENDENCY_CACHES = os.getenv("AGENTDOCKS_DEPENDENCY_CACHES", "pip,npm,yarn,cargo")
+# Set to 1 to install declared dependencies before the first model turn
+PREINSTALL_DEPS = os.getenv("AGENTDOCKS_PREINSTALL_DEPS", "0") == "1"
+PREINSTALL_TIMEOUT = int(os.getenv("AGENTDOCKS_PREINSTALL_TIMEOUT", "600"))
+
+# cache name -> (volume name, cache directory inside the sandbox)
+CACHE_VOLUMES = {
+    "pip": ("agentdocks-cache-pip", "/root/.cache/pip"),
+    "npm": ("agentdocks-cache-npm", "/root/.npm"),
+    "yarn": ("agentdocks-cache-yarn", "/usr/local/share/.cache/yarn"),
+    "cargo": ("agentdocks-cache-cargo", "/root/.cargo/registry"),
+}
+
+# detect_project_type() result -> caches that project type uses
+PROJECT_CACHES = {
+    "python": ["pip"],
+    "node": ["npm", "yarn"],
+    "rust": ["cargo"],
+}
+
+
+def enabled_caches() -> list:
+    """Caches allowed by AGENTDOCKS_DEPENDENCY_CACHES."""
+    names = [name.strip() for name in DEPENDENCY_CACHES.split(',') if name.strip()]
+    return [name for name in names if name in CACHE_VOLUMES]
+
+
+def cache_volumes(project_type: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+    """
+    Docker volume options for the caches a project type needs.
+    Unknown types (and pooled containers, whose project is not known yet) get all of them.
+    """
+    names = enabled_caches()
+    if project_type in PROJECT_CACHES:
+        names = [name for name in names if name in PROJECT_CACHES[project_type]]
+
+    return {
+        CACHE_VOLUMES[name][0]: {"bind": CACHE_VOLUMES[name][1], "mode": "rw"}
+        for name in names
+    }
+
+
+def install_command(project_path: Path) -> Optional[str]:
+    """Shell command installing a project's declared dependencies, or None if it declares none."""
+    def tool(binary: str, command: str) -> str:
+        # Base images may lack the toolchain; report that instead of failing obscurely
+        return (
+            f"if command -v {binary} >/dev/null 2>&1; then {command}; "
+            f"else echo '{binary} is not installed in this sandbox' >&2; exit 127; fi"
+        )
+
+    if (project_path / 'requirements.txt').exists():
+        return tool("pip", "pip install -r requirements.txt")
+    if (project_path / 'pyproject.toml').exists() or (project_path / 'setup.py').exists():
+        return tool("pip", "pip install -e .")
+    if (project_path / 'package.json').exists():
+        if (project_path / 'yarn.lock').exists():
+            return tool("yarn", "yarn install --frozen-lockfile")
+        return tool("npm", "npm install")
+    if (project_path / 'Cargo.toml').exists():
+        return tool("cargo", "cargo fetch")
+    return None
@@ -0,0 +1,118 @@
+"""Dedicated thread pool for blocking Docker calls.
+
+docker-py is synchronous, so every Docker operation runs in a worker thread.
+Sharing the event loop's default executor meant exec, put_archive and stop
+calls from concurrent runs queued behind each other (and behind unrelated
+work) without any visibility. This module gives Docker its own sized pool
+and tracks how long calls wait for a free worker.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker threads for blocking Docker calls
+DOCKER_THREADS = int(os.getenv("AGENTDOCKS_DOCKER_THREADS", "32"))
+
+
+class DockerExecutor:
+    """Bounded executor with queue-depth and wait-time metrics."""
+
+    def __init__(self, max_workers: int = DOCKER_THREADS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            "calls": 0,
+            "errors": 0,
+            "wait_seconds_total": 0.0,
+            "max_wait_seconds": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run a blocking call on the Docker pool and await its result."""
+        loop = asyncio.get_event_loop()
+        submitted = time.monotonic()
+        state = {"started": False, "abandoned": False}
+
+        def call():
+            started = time.monotonic()
+            with self._lock:
+                state["started"] = True
+                if not state["abandoned"]:
+                    self._queued -= 1
+                self._running += 1
+                wait = started - submitted
+                self._stats["calls"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+            try:
+                return func(*args)
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._stats["run_seconds_total"] += time.monotonic() - started
+
+        with self._lock:
+            self._queued += 1
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            with self._lock:
+                # Cancelled before a worker picked it up
+                if not state["started"]:
+                    state["abandoned"] = True
+                    self._queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth, busy workers and wait-time counters."""
+        with self._lock:
+            calls = self._stats["calls"]
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "calls": calls,
+                "errors": self._stats["errors"],
+                "avg_wait_seconds": (
+                    round(self._stats["wait_seconds_total"] / calls, 4) if calls else None
+                ),
+                "max_wait_seconds": round(self._stats["max_wait_seconds"], 4),
+                "avg_run_seconds": (
+                    round(self._stats["run_seconds_total"] / calls, 4) if calls else None
+                ),
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running calls finish in the background."""
+        self._executor.shutdown(wait=False)
+
+
+_executor: Optional[DockerExecutor] = None
+
+
+def get_docker_executor() -> DockerExecutor:
+    """Get the process-wide Docker executor."""
+    global _executor
+    if _executor is None:
+        _executor = DockerExecutor()
+        logger.info(f"🐳 Docker executor started with {_executor.max_workers} threads")
+    return _executor
+
+
+async def run_docker(func: Callable[..., Any], *args) -> Any:
+    """Run a blocking docker-py call on the dedicated Docker executor."""
+    return await get_docker_executor().run(func, *args)
@@ -0,0 +1,233 @@
+"""Placement of Docker sandboxes across several Docker endpoints.
+
+By default every sandbox runs on the local daemon (``docker.from_env()``),
+so one host caps concurrency. ``AGENTDOCKS_DOCKER_HOSTS`` lists more
+endpoints (unix sockets or TCP hosts); each new sandbox goes to the healthy
+endpoint with the lowest load, and an endpoint that stops answering is taken
+out of rotation until a health check succeeds again. Each endpoint has its
+own warm pool and resource budget.
+
+To try it locally, run a second daemon next to the host one, e.g.
+``docker run -d --privileged -p 2375:2375 -e DOCKER_TLS_CERTDIR= docker:dind``
+and set ``AGENTDOCKS_DOCKER_HOSTS=unix:///var/run/docker.sock,tcp://127.0.0.1:2375``.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .docker_executor import run_docker
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated Docker endpoints; empty means the local daemon from the environment
+DOCKER_HOSTS = os.getenv("AGENTDOCKS_DOCKER_HOSTS", "")
+# Seconds between endpoint health checks
+HEALTH_CHECK_INTERVAL = int(os.getenv("AGENTDOCKS_DOCKER_HEALTH_INTERVAL", "15"))
+# A ping slower than this marks the endpoint unhealthy
+HEALTH_CHECK_TIMEOUT = 10
+
+
+def docker_client(url: Optional[str] = None):
+    """Docker client for an endpoint URL, or for the local daemon when None (blocking)."""
+    import docker
+
+    if url is None:
+        return docker.from_env()
+    return docker.DockerClient(base_url=url)
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """True for errors that mean the daemon is unreachable, not that a request was bad."""
+    import docker
+    import requests
+
+    if isinstance(error, docker.errors.APIError):
+        # The daemon answered; only its own server errors count against it
+        return error.status_code is not None and error.status_code >= 500
+    return isinstance(error, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        docker.errors.DockerException,
+    ))
+
+
+class DockerEndpoint:
+    """One Docker daemon sandboxes can be placed on."""
+
+    def __init__(self, url: Optional[str], pool, scheduler, client_factory: Callable = docker_client):
+        self.url = url
+        self.name = url or "local"
+        self.pool = pool
+        self.scheduler = scheduler
+        self._client_factory = client_factory
+        self.client = None
+        self.healthy = True
+        self.active = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+
+    def new_client(self):
+        """A fresh client for this endpoint (blocking); sandboxes own and close theirs."""
+        return self._client_factory(self.url)
+
+    @property
+    def load(self) -> float:
+        """Share of the endpoint in use: reserved CPUs when budgeted, else running sandboxes."""
+        if self.scheduler.enabled and self.scheduler.cpus:
+            resources = self.scheduler.stats()
+            return (resources["allocated"]["cpus"] + resources["waiting"]) / self.scheduler.cpus
+        return float(self.active)
+
+    async def get_client(self):
+        """The endpoint's shared client (used for health checks and sweeps)."""
+        if self.client is None:
+            self.client = await run_docker(self.new_client)
+        return self.client
+
+    async def check(self) -> bool:
+        """Ping the daemon and update the health state."""
+        try:
+            if self.client is None:
+                self.client = await run_docker(self.new_client)
+                if self.url is not None:
+                    # The host budget of a remote daemon is its own, not this machine's
+                    info = await asyncio.wait_for(run_docker(self.client.info), timeout=HEALTH_CHECK_TIMEOUT)
+                    self.scheduler.resize(info.get("NCPU"), info.get("MemTotal", 0) // (1024 * 1024) * 0.8)
+            await asyncio.wait_for(run_docker(self.client.ping), timeout=HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            self.mark_unhealthy(e)
+            return False
+
+        if not self.healthy:
+            logger.info(f"✅ Docker endpoint {self.name} is healthy again")
+        self.healthy = True
+        self.last_error = None
+        self.last_check = time.time()
+        return True
+
+    def mark_unhealthy(self, error: BaseException) -> None:
+        if self.healthy:
+            logger.warning(f"⚠️ Docker endpoint {self.name} unhealthy: {error}")
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)
+        self.last_check = time.time()
+        if self.client is not None:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+            self.client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.name,
+            "healthy": self.healthy,
+            "active": self.active,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "pool": self.pool.stats(),
+            "resources": self.scheduler.stats(),
+        }
+
+
+class DockerHosts:
+    """Chooses endpoints for new sandboxes and tracks their health."""
+
+    def __init__(self, endpoints: List[DockerEndpoint]):
+        self.endpoints = endpoints
+        self._health_task: Optional[asyncio.Task] = None
+        self._stats = {"placements": 0, "failovers": 0}
+
+    async def start(self) -> None:
+        """Start each endpoint's warm pool and the periodic health checks."""
+        if len(self.endpoints) > 1:
+            # Size remote budgets and find dead endpoints before the first placement
+            await asyncio.gather(*(endpoint.check() for endpoint in self.endpoints))
+        for endpoint in self.endpoints:
+            await endpoint.pool.start()
+        if len(self.endpoints) > 1 and self._health_task is None:
+            self._health_task = asyncio.create_task(self._check_forever())
+
+    async def stop(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        for endpoint in self.endpoints:
+            await endpoint.pool.stop()
+            if endpoint.client is not None:
+                endpoint.client.close()
+                endpoint.client = None
+
+    async def place(self, exclude: Optional[List[DockerEndpoint]] = None) -> DockerEndpoint:
+        """Pick the least-loaded healthy endpoint (not in ``exclude``)."""
+        exclude = exclude or []
+        candidates = [e for e in self.endpoints if e.healthy and e not in exclude]
+        if not candidates:
+            # Everything looked down; maybe something came back since the last check
+            for endpoint in self.endpoints:
+                if endpoint not in exclude and await endpoint.check():
+                    candidates.append(endpoint)
+        if not candidates:
+            raise RuntimeError("No healthy Docker endpoint available for a sandbox")
+
+        endpoint = min(candidates, key=lambda e: (e.load, e.active))
+        self._stats["placements"] += 1
+        return endpoint
+
+    @property
+    def saturated(self) -> bool:
+        """True when every healthy endpoint would make a new sandbox wait for resources."""
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        return bool(healthy) and all(endpoint.scheduler.saturated for endpoint in healthy)
+
+    def failed(self, endpoint: DockerEndpoint, error: BaseException) -> None:
+        """Take an endpoint out of rotation after a sandbox could not start on it."""
+        endpoint.mark_unhealthy(error)
+        self._stats["failovers"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+            **self._stats,
+        }
+
+    async def _check_forever(self) -> None:
+        while True:
+            await asyncio.gather(*(endpoint.check() for endpoint in self.endpoints))
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
+
+def parse_docker_hosts(spec: str) -> List[str]:
+    """Parse the comma-separated AGENTDOCKS_DOCKER_HOSTS value."""
+    return [url.strip() for url in spec.split(',') if url.strip()]
+
+
+_hosts: Optional[DockerHosts] = None
+
+
+def get_docker_hosts() -> DockerHosts:
+    """Get the process-wide endpoint set (the local daemon alone unless configured)."""
+    global _hosts
+    if _hosts is None:
+        from .sandbox_pool import SandboxPool, get_sandbox_pool, parse_pool_images, POOL_IMAGES, POOL_SIZE
+        from .sandbox_scheduler import ResourceScheduler, get_resource_scheduler
+
+        urls = parse_docker_hosts(DOCKER_HOSTS)
+        if not urls:
+            endpoints = [DockerEndpoint(None, get_sandbox_pool(), get_resource_scheduler())]
+        else:
+            endpoints = [
+                DockerEndpoint(
+                    url,
+                    SandboxPool(parse_pool_images(POOL_IMAGES, POOL_SIZE), docker_url=url),
+                    ResourceScheduler()
+                )
+                for url in urls
+            ]
+        _hosts = DockerHosts(endpoints)
+    return _hosts
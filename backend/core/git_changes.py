@@ -0,0 +1,104 @@
+"""Git-based change tracking inside the sandbox.
+
+For projects that are git repositories, the baseline can be a throwaway
+git repository in the sandbox instead of a table of hashes: its git dir
+lives outside the workspace (so the agent's own git use is unaffected) and
+one commit records the workspace as synced. Changes then come from
+``git add -A`` into a scratch index plus ``git status --porcelain -z``,
+which reuse git's stat cache and report renames. Only changed paths are
+transferred. Callers fall back to hash comparison when git is missing.
+"""
+
+import os
+import shlex
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Set to 1 to track changes of git projects with git in the sandbox
+GIT_CHANGES_ENABLED = os.getenv("AGENTDOCKS_GIT_CHANGES", "0") == "1"
+# Git dir of the baseline repository inside the sandbox. It holds a blob of
+# every workspace file, so it lives on the container's disk rather than in
+# /tmp, which may be a small tmpfs (AGENTDOCKS_WORKSPACE_TMPFS).
+BASELINE_GIT_DIR = "/var/tmp/.agentdocks_git"
+
+# Exit code the commands use when the sandbox has no git
+NO_GIT_EXIT_CODE = 127
+# Exit code of the baseline command when the workspace would not fit beside the git dir
+NO_SPACE_EXIT_CODE = 75
+
+
+def is_git_project(project_path: Path) -> bool:
+    """Whether a local project folder is a git work tree."""
+    return (Path(project_path) / '.git').exists()
+
+
+def _git_prelude(root: str) -> str:
+    git_dir = shlex.quote(BASELINE_GIT_DIR)
+    return (
+        f"command -v git >/dev/null 2>&1 || exit {NO_GIT_EXIT_CODE}; "
+        f"export GIT_DIR={git_dir} GIT_WORK_TREE={shlex.quote(root)}; "
+        # Workspaces may be owned by another user than the one running git
+        "g() { git -c safe.directory='*' -c core.quotepath=false -c core.autocrlf=false \"$@\"; }; "
+    )
+
+
+def baseline_command(root: str = "/workspace") -> str:
+    """
+    One command (re)creating the baseline repository from the current
+    workspace. Exits with NO_SPACE_EXIT_CODE, before writing anything, when
+    the git dir's filesystem has less free space than the workspace uses.
+    """
+    return _git_prelude(root) + (
+        'rm -rf "$GIT_DIR" && mkdir -p "$(dirname "$GIT_DIR")" || exit 1; '
+        'need=$(du -sk "$GIT_WORK_TREE" 2>/dev/null | cut -f1); '
+        'free=$(df -Pk "$(dirname "$GIT_DIR")" 2>/dev/null | awk \'NR == 2 {print $4}\'); '
+        f'[ -n "$need" ] && [ -n "$free" ] && [ "$need" -lt "$free" ] || exit {NO_SPACE_EXIT_CODE}; '
+        'g init -q && g add -A && '
+        "g -c user.name=agentdocks -c user.email=agentdocks@localhost "
+        "commit -q --no-verify --allow-empty -m baseline"
+    )
+
+
+def status_command(root: str = "/workspace") -> str:
+    """
+    One command listing changes against the baseline. Staging into a copy
+    of the baseline index leaves the baseline as it is and lets status
+    pair deletions with additions as renames.
+    """
+    return _git_prelude(root) + (
+        'export GIT_INDEX_FILE="$GIT_DIR/index.detect"; '
+        'cp "$GIT_DIR/index" "$GIT_INDEX_FILE" && g add -A && '
+        "g -c status.renames=true status --porcelain -z --untracked-files=all"
+    )
+
+
+def parse_status(output: str, root: str = "/workspace") -> List[Tuple[str, str, Optional[str]]]:
+    """
+    Parse ``git status --porcelain -z`` of a fully staged index into
+    (sandbox path, type, old sandbox path or None) triples.
+    """
+    prefix = root.rstrip('/') + '/'
+    records = output.split('\0')
+    changes = []
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if len(record) < 4:
+            continue
+        status, path = record[0], prefix + record[3:]
+        if status in ('R', 'C'):
+            # The source path follows as its own record
+            old_path = prefix + records[i] if i < len(records) else None
+            i += 1
+            if status == 'R':
+                changes.append((path, 'renamed', old_path))
+            else:
+                changes.append((path, 'created', None))
+        elif status == 'A':
+            changes.append((path, 'created', None))
+        elif status == 'D':
+            changes.append((path, 'deleted', None))
+        elif status in ('M', 'T'):
+            changes.append((path, 'modified', None))
+    return changes
@@ -0,0 +1,178 @@
+"""Gitignore-style path matching for project walks.
+
+Patterns follow gitignore semantics: a leading or inner ``/`` anchors a
+pattern to the directory of the file it came from, a trailing ``/`` limits
+it to directories, ``**`` spans directories, ``!`` re-includes, and the last
+matching pattern wins. Each ``.gitignore`` (the project root's and nested
+ones, loaded as directories are reached) compiles into one regex whose
+alternatives are the patterns in reverse order, so a single ``fullmatch``
+finds the deciding pattern.
+
+Walks prune ignored directories before descending, and as in git a file
+inside an ignored directory cannot be re-included.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+GITIGNORE = '.gitignore'
+
+
+def _translate(pattern: str, anchored: bool) -> str:
+    """Regex for one gitignore glob, matched against a path relative to its base."""
+    out = [] if anchored else ['(?:.*/)?']
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+            # Zero or more leading directories
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == n:
+            # Everything inside, but not the directory itself
+            out.append('/.+')
+            i += 3
+        elif c == '*':
+            # Any other ** acts like a single *
+            while i < n and pattern[i] == '*':
+                i += 1
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            end = i + 1
+            if end < n and pattern[end] in '!^':
+                end += 1
+            if end < n and pattern[end] == ']':
+                end += 1
+            end = pattern.find(']', end)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:end].replace('\\', '\\\\').replace('[', '\\[')
+            if body[:1] in ('!', '^'):
+                body = '^' + body[1:]
+            out.append(f'(?!/)[{body}]')
+            i = end + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return ''.join(out)
+
+
+def parse_pattern(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """Parse one gitignore line into (regex, negated, directories_only); None for blanks and comments."""
+    line = line.rstrip('\r\n')
+    if not line or line.startswith('#'):
+        return None
+    # Trailing spaces are dropped unless escaped
+    while line.endswith(' ') and not line.endswith('\\ '):
+        line = line[:-1]
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    directories_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    anchored = '/' in line
+    return _translate(line.lstrip('/'), anchored), negated, directories_only
+
+
+class _RuleSet:
+    """The patterns of one .gitignore, compiled for files and for directories."""
+
+    def __init__(self, rules: List[Tuple[str, bool, bool]]):
+        self.negated = [negated for _, negated, _ in rules]
+        self.for_dirs = self._combine((i, regex) for i, (regex, _, _) in enumerate(rules))
+        self.for_files = self._combine(
+            (i, regex) for i, (regex, _, directories_only) in enumerate(rules) if not directories_only
+        )
+
+    @staticmethod
+    def _combine(indexed: Iterable[Tuple[int, str]]):
+        # Later patterns first: the first alternative that matches is the deciding one
+        alternatives = [f'(?P<r{i}>{regex})' for i, regex in reversed(list(indexed))]
+        return re.compile('|'.join(alternatives), re.DOTALL) if alternatives else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True (ignored), False (re-included) or None when no pattern matches."""
+        regex = self.for_dirs if is_dir else self.for_files
+        if regex is None:
+            return None
+        m = regex.fullmatch(rel_path)
+        if m is None:
+            return None
+        return not self.negated[int(m.lastgroup[1:])]
+
+
+def _read_lines(path: Path) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+class IgnoreMatcher:
+    """
+    Decides which project paths are ignored. ``patterns`` apply like a
+    root-level .gitignore placed before the project's own; with ``nested``
+    the .gitignore files under ``root`` are loaded on demand.
+    """
+
+    def __init__(self, root: Optional[Path], patterns: Iterable[str] = (), nested: bool = True):
+        self.root = Path(root) if root is not None else None
+        self.nested = nested and self.root is not None
+        lines = list(patterns)
+        if self.root is not None:
+            lines += _read_lines(self.root / GITIGNORE)
+        self._rules: Dict[str, Optional[_RuleSet]] = {"": self._compile(lines)}
+        self._dir_verdicts: Dict[str, bool] = {}
+
+    @staticmethod
+    def _compile(lines: Iterable[str]) -> Optional[_RuleSet]:
+        rules = [rule for rule in map(parse_pattern, lines) if rule]
+        return _RuleSet(rules) if rules else None
+
+    def _rules_for(self, base: str) -> Optional[_RuleSet]:
+        if base not in self._rules:
+            self._rules[base] = self._compile(_read_lines(self.root / base / GITIGNORE)) if self.nested else None
+        return self._rules[base]
+
+    def match(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Whether a path is ignored by its own name, assuming its parent directories are not."""
+        ignored = False
+        start = 0
+        while True:
+            # Rules of each ancestor directory, outermost first; deeper files override
+            rules = self._rules_for(rel_path[:start - 1] if start else "")
+            if rules is not None:
+                verdict = rules.match(rel_path[start:], is_dir)
+                if verdict is not None:
+                    ignored = verdict
+            slash = rel_path.find('/', start)
+            if slash == -1:
+                return ignored
+            start = slash + 1
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Whether a path is ignored, either itself or through an ignored parent directory."""
+        rel_path = rel_path.strip('/')
+        if not rel_path:
+            return False
+        slash = rel_path.find('/')
+        while slash != -1:
+            parent = rel_path[:slash]
+            if parent not in self._dir_verdicts:
+                self._dir_verdicts[parent] = self.match(parent, is_dir=True)
+            if self._dir_verdicts[parent]:
+                return True
+            slash = rel_path.find('/', slash + 1)
+        return self.match(rel_path, is_dir)
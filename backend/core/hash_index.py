@@ -0,0 +1,156 @@
+"""Persistent index of local file hashes.
+
+Project manifests (see core.project_manifest) only re-hash files whose stat
+changed, but the in-memory manifest is gone after a restart, so the first
+scan used to hash the whole project again. The index keeps every project's
+(path, size, mtime_ns, inode) -> sha256 in a SQLite file under
+``~/.agentdocks``; a scan seeded from it costs about one stat per unchanged
+file. Least recently scanned projects are dropped beyond a fixed count.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Set to 0 to keep file hashes in memory only
+HASH_INDEX_ENABLED = os.getenv("AGENTDOCKS_HASH_INDEX", "1") == "1"
+HASH_INDEX_FILE = Path.home() / ".agentdocks" / "hash-index.sqlite3"
+# Projects kept in the index
+HASH_INDEX_MAX_PROJECTS = int(os.getenv("AGENTDOCKS_HASH_INDEX_MAX_PROJECTS", "50"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    project TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (project, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS projects (
+    project TEXT PRIMARY KEY,
+    last_used REAL NOT NULL
+);
+"""
+
+
+class HashIndex:
+    """SQLite-backed file hashes per project root (blocking; call from worker threads)."""
+
+    def __init__(
+        self,
+        enabled: bool = HASH_INDEX_ENABLED,
+        index_file: Path = HASH_INDEX_FILE,
+        max_projects: int = HASH_INDEX_MAX_PROJECTS
+    ):
+        self.enabled = enabled
+        self.index_file = index_file
+        self.max_projects = max_projects
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "rows_written": 0, "errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.index_file), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def load(self, project: str) -> Dict[str, Dict[str, Any]]:
+        """Manifest entries recorded for a project root (empty when unknown or disabled)."""
+        if not self.enabled:
+            return {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    rows = conn.execute(
+                        "SELECT path, size, mtime_ns, inode, hash FROM files WHERE project = ?", (project,)
+                    ).fetchall()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ Failed to read file hash index: {e}")
+            return {}
+
+        self._stats["loads"] += 1
+        return {
+            path: {
+                "size": size,
+                "mtime": mtime_ns // 1_000_000_000,
+                "mtime_ns": mtime_ns,
+                "inode": inode,
+                "hash": digest,
+            }
+            for path, size, mtime_ns, inode, digest in rows
+        }
+
+    def save(
+        self,
+        project: str,
+        manifest: Dict[str, Dict[str, Any]],
+        previous: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Record a project's manifest. Entries carried over unchanged from
+        ``previous`` (the same objects) are not rewritten.
+        """
+        if not self.enabled:
+            return
+        previous = previous or {}
+        changed = [
+            (project, path, entry["size"], entry["mtime_ns"], entry["inode"], entry["hash"])
+            for path, entry in manifest.items()
+            if previous.get(path) is not entry and "mtime_ns" in entry and entry["hash"]
+        ]
+        removed = [(project, path) for path in previous if path not in manifest]
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.executemany("DELETE FROM files WHERE project = ? AND path = ?", removed)
+                        conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", changed)
+                        conn.execute("INSERT OR REPLACE INTO projects VALUES (?, ?)", (project, time.time()))
+                        self._evict(conn)
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            logger.warning(f"⚠️ Failed to update file hash index: {e}")
+            return
+        self._stats["rows_written"] += len(changed)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        stale = [
+            row[0] for row in conn.execute(
+                "SELECT project FROM projects ORDER BY last_used DESC LIMIT -1 OFFSET ?", (self.max_projects,)
+            )
+        ]
+        for project in stale:
+            conn.execute("DELETE FROM files WHERE project = ?", (project,))
+            conn.execute("DELETE FROM projects WHERE project = ?", (project,))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "path": str(self.index_file), **self._stats}
+
+
+_index: Optional[HashIndex] = None
+
+
+def get_hash_index() -> HashIndex:
+    """Get the process-wide file hash index."""
+    global _index
+    if _index is None:
+        _index = HashIndex()
+    return _index
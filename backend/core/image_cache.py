@@ -0,0 +1,249 @@
+"""Cache of project images for Docker sandboxes.
+
+After a project has been copied into a sandbox, the container is committed
+to a local image tagged with the project's content hash and the hash of its
+dependency manifests. A later run against an unchanged project starts from
+that image and skips the copy entirely. Images are evicted least recently
+used first once their total size exceeds the disk budget.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .docker_executor import run_docker
+from .project_manifest import Manifest, build_local_manifest, get_project_manifest
+from .project_utils import load_ignore_matcher
+
+logger = logging.getLogger(__name__)
+
+# Set to 1 to commit synced Docker sandboxes and reuse them on later runs
+IMAGE_CACHE_ENABLED = os.getenv("AGENTDOCKS_IMAGE_CACHE", "0") == "1"
+# Disk budget for cached project images
+IMAGE_CACHE_MAX_GB = float(os.getenv("AGENTDOCKS_IMAGE_CACHE_MAX_GB", "10"))
+IMAGE_CACHE_REPOSITORY = "agentdocks-project"
+IMAGE_CACHE_INDEX = Path.home() / ".agentdocks" / "image-cache.json"
+
+# Files whose content decides which dependencies a project installs
+DEPENDENCY_FILES = [
+    'requirements.txt', 'pyproject.toml', 'poetry.lock', 'Pipfile.lock',
+    'package.json', 'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml',
+    'Cargo.toml', 'Cargo.lock', 'go.mod', 'go.sum',
+]
+
+
+def compute_project_key(project_path: str, base_image: str, manifest: Optional[Manifest] = None) -> str:
+    """
+    Cache key for a project: "<content hash>-<dependency hash>".
+    The content hash covers every file in ``manifest`` (by default a fresh
+    scan of the non-ignored files) and the base image; the dependency hash
+    covers the manifest's entries for DEPENDENCY_FILES.
+    """
+    if manifest is None:
+        root = Path(project_path)
+        manifest = build_local_manifest(root, load_ignore_matcher(root))
+
+    content = hashlib.sha256(base_image.encode('utf-8'))
+    for rel_path in sorted(manifest):
+        digest = manifest[rel_path]["hash"]
+        if not digest:
+            # Unreadable
+            continue
+        content.update(rel_path.encode('utf-8') + b'\0' + digest.encode('utf-8'))
+
+    deps = hashlib.sha256()
+    for name in DEPENDENCY_FILES:
+        if name in manifest:
+            deps.update(name.encode('utf-8') + b'\0' + manifest[name]["hash"].encode('utf-8'))
+
+    return f"{content.hexdigest()[:24]}-{deps.hexdigest()[:12]}"
+
+
+class ImageCache:
+    """Tracks committed project images and evicts them LRU within a disk budget."""
+
+    def __init__(
+        self,
+        enabled: bool = IMAGE_CACHE_ENABLED,
+        max_bytes: int = int(IMAGE_CACHE_MAX_GB * 1024 ** 3),
+        index_file: Path = IMAGE_CACHE_INDEX
+    ):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.index_file = index_file
+        self.client = None
+        self._lock = asyncio.Lock()
+        self._stats = {"hits": 0, "misses": 0, "commits": 0, "evicted": 0}
+
+    async def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._load_index)
+
+    async def _write_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._save_index, index)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+
+    async def _get_client(self):
+        if self.client is None:
+            import docker
+            self.client = await run_docker(docker.from_env)
+        return self.client
+
+    async def project_key(self, project_path: str, base_image: str, manifest: Optional[Manifest] = None) -> str:
+        """
+        Key a project by ``manifest``, e.g. the one a sandbox was synced from,
+        or else by its cached local manifest (rescanned in a worker thread).
+        """
+        if manifest is None:
+            root = Path(project_path)
+            manifest = await get_project_manifest(root, load_ignore_matcher(root))
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, compute_project_key, project_path, base_image, manifest)
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """Return the cached image for a key (and mark it used), or None."""
+        if not self.enabled:
+            return None
+
+        import docker
+
+        tag = f"{IMAGE_CACHE_REPOSITORY}:{key}"
+        async with self._lock:
+            index = await self._read_index()
+            if tag not in index:
+                self._stats["misses"] += 1
+                return None
+
+            client = await self._get_client()
+            try:
+                await run_docker(client.images.get, tag)
+            except docker.errors.ImageNotFound:
+                # Removed outside of AgentDocks
+                del index[tag]
+                await self._write_index(index)
+                self._stats["misses"] += 1
+                return None
+
+            index[tag]["last_used"] = time.time()
+            await self._write_index(index)
+
+        self._stats["hits"] += 1
+        return tag
+
+    async def commit(self, container, key: str, base_image: str, project_path: str) -> Optional[str]:
+        """Commit a synced sandbox container as the image for ``key``."""
+        if not self.enabled:
+            return None
+
+        tag = f"{IMAGE_CACHE_REPOSITORY}:{key}"
+        client = await self._get_client()
+        started = time.monotonic()
+        try:
+            image = await run_docker(lambda: container.commit(
+                repository=IMAGE_CACHE_REPOSITORY,
+                tag=key,
+                conf={"Labels": {
+                    "agentdocks.project-cache": "1",
+                    "agentdocks.project-path": project_path,
+                }}
+            ))
+            base = await run_docker(client.images.get, base_image)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to cache project image: {e}")
+            return None
+
+        # Base layers are shared, so only the project layer counts against the budget
+        size = max(image.attrs.get("Size", 0) - base.attrs.get("Size", 0), 0)
+        async with self._lock:
+            index = await self._read_index()
+            now = time.time()
+            stale = [
+                other for other, entry in index.items()
+                if other != tag
+                and entry.get("project_path") == project_path
+                and entry.get("base_image") == base_image
+            ]
+            index[tag] = {
+                "project_path": project_path,
+                "base_image": base_image,
+                "size": size,
+                "created_at": now,
+                "last_used": now,
+            }
+            # Older images of the same project can never match again
+            for other in stale:
+                if await self._remove(other):
+                    del index[other]
+            await self._evict(index, keep=tag)
+            await self._write_index(index)
+
+        self._stats["commits"] += 1
+        logger.info(f"📦 Cached project image {tag} ({size / 1024 ** 2:.1f} MB, {time.monotonic() - started:.1f}s)")
+        return tag
+
+    async def _evict(self, index: Dict[str, Dict[str, Any]], keep: str) -> None:
+        """Remove least recently used images until the index fits the budget."""
+        total = sum(entry.get("size", 0) for entry in index.values())
+        for tag in sorted(index, key=lambda t: index[t].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if tag == keep:
+                continue
+            if await self._remove(tag):
+                total -= index.pop(tag).get("size", 0)
+
+    async def _remove(self, tag: str) -> bool:
+        """Delete a cached image; False if it is still in use."""
+        import docker
+
+        client = await self._get_client()
+        try:
+            await run_docker(lambda: client.images.remove(tag, noprune=False))
+        except docker.errors.ImageNotFound:
+            pass
+        except Exception as e:
+            logger.debug(f"Could not evict {tag}: {e}")
+            return False
+        self._stats["evicted"] += 1
+        return True
+
+    async def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current cache usage."""
+        index = await self._read_index()
+        return {
+            "enabled": self.enabled,
+            "images": len(index),
+            "size_bytes": sum(entry.get("size", 0) for entry in index.values()),
+            "max_bytes": self.max_bytes,
+            **self._stats,
+        }
+
+
+_cache: Optional[ImageCache] = None
+
+
+def get_image_cache() -> ImageCache:
+    """Get the process-wide project image cache."""
+    global _cache
+    if _cache is None:
+        _cache = ImageCache()
+    return _cache
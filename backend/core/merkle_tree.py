@@ -0,0 +1,158 @@
+"""Merkle-tree change detection inside the sandbox.
+
+Flat change detection hashes every workspace file in the sandbox and ships
+all the hashes back, then compares them one by one. Here the baseline
+(path, size, mtime, hash) is uploaded once and a script in the sandbox
+compares it with the workspace in a single pass:
+
+- files whose size and mtime match the baseline reuse its hash, so only
+  touched files are read;
+- both sides are folded into directory hashes, and the comparison walks
+  down from the root only where the hashes differ, skipping unchanged
+  subtrees with one comparison;
+- only the changed paths come back, in the same "type<TAB>path" records as
+  overlay change listings.
+
+The script needs python3 in the sandbox; callers fall back to flat hashing
+without it.
+"""
+
+import shlex
+from typing import Dict, List, Tuple
+
+# Where the baseline is kept inside the sandbox
+BASELINE_FILE = "/tmp/.agentdocks_baseline"
+
+_TREE_DIFF_SCRIPT = r'''
+import hashlib, os, sys
+
+root, state = os.fsencode(sys.argv[1]), sys.argv[2]
+base = {}
+with open(state, 'rb') as f:
+    for record in f.read().split(b'\0'):
+        if record:
+            digest, size, mtime, path = record.split(b'\t', 3)
+            base[path] = (digest, int(size) if size else None, int(mtime) if mtime else None)
+
+def file_hash(path):
+    h = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest().encode()
+
+current = {}
+def scan(directory, prefix):
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        rel = prefix + entry.name
+        if entry.is_dir(follow_symlinks=False):
+            scan(entry.path, rel + b'/')
+        elif entry.is_file(follow_symlinks=False):
+            st = entry.stat(follow_symlinks=False)
+            known = base.get(rel)
+            if known and known[1] == st.st_size and known[2] == int(st.st_mtime):
+                current[rel] = known[0]
+            else:
+                digest = file_hash(entry.path)
+                if digest is not None:
+                    current[rel] = digest
+scan(root, b'')
+
+def tree(files):
+    children = {b'': {}}
+    for path, digest in files.items():
+        parent, _, name = path.rpartition(b'/')
+        children.setdefault(parent, {})[name] = (False, digest)
+        # Register missing ancestors up to the first one already known
+        while parent:
+            grand, _, dirname = parent.rpartition(b'/')
+            siblings = children.setdefault(grand, {})
+            if dirname in siblings:
+                break
+            siblings[dirname] = (True, None)
+            parent = grand
+    hashes = {}
+    for directory in sorted(children, key=lambda d: -d.count(b'/') - (d != b'')):
+        h = hashlib.sha256()
+        for name in sorted(children[directory]):
+            is_dir, digest = children[directory][name]
+            child = directory + b'/' + name if directory else name
+            h.update(name + (b'/' + hashes[child] if is_dir else b'\0' + digest) + b'\n')
+        hashes[directory] = h.hexdigest().encode()
+    return children, hashes
+
+cur_children, cur_hashes = tree(current)
+base_children, base_hashes = tree({path: known[0] for path, known in base.items()})
+out = sys.stdout.buffer
+prefix = root.rstrip(b'/') + b'/'
+
+def emit(kind, children, directory, name, is_dir):
+    path = directory + b'/' + name if directory else name
+    if not is_dir:
+        out.write(kind + b'\t' + prefix + path + b'\0')
+        return
+    for child, (child_is_dir, _) in children.get(path, {}).items():
+        emit(kind, children, path, child, child_is_dir)
+
+def compare(directory):
+    if cur_hashes.get(directory) == base_hashes.get(directory):
+        return
+    cur, old = cur_children.get(directory, {}), base_children.get(directory, {})
+    for name in set(cur) | set(old):
+        now, before = cur.get(name), old.get(name)
+        if now and before and now[0] and before[0]:
+            compare(directory + b'/' + name if directory else name)
+        elif now and before and not now[0] and not before[0]:
+            if now[1] != before[1]:
+                emit(b'modified', cur_children, directory, name, False)
+        else:
+            if before:
+                emit(b'deleted', base_children, directory, name, before[0])
+            if now:
+                emit(b'created', cur_children, directory, name, now[0])
+compare(b'')
+'''
+
+
+def baseline_records(
+    file_hashes: Dict[str, str],
+    stats: Dict[str, Tuple[int, int]],
+    root: str = "/workspace"
+) -> bytes:
+    """
+    Serialize a baseline ({sandbox path: hash} plus optional {sandbox path:
+    (size, mtime)}) as NUL-terminated "hash<TAB>size<TAB>mtime<TAB>rel_path" records.
+    """
+    prefix = root.rstrip('/') + '/'
+    records = []
+    for path, digest in file_hashes.items():
+        if not digest or not path.startswith(prefix):
+            continue
+        size, mtime = stats.get(path, ("", ""))
+        records.append(f"{digest}\t{size}\t{mtime}\t{path[len(prefix):]}\0")
+    return "".join(records).encode('utf-8', errors='surrogateescape')
+
+
+def tree_diff_command(root: str = "/workspace", baseline_file: str = BASELINE_FILE) -> str:
+    """One command printing the changes between the uploaded baseline and root."""
+    return (
+        f"python3 -c {shlex.quote(_TREE_DIFF_SCRIPT)} "
+        f"{shlex.quote(root)} {shlex.quote(baseline_file)}"
+    )
+
+
+def parse_changes(output: str) -> List[Tuple[str, str]]:
+    """Parse NUL-terminated "type<TAB>path" records into (path, type) pairs."""
+    changes = []
+    for record in output.split('\0'):
+        change_type, _, path = record.partition('\t')
+        if path:
+            changes.append((path, change_type))
+    return changes
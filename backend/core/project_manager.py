@@ -1,16 +1,28 @@
 """Manages project lifecycle: open, sync, track changes, apply."""
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import difflib
-from .sandbox import BaseSandbox
+import shlex
+from .sandbox import BaseSandbox, ProgressCallback
 from .project_utils import (
-    load_gitignore_patterns,
-    create_backup,
-    should_ignore
+    load_ignore_matcher,
+    create_backup
 )
+from .project_manifest import (
+    Manifest, build_sandbox_manifest, diff_manifests, get_project_manifest, is_symlink_entry
+)
+from .git_changes import (
+    BASELINE_GIT_DIR, GIT_CHANGES_ENABLED, NO_GIT_EXIT_CODE, NO_SPACE_EXIT_CODE,
+    baseline_command, is_git_project, parse_status, status_command
+)
+from .merkle_tree import BASELINE_FILE, baseline_records, parse_changes, tree_diff_command
+from .dependency_cache import install_command, PREINSTALL_TIMEOUT
 from models.schemas import FileChange, ProjectTreeNode
 
+# Paths per `rm` command when deleting files removed locally
+REMOVE_BATCH_SIZE = 500
+
 class ProjectManager:
     """Manages project state and change tracking."""
 
@@ -18,94 +30,352 @@ class ProjectManager:
         self.sandbox = sandbox
         self.project_path = Path(project_path)
         self.project_name = self.project_path.name
-        self.ignore_patterns = load_gitignore_patterns(self.project_path)
+        self.ignore_matcher = load_ignore_matcher(self.project_path)
         self.file_hashes: Dict[str, str] = {}  # Track original hashes
+        # (size, mtime) of baseline files where known, so unchanged ones need no re-hash
+        self.baseline_stats: Dict[str, Tuple[int, int]] = {}
+        # Whether the sandbox holds the current baseline for tree diffs (see core.merkle_tree)
+        self._baseline_uploaded = False
+        self._tree_diff_supported = True
+        # Whether the sandbox holds a git baseline repository (see core.git_changes)
+        self._git_baseline = False
+        # Manifests (see core.project_manifest) kept between syncs
+        self.local_manifest: Optional[Manifest] = None
+        self.sandbox_manifest: Optional[Manifest] = None
+        # Set while the sandbox holds exactly the uploaded manifest
+        self._uploaded_manifest: Optional[Manifest] = None
+        # Set by the agent runner while a run is using the sandbox
+        self.run_active = False
 
-    async def copy_to_sandbox(self) -> bool:
+    async def copy_to_sandbox(self, progress_callback: Optional[ProgressCallback] = None) -> bool:
         """Copy project to sandbox /workspace/."""
-        sandbox_path = "/workspace"
-        return await self.sandbox.copy_directory(
-            str(self.project_path),
-            sandbox_path,
-            self.ignore_patterns
-        )
+        # Overlay-mounted workspaces already show the project, nothing to copy;
+        # neither do sandboxes started from a cached project image
+        if self.sandbox.has_project_mount or self.sandbox.project_preloaded:
+            return True
+
+        # The manifest cached by /api/project/open only needs a re-stat here
+        manifest = await get_project_manifest(self.project_path, self.ignore_matcher)
+        if not await self.sandbox.copy_files(
+            str(self.project_path), list(manifest), "/workspace", progress_callback
+        ):
+            return False
+        self.local_manifest = manifest
+        self.sandbox_manifest = dict(manifest)
+        self._uploaded_manifest = manifest
+        return True
+
+    async def sync(
+        self,
+        reset: bool = True,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Dict[str, int]:
+        """
+        Bring the sandbox up to date with the local project, transferring only
+        added or changed files (in one archive) and deleting removed ones.
+        reset=True makes every non-ignored sandbox file match the local tree
+        again (agent edits that were not applied are discarded); reset=False
+        only pushes local files changed since the last sync and keeps the
+        agent's edits. Returns {"uploaded": n, "deleted": n}.
+        """
+        if reset:
+            # Fresh cwd and environment, like a new sandbox
+            await self.sandbox.reset_shell()
+
+        if self.sandbox.has_project_mount:
+            # Local edits show through the mount already
+            if reset and not await self.sandbox.reset_workspace():
+                raise RuntimeError("The mounted workspace cannot be reset in place")
+            return {"uploaded": 0, "deleted": 0}
+
+        self._uploaded_manifest = None
+        previous_local = self.local_manifest
+        local = await get_project_manifest(self.project_path, self.ignore_matcher)
+
+        if reset:
+            # What the sandbox actually holds; only files that look touched get hashed
+            target = await build_sandbox_manifest(
+                self.sandbox,
+                "/workspace",
+                self.sandbox_manifest,
+                include=lambda rel_path: not self._is_ignored(f"/workspace/{rel_path}")
+            )
+        elif previous_local is not None:
+            # The local state pushed last time; agent edits to other files stay
+            target = previous_local
+        else:
+            # Not synced yet: the state the sandbox started from
+            target = {
+                path[len("/workspace/"):]: {"hash": digest}
+                for path, digest in self.file_hashes.items()
+                if not self._is_ignored(path)
+            }
+
+        uploads, deletions = diff_manifests(local, target)
+        if uploads and not await self.sandbox.copy_files(
+            str(self.project_path), uploads, "/workspace", progress_callback
+        ):
+            raise RuntimeError("Failed to upload changed files")
+        if deletions:
+            await self._remove_files(deletions)
+
+        sandbox_manifest = dict(target if reset else self.sandbox_manifest or {})
+        for path in uploads:
+            sandbox_manifest[path] = local[path]
+        for path in deletions:
+            sandbox_manifest.pop(path, None)
+        self.sandbox_manifest = sandbox_manifest
+        self.local_manifest = local
+
+        if not reset:
+            # The pushed local state is the new baseline for these paths
+            for path in uploads:
+                if is_symlink_entry(local[path]):
+                    # Sandbox scans do not hash links
+                    self.file_hashes.pop(f"/workspace/{path}", None)
+                    self.baseline_stats.pop(f"/workspace/{path}", None)
+                    continue
+                self.file_hashes[f"/workspace/{path}"] = local[path]["hash"]
+                self.baseline_stats[f"/workspace/{path}"] = (local[path]["size"], local[path]["mtime"])
+            for path in deletions:
+                self.file_hashes.pop(f"/workspace/{path}", None)
+                self.baseline_stats.pop(f"/workspace/{path}", None)
+            self._baseline_uploaded = False
+            # The git baseline would now also absorb the agent's edits
+            self._git_baseline = False
+
+        return {"uploaded": len(uploads), "deleted": len(deletions)}
+
+    async def _remove_files(self, rel_paths: List[str]) -> None:
+        """Delete project files from the sandbox, many per command."""
+        for start in range(0, len(rel_paths), REMOVE_BATCH_SIZE):
+            batch = rel_paths[start:start + REMOVE_BATCH_SIZE]
+            # Outside the agent's shell, so a running command does not hold this up
+            _, stderr, code = await self.sandbox.run_command(
+                "rm -f -- " + " ".join(shlex.quote(f"/workspace/{path}") for path in batch)
+            )
+            if code != 0:
+                raise RuntimeError(f"Failed to delete removed files: {stderr.strip()}")
+
+    async def install_dependencies(self, timeout: float = PREINSTALL_TIMEOUT) -> Optional[Tuple[str, str, int]]:
+        """Install the project's declared dependencies in the sandbox. None if it declares none."""
+        command = install_command(self.project_path)
+        if command is None:
+            return None
+        # Installs may write into /workspace, so the baseline must come from the sandbox
+        self._uploaded_manifest = None
+        # Subshell: the command may `exit`, which must not end a persistent shell
+        return await self.sandbox.execute_bash(f"(cd /workspace && {command})", timeout=timeout)
+
+    async def cache_project_image(self) -> Optional[str]:
+        """Save the freshly synced sandbox so the next run can skip the copy."""
+        if self.sandbox.project_preloaded:
+            return None
+        try:
+            # Keyed by what was uploaded, not by the project as it is now
+            return await self.sandbox.save_project_image(self.local_manifest)
+        except Exception as e:
+            print(f"Warning: Failed to cache project image: {e}")
+            return None
 
     async def snapshot_hashes(self):
         """Snapshot all file hashes for change detection."""
-        files = await self.sandbox.list_directory_recursive("/workspace")
-        for file_info in files:
-            if file_info['type'] == 'file':
-                path = file_info['path']
-                hash_val = await self.sandbox.get_file_hash(path)
-                if hash_val:
-                    self.file_hashes[path] = hash_val
+        self._baseline_uploaded = False
+        self._git_baseline = False
+        self.baseline_stats = {}
+        # Overlay-mounted workspaces report changes from the upper layer instead
+        if self.sandbox.has_project_mount:
+            self.file_hashes = {}
+            return
+        if GIT_CHANGES_ENABLED and is_git_project(self.project_path):
+            await self._snapshot_git_baseline()
+        if self._uploaded_manifest is not None:
+            # Freshly uploaded: the local hashes are the sandbox's, no round trip needed
+            files = {
+                rel_path: entry for rel_path, entry in self._uploaded_manifest.items()
+                if not is_symlink_entry(entry)
+            }
+            self.file_hashes = {f"/workspace/{rel_path}": entry["hash"] for rel_path, entry in files.items()}
+            # Uploads keep size and (whole-second) mtime
+            self.baseline_stats = {
+                f"/workspace/{rel_path}": (entry["size"], entry["mtime"])
+                for rel_path, entry in files.items()
+            }
+            return
+        self.file_hashes = await self.sandbox.get_file_hashes(root="/workspace")
+
+    async def fork(self, snapshot_id: Optional[str] = None) -> "ProjectManager":
+        """
+        Fork the sandbox (see BaseSandbox.fork) into an isolated copy that
+        reports changes against the same baseline as this manager.
+        """
+        sandbox = await self.sandbox.fork(snapshot_id)
+        forked = ProjectManager(sandbox, str(self.project_path))
+        if self.sandbox.has_project_mount:
+            # Forks are plain copies; their baseline is the mounted project as-is
+            # (the files a copy sync would have uploaded, so ignored ones stay out)
+            manifest = await get_project_manifest(self.project_path, self.ignore_matcher)
+            forked.file_hashes = {
+                f"/workspace/{rel_path}": entry["hash"]
+                for rel_path, entry in manifest.items()
+                if not is_symlink_entry(entry)
+            }
+        else:
+            forked.file_hashes = dict(self.file_hashes)
+            forked.baseline_stats = dict(self.baseline_stats)
+        return forked
 
     async def detect_changes(self) -> List[FileChange]:
         """Detect all changes: created, modified, deleted."""
-        changes = []
-        current_files_info = await self.sandbox.list_directory_recursive("/workspace")
-        current_paths = {f['path'] for f in current_files_info if f['type'] == 'file'}
+        workspace_changes = await self.sandbox.list_workspace_changes()
+        if workspace_changes is not None:
+            # The overlay shows everything, including ignored files the agent touched
+            return await self._build_changes(
+                (change['path'], change['type'])
+                for change in workspace_changes
+                if not self._is_ignored(change['path'])
+            )
+
+        if self._git_baseline:
+            changed = await self._git_changes()
+            if changed is not None:
+                return await self._build_changes(changed)
+
+        changed = await self._tree_changes()
+        if changed is not None:
+            return await self._build_changes(changed)
+
+        current_hashes = await self.sandbox.get_file_hashes(root="/workspace")
+        changed = []
 
         # Detect modified and deleted
         for orig_path, orig_hash in self.file_hashes.items():
-            if orig_path in current_paths:
-                # Check if modified
-                current_hash = await self.sandbox.get_file_hash(orig_path)
-                if current_hash and current_hash != orig_hash:
-                    # Generate diff
-                    try:
-                        orig_content = await self._read_local_file(orig_path)
-                        new_content = await self.sandbox.read_file(orig_path)
-                        diff = self._generate_diff(orig_path, orig_content, new_content)
-
-                        changes.append(FileChange(
-                            path=orig_path.replace('/workspace/', ''),
-                            type='modified',
-                            original_content=orig_content,
-                            new_content=new_content,
-                            diff=diff
-                        ))
-                    except Exception as e:
-                        print(f"Error processing modified file {orig_path}: {e}")
+            if orig_path in current_hashes:
+                if current_hashes[orig_path] != orig_hash:
+                    changed.append((orig_path, 'modified'))
             else:
-                # File deleted
-                try:
-                    orig_content = await self._read_local_file(orig_path)
-                    changes.append(FileChange(
-                        path=orig_path.replace('/workspace/', ''),
-                        type='deleted',
-                        original_content=orig_content,
-                        new_content=None,
-                        diff=None
-                    ))
-                except Exception as e:
-                    print(f"Error processing deleted file {orig_path}: {e}")
+                changed.append((orig_path, 'deleted'))
 
         # Detect created files
-        for path in current_paths:
+        for path in current_hashes:
             if path not in self.file_hashes:
-                try:
-                    new_content = await self.sandbox.read_file(path)
-                    changes.append(FileChange(
-                        path=path.replace('/workspace/', ''),
-                        type='created',
-                        original_content=None,
-                        new_content=new_content,
-                        diff=None
-                    ))
-                except Exception as e:
-                    print(f"Error processing created file {path}: {e}")
+                changed.append((path, 'created'))
 
+        return await self._build_changes(changed)
+
+    async def _snapshot_git_baseline(self) -> None:
+        """Record the workspace in a baseline git repository in the sandbox."""
+        try:
+            _, stderr, code = await self.sandbox.run_command(baseline_command())
+        except Exception as e:
+            print(f"Warning: Failed to create git baseline: {e}")
+            return
+        if code == NO_GIT_EXIT_CODE:
+            print("Warning: No git in the sandbox, tracking changes by hashing")
+        elif code == NO_SPACE_EXIT_CODE:
+            print(
+                f"Warning: Not enough free space for the git baseline in {BASELINE_GIT_DIR}, "
+                "falling back to the tree diff"
+            )
+        elif code != 0:
+            print(f"Warning: Failed to create git baseline (exit {code}): {stderr.strip()[:200]}")
+        else:
+            self._git_baseline = True
+
+    async def _git_changes(self) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+        """(path, type, old_path) triples from git against the baseline repository, or None."""
+        try:
+            stdout, stderr, code = await self.sandbox.run_command(status_command())
+        except Exception as e:
+            print(f"Warning: git status failed, falling back to hashing: {e}")
+            return None
+        if code != 0:
+            # E.g. the agent cleared /tmp; the hash baseline still holds
+            self._git_baseline = False
+            print(f"Warning: git status failed (exit {code}), falling back to hashing: {stderr.strip()[:200]}")
+            return None
+        return parse_status(stdout)
+
+    async def _tree_changes(self) -> Optional[List[Tuple[str, str]]]:
+        """
+        (path, type) pairs from a Merkle-tree diff run in the sandbox, which
+        only transfers changed paths. None when the sandbox cannot run it.
+        """
+        if not self._tree_diff_supported:
+            return None
+        try:
+            if not self._baseline_uploaded:
+                # Sent once per baseline; later detections only run the diff
+                records = baseline_records(self.file_hashes, self.baseline_stats)
+                if not await self.sandbox.write_file(BASELINE_FILE, records):
+                    raise RuntimeError("Failed to upload the change-detection baseline")
+                self._baseline_uploaded = True
+            stdout, stderr, code = await self.sandbox.run_command(tree_diff_command())
+        except Exception as e:
+            print(f"Warning: Tree diff failed, falling back to hashing every file: {e}")
+            return None
+
+        if code == 127:
+            # No python3 in the image; don't try again for this sandbox
+            self._tree_diff_supported = False
+            print("Warning: Tree diff needs python3 in the sandbox, hashing every file instead")
+            return None
+        if code != 0:
+            # E.g. the agent cleared /tmp: upload the baseline again next time
+            self._baseline_uploaded = False
+            print(f"Warning: Tree diff failed (exit {code}), hashing every file instead: {stderr.strip()[:200]}")
+            return None
+        return parse_changes(stdout)
+
+    async def _build_changes(self, changed) -> List[FileChange]:
+        """Build FileChange entries (with contents and diffs) for (path, type[, old_path]) tuples."""
+        changes = []
+        for path, change_type, *old_path in changed:
+            try:
+                changes.append(await self._build_change(path, change_type, *old_path))
+            except Exception as e:
+                print(f"Error processing {change_type} file {path}: {e}")
         return changes
 
-    def _generate_diff(self, path: str, orig: str, new: str) -> str:
+    async def _build_change(self, path: str, change_type: str, old_path: Optional[str] = None) -> FileChange:
+        """Read original/new content for one changed sandbox path (renames: from old_path)."""
+        orig_content = None
+        new_content = None
+        diff = None
+
+        if change_type in ('modified', 'deleted'):
+            orig_content = await self._read_local_file(path)
+        elif change_type == 'renamed':
+            orig_content = await self._read_local_file(old_path)
+        if change_type in ('modified', 'created', 'renamed'):
+            new_content = await self.sandbox.read_file(path)
+        if change_type == 'modified':
+            diff = self._generate_diff(path, orig_content, new_content)
+        elif change_type == 'renamed' and orig_content != new_content:
+            diff = self._generate_diff(path, orig_content, new_content, old_path=old_path)
+
+        return FileChange(
+            path=path.replace('/workspace/', ''),
+            type=change_type,
+            old_path=old_path.replace('/workspace/', '') if old_path else None,
+            original_content=orig_content,
+            new_content=new_content,
+            diff=diff
+        )
+
+    def _is_ignored(self, sandbox_path: str) -> bool:
+        """Check whether a sandbox path (or a directory above it) is ignored."""
+        rel_path = sandbox_path.replace('/workspace/', '')
+        return self.ignore_matcher.is_ignored(rel_path)
+
+    def _generate_diff(self, path: str, orig: str, new: str, old_path: Optional[str] = None) -> str:
         """Generate unified diff."""
         orig_lines = orig.splitlines(keepends=True)
         new_lines = new.splitlines(keepends=True)
         diff = difflib.unified_diff(
             orig_lines,
             new_lines,
-            fromfile=f"a/{path}",
+            fromfile=f"a/{old_path or path}",
             tofile=f"b/{path}",
             lineterm=''
         )
@@ -149,6 +419,15 @@ class ProjectManager:
                         local_path.unlink()
                         applied.append(change.path)
 
+                elif change.type == 'renamed':
+                    local_path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(local_path, 'w') as f:
+                        f.write(change.new_content)
+                    old_local_path = self.project_path / change.old_path
+                    if old_local_path.exists() and old_local_path != local_path:
+                        old_local_path.unlink()
+                    applied.append(change.path)
+
             except Exception as e:
                 failed.append({'path': change.path, 'error': str(e)})
 
@@ -0,0 +1,211 @@
+"""File manifests for incremental project sync.
+
+A manifest maps a project-relative path to {size, mtime, hash}. Local
+manifests are rebuilt by stat-ing the tree and re-hashing only files whose
+size or mtime changed since the previous scan; sandbox manifests are built
+the same way from one `find` listing. Diffing two manifests gives the files
+to upload and the files to delete.
+
+The local manifest of each open project is cached, so opening a project,
+uploading it and taking the change-detection baseline share one walk and
+one round of hashing; later scans only re-stat the tree. Local hashes are
+also persisted (core.hash_index), so that holds across restarts too.
+"""
+
+import asyncio
+import os
+import stat
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .hash_index import get_hash_index
+from .project_utils import compute_file_hash, iter_project_files, IgnoreRules, MAX_PROJECT_SIZE_MB, MAX_FILES
+
+# relative path -> {"size": int, "mtime": int, "hash": sha256 hex}
+# (local entries also carry "mtime_ns" and "inode")
+Manifest = Dict[str, Dict[str, Any]]
+
+# Symlinks are synced as links: their "hash" is the link target after this
+# prefix. Sandbox scans only hash regular files, so baselines leave them out.
+SYMLINK_HASH_PREFIX = "symlink:"
+
+# Projects whose local manifest is kept in memory
+MANIFEST_CACHE_SIZE = 8
+
+
+class ProjectTooLarge(ValueError):
+    """A project exceeds MAX_PROJECT_SIZE_MB or MAX_FILES."""
+
+
+def is_symlink_entry(entry: Dict[str, Any]) -> bool:
+    """Whether a manifest entry stands for a symlink rather than a regular file."""
+    return entry["hash"].startswith(SYMLINK_HASH_PREFIX)
+
+
+def _unchanged(entry: Optional[Dict[str, Any]], size: Optional[int], mtime: Optional[float]) -> bool:
+    # Archives keep whole-second mtimes, so compare at that resolution
+    return (
+        entry is not None
+        and size is not None
+        and mtime is not None
+        and entry["size"] == size
+        and entry["mtime"] == int(mtime)
+    )
+
+
+def _local_unchanged(entry: Optional[Dict[str, Any]], stat_result: os.stat_result) -> bool:
+    # Locally the full stat is available: nanosecond mtime and inode catch
+    # same-second edits and files replaced by renames
+    return (
+        entry is not None
+        and entry["size"] == stat_result.st_size
+        and entry.get("mtime_ns") == stat_result.st_mtime_ns
+        and entry.get("inode") == stat_result.st_ino
+    )
+
+
+def build_local_manifest(
+    project_path: Path,
+    ignore: IgnoreRules,
+    previous: Optional[Manifest] = None,
+    check_limits: bool = False
+) -> Manifest:
+    """
+    Scan a project (blocking), reusing hashes from ``previous`` for unchanged
+    files. With check_limits, raise ProjectTooLarge as soon as the stat walk
+    passes the size or file limits, before anything is hashed.
+    """
+    previous = previous or {}
+    max_bytes = MAX_PROJECT_SIZE_MB * 1024 * 1024
+    stats = []
+    total_size = 0
+    for file_path, rel_path in iter_project_files(project_path, ignore):
+        try:
+            # Not following links: they are uploaded as links, see SYMLINK_HASH_PREFIX
+            stat_result = os.lstat(file_path)
+        except OSError:
+            continue
+        if not (stat.S_ISREG(stat_result.st_mode) or stat.S_ISLNK(stat_result.st_mode)):
+            # FIFOs, sockets and devices: hashing one would block on open()
+            continue
+        stats.append((file_path, Path(rel_path).as_posix(), stat_result))
+        total_size += stat_result.st_size
+        if check_limits and total_size > max_bytes:
+            raise ProjectTooLarge(
+                f"Project too large: over {MAX_PROJECT_SIZE_MB}MB (max {MAX_PROJECT_SIZE_MB}MB)"
+            )
+        if check_limits and len(stats) > MAX_FILES:
+            raise ProjectTooLarge(f"Too many files: over {MAX_FILES} (max {MAX_FILES})")
+
+    manifest: Manifest = {}
+    for file_path, rel_path, stat_result in stats:
+        entry = previous.get(rel_path)
+        if not _local_unchanged(entry, stat_result):
+            if stat.S_ISLNK(stat_result.st_mode):
+                try:
+                    digest = SYMLINK_HASH_PREFIX + os.readlink(file_path)
+                except OSError:
+                    continue
+            else:
+                digest = compute_file_hash(file_path)
+            entry = {
+                "size": stat_result.st_size,
+                "mtime": int(stat_result.st_mtime),
+                "mtime_ns": stat_result.st_mtime_ns,
+                "inode": stat_result.st_ino,
+                "hash": digest,
+            }
+        manifest[rel_path] = entry
+    return manifest
+
+
+def manifest_totals(manifest: Manifest) -> Tuple[int, int]:
+    """Total size in bytes and file count of a manifest."""
+    return sum(entry["size"] for entry in manifest.values()), len(manifest)
+
+
+_manifests: "OrderedDict[str, Manifest]" = OrderedDict()
+_manifest_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def get_project_manifest(
+    project_path: Path,
+    ignore: IgnoreRules,
+    check_limits: bool = False
+) -> Manifest:
+    """
+    Rescan a project in a worker thread, re-hashing only files changed since
+    the cached manifest (or, on the first scan in this process, since the
+    persistent hash index), and cache the result. Scans of one project run one
+    at a time, so a caller arriving mid-scan only re-stats afterwards.
+    """
+    key = str(Path(project_path).resolve())
+    lock = _manifest_locks.setdefault(key, asyncio.Lock())
+
+    def scan(previous: Optional[Manifest]) -> Manifest:
+        index = get_hash_index()
+        if previous is None:
+            previous = index.load(key)
+        manifest = build_local_manifest(Path(key), ignore, previous, check_limits)
+        index.save(key, manifest, previous)
+        return manifest
+
+    async with lock:
+        loop = asyncio.get_event_loop()
+        manifest = await loop.run_in_executor(None, scan, _manifests.get(key))
+        _manifests[key] = manifest
+        _manifests.move_to_end(key)
+        while len(_manifests) > MANIFEST_CACHE_SIZE:
+            evicted, _ = _manifests.popitem(last=False)
+            _manifest_locks.pop(evicted, None)
+    return manifest
+
+
+async def build_sandbox_manifest(
+    sandbox,
+    root: str,
+    previous: Optional[Manifest] = None,
+    include=None
+) -> Manifest:
+    """
+    Scan a sandbox directory with one listing, hashing (in one more exec) only
+    files whose size or mtime differ from ``previous``. ``include`` filters
+    relative paths.
+    """
+    previous = previous or {}
+    prefix = root.rstrip('/') + '/'
+    manifest: Manifest = {}
+    to_hash = {}
+    for item in await sandbox.list_directory_recursive(root):
+        if item['type'] != 'file' or not item['path'].startswith(prefix):
+            continue
+        rel_path = item['path'][len(prefix):]
+        if include is not None and not include(rel_path):
+            continue
+        entry = previous.get(rel_path)
+        if _unchanged(entry, item['size'], item['mtime']):
+            manifest[rel_path] = entry
+        else:
+            to_hash[item['path']] = (rel_path, item['size'], item['mtime'])
+
+    if to_hash:
+        hashes = await sandbox.get_file_hashes(paths=list(to_hash))
+        for path, (rel_path, size, mtime) in to_hash.items():
+            if path in hashes:
+                manifest[rel_path] = {
+                    "size": size,
+                    "mtime": int(mtime) if mtime is not None else None,
+                    "hash": hashes[path],
+                }
+    return manifest
+
+
+def diff_manifests(source: Manifest, target: Manifest) -> Tuple[List[str], List[str]]:
+    """Paths to copy from source to target (added or changed) and to delete from target."""
+    changed = [
+        path for path, entry in source.items()
+        if path not in target or target[path]["hash"] != entry["hash"]
+    ]
+    removed = [path for path in target if path not in source]
+    return changed, removed
@@ -3,16 +3,18 @@
 import os
 import shutil
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 import hashlib
 
+from .gitignore import IgnoreMatcher
+
 # Security constants
 MAX_PROJECT_SIZE_MB = 500
 MAX_FILE_SIZE_MB = 10
 MAX_FILES = 10000
 
-# Default ignore patterns (respect .gitignore + add common)
+# Default ignore patterns (gitignore syntax, applied before the project's .gitignore files)
 DEFAULT_IGNORE_PATTERNS = [
     '.git', '.svn', '.hg',
     'node_modules', 'venv', 'env', '__pycache__',
@@ -52,62 +54,32 @@ def validate_project_path(project_path: str) -> Tuple[bool, str]:
 
     return True, ""
 
-def get_project_size(project_path: Path, ignore_patterns: List[str]) -> Tuple[int, int]:
+IgnoreRules = Union[IgnoreMatcher, List[str]]
+
+def iter_project_files(project_path: Path, ignore: IgnoreRules) -> Iterator[Tuple[Path, str]]:
     """
-    Calculate project size and file count.
-    Returns: (size_in_bytes, file_count)
+    Walk a project, pruning ignored directories before descending.
+    Yields (file_path, relative_path) with '/'-separated relative paths.
     """
-    total_size = 0
-    file_count = 0
+    if not isinstance(ignore, IgnoreMatcher):
+        ignore = IgnoreMatcher(project_path, ignore)
 
     for root, dirs, files in os.walk(project_path):
+        rel_root = os.path.relpath(root, project_path)
+        prefix = "" if rel_root == "." else rel_root.replace(os.sep, '/') + '/'
+
         # Filter ignored directories in-place
-        dirs[:] = [d for d in dirs if not should_ignore(d, ignore_patterns)]
+        dirs[:] = [d for d in dirs if not ignore.match(prefix + d, is_dir=True)]
 
         for file in files:
-            if should_ignore(file, ignore_patterns):
+            rel_path = prefix + file
+            if ignore.match(rel_path):
                 continue
+            yield Path(root) / file, rel_path
 
-            file_path = Path(root) / file
-            if file_path.is_file():
-                try:
-                    total_size += file_path.stat().st_size
-                    file_count += 1
-                except OSError:
-                    continue
-
-    return total_size, file_count
-
-def should_ignore(name: str, patterns: List[str]) -> bool:
-    """Check if file/dir should be ignored."""
-    for pattern in patterns:
-        if pattern.startswith('*'):
-            if name.endswith(pattern[1:]):
-                return True
-        elif pattern.endswith('*'):
-            if name.startswith(pattern[:-1]):
-                return True
-        else:
-            if name == pattern:
-                return True
-    return False
-
-def load_gitignore_patterns(project_path: Path) -> List[str]:
-    """Load patterns from .gitignore if exists."""
-    gitignore_path = project_path / '.gitignore'
-    patterns = DEFAULT_IGNORE_PATTERNS.copy()
-
-    if gitignore_path.exists():
-        try:
-            with open(gitignore_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        patterns.append(line)
-        except Exception:
-            pass
-
-    return patterns
+def load_ignore_matcher(project_path: Path) -> IgnoreMatcher:
+    """Default patterns plus the project's .gitignore files, compiled."""
+    return IgnoreMatcher(project_path, DEFAULT_IGNORE_PATTERNS)
 
 def detect_project_type(project_path: Path) -> Optional[str]:
     """Detect project type based on marker files."""
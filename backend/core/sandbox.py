@@ -1,30 +1,506 @@
 """Sandbox abstraction layer for code execution."""
 
 from abc import ABC, abstractmethod
-from typing import Tuple, List, Optional, Dict, Any
+from typing import Tuple, List, Optional, Dict, Any, Callable, AsyncIterator, Union
 import asyncio
+import io
 import os
 import shlex
+import time
+import uuid
+
+from .docker_executor import run_docker
+from .shell_session import (
+    PERSISTENT_SHELL,
+    TIMEOUT_EXIT_CODE,
+    timeout_message,
+    ShellSession,
+    DockerShellSession,
+    E2BShellSession
+)
+
+# Receives progress dicts such as {"phase": "archive", "path": ...} during project sync
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# E2B project uploads are split into parts of this size
+UPLOAD_CHUNK_BYTES = 16 * 1024 * 1024
+# Upper bound for extracting an uploaded project archive in E2B
+EXTRACT_TIMEOUT_SECONDS = 600
+# Read size for streaming files into Docker tar archives
+TAR_CHUNK_BYTES = 64 * 1024
+# Upper bound for workspace listings and hashing run next to the shell session
+INSPECT_TIMEOUT_SECONDS = 60
+
+# Docker project sync: "copy" (tar into the container) or "overlay" (/workspace
+# is an overlay volume mounted by dockerd, with the project as the read-only
+# lower layer and a per-sandbox host directory as the writable upper layer)
+DOCKER_SYNC_MODE = os.getenv("AGENTDOCKS_DOCKER_SYNC_MODE", "copy")
+# Host directory holding the upper layers of overlay sandboxes
+OVERLAY_STATE_ROOT = os.getenv("AGENTDOCKS_OVERLAY_DIR") or os.path.join(
+    os.path.expanduser("~"), ".agentdocks", "overlay"
+)
+# Ignored project paths are hidden from the lower layer with one mount each;
+# projects with more of them fall back to copy sync
+OVERLAY_MAX_MASKS = int(os.getenv("AGENTDOCKS_OVERLAY_MAX_MASKS", "256"))
+# Read-only view of the upper layer inside the container, for change listings
+OVERLAY_UPPER_DIR = "/mnt/agentdocks/upper"
+
+# Grace period between SIGTERM and SIGKILL for timed-out exec commands
+KILL_AFTER_SECONDS = 5
+# Shortest limit passed to `timeout`, whose 0 means no limit
+MIN_TIMEOUT_SECONDS = 0.01
+
+# Docker snapshots are committed as images in this repository
+SNAPSHOT_REPOSITORY = "agentdocks-snapshot"
+
+# Set to 1 to back /workspace and /tmp of Docker sandboxes with size-capped tmpfs
+# mounts (their contents count against the container's memory limit)
+WORKSPACE_TMPFS = os.getenv("AGENTDOCKS_WORKSPACE_TMPFS", "0") == "1"
+WORKSPACE_TMPFS_SIZE = os.getenv("AGENTDOCKS_WORKSPACE_TMPFS_SIZE", "2g")
+TMP_TMPFS_SIZE = os.getenv("AGENTDOCKS_TMP_TMPFS_SIZE", "1g")
+
+# Snapshots shared by a sandbox and its forks:
+# id -> {"image": docker image or None, "archive": local workspace tar or None, "refs": int}
+_snapshots: Dict[str, Dict[str, Any]] = {}
+
+
+def _listing_command(path: str, offset: int = 0, limit: Optional[int] = None) -> str:
+    """Build one find command printing NUL-terminated "type<TAB>size<TAB>mtime<TAB>path" records."""
+    command = (
+        f"find {shlex.quote(path)} -mindepth 1 \\( -type f -o -type d \\) "
+        f"-printf '%y\\t%s\\t%T@\\t%p\\0' 2>/dev/null"
+    )
+    if offset:
+        command += f" | tail -z -n +{int(offset) + 1}"
+    if limit is not None:
+        command += f" | head -z -n {int(limit)}"
+    return command + " || true"
+
+
+def _iter_listing(output: str):
+    """Parse find -printf output record by record without splitting it all up front."""
+    start = 0
+    length = len(output)
+    while start < length:
+        end = output.find('\0', start)
+        if end == -1:
+            end = length
+        record = output[start:end]
+        start = end + 1
+
+        parts = record.split('\t', 3)
+        if len(parts) != 4:
+            continue
+        kind, size, mtime, path = parts
+        is_file = kind == 'f'
+        try:
+            mtime_value = float(mtime)
+        except ValueError:
+            mtime_value = None
+
+        yield {
+            'path': path,
+            'type': 'file' if is_file else 'directory',
+            'size': int(size) if is_file and size.isdigit() else None,
+            'mtime': mtime_value
+        }
+
+
+def _build_project_archive(files, emit: ProgressCallback) -> str:
+    """
+    Pack (file_path, arcname) pairs, e.g. from iter_project_files, into a
+    temporary .tar.gz file (blocking). Returns its path.
+    """
+    import tarfile
+    import tempfile
+
+    fd, archive_path = tempfile.mkstemp(prefix="agentdocks-", suffix=".tar.gz")
+    os.close(fd)
+
+    files_done = 0
+    with tarfile.open(archive_path, mode='w:gz') as tar:
+        for file_path, arcname in files:
+            try:
+                tar.add(file_path, arcname=arcname)
+            except Exception as e:
+                print(f"Warning: Failed to add {arcname}: {e}")
+                continue
+            files_done += 1
+            emit({"phase": "archive", "path": arcname, "files_done": files_done})
+
+    return archive_path
+
+
+def _iter_tar_stream(entries, on_file: Optional[Callable[[str], None]] = None):
+    """
+    Yield an uncompressed tar archive chunk by chunk.
+    entries yields (arcname, source) where source is a local file path or raw bytes.
+    Symlinks are archived as links, never followed.
+    """
+    import stat
+    import tarfile
+
+    for arcname, source in entries:
+        info = tarfile.TarInfo(name=arcname)
+        if isinstance(source, (bytes, bytearray)):
+            info.size = len(source)
+            info.mtime = int(time.time())
+            yield info.tobuf()
+            yield bytes(source)
+        else:
+            try:
+                stat_result = os.lstat(source)
+                if stat.S_ISLNK(stat_result.st_mode):
+                    info.type = tarfile.SYMTYPE
+                    info.linkname = os.readlink(source)
+                    info.mtime = int(stat_result.st_mtime)
+                    yield info.tobuf()
+                    if on_file:
+                        on_file(arcname)
+                    continue
+                if not stat.S_ISREG(stat_result.st_mode):
+                    # FIFOs, sockets and devices: open() could block the worker thread
+                    print(f"Warning: Skipping {arcname}: not a regular file")
+                    continue
+                f = open(source, 'rb')
+            except OSError as e:
+                print(f"Warning: Failed to add {arcname}: {e}")
+                continue
+            info.size = stat_result.st_size
+            info.mtime = int(stat_result.st_mtime)
+            info.mode = stat_result.st_mode & 0o7777
+            with f:
+                yield info.tobuf()
+                remaining = info.size
+                while remaining > 0:
+                    chunk = f.read(min(TAR_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+                # Keep the archive well-formed if the file shrank mid-read
+                if remaining:
+                    yield b'\0' * remaining
+
+        padding = -info.size % tarfile.BLOCKSIZE
+        if padding:
+            yield b'\0' * padding
+        if on_file:
+            on_file(arcname)
+
+    # End-of-archive marker
+    yield b'\0' * (tarfile.BLOCKSIZE * 2)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks (e.g. get_archive output)."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _read_tar_member(chunks):
+    """Stream-parse a tar and return its first member with its content (b"" for non-files)."""
+    import tarfile
+
+    with tarfile.open(fileobj=_ChunkReader(chunks), mode='r|') as tar:
+        member = tar.next()
+        if member is None:
+            raise ValueError("Empty archive")
+        if not member.isfile():
+            return member, b""
+        return member, tar.extractfile(member).read()
+
+
+def _tmpfs_mounts(workspace: bool, tmp: bool) -> Dict[str, str]:
+    """Docker tmpfs options for the workspace and /tmp (exec allowed: agents run scripts there)."""
+    mounts = {}
+    if workspace:
+        mounts["/workspace"] = f"rw,exec,size={WORKSPACE_TMPFS_SIZE}"
+    if tmp:
+        mounts["/tmp"] = f"rw,exec,nosuid,size={TMP_TMPFS_SIZE},mode=1777"
+    return mounts
+
+
+def _exec_put_archive(container, path: str, chunks) -> None:
+    """
+    Extract a tar stream at ``path`` with `tar -x` inside the container (blocking).
+    Unlike put_archive this sees mounts inside the container (tmpfs, overlay),
+    which Docker's archive API writes underneath instead.
+    """
+    import socket
+    from docker.utils.socket import frames_iter, STDERR
+
+    if hasattr(chunks, "read"):
+        chunks = iter(lambda: chunks.read(TAR_CHUNK_BYTES), b"")
+
+    api = container.client.api
+    exec_id = api.exec_create(
+        container.id, ["tar", "-x", "-f", "-", "-C", path], stdin=True, stdout=True, stderr=True
+    )["Id"]
+    sock = api.exec_start(exec_id, socket=True)
+    raw = getattr(sock, "_sock", sock)
+    try:
+        for chunk in chunks:
+            raw.sendall(chunk)
+        raw.shutdown(socket.SHUT_WR)
+        stderr = b"".join(data for stream_id, data in frames_iter(sock, tty=False) if stream_id == STDERR)
+    finally:
+        sock.close()
+
+    if api.exec_inspect(exec_id).get("ExitCode") != 0:
+        raise RuntimeError(f"Extracting into {path} failed: {stderr.decode('utf-8', errors='replace').strip()}")
+
+
+def _exec_get_archive(container, path: str):
+    """Yield a tar of ``path`` (top-level entry named like get_archive's) made inside the container."""
+    api = container.client.api
+    parent, name = os.path.split(path.rstrip('/'))
+    exec_id = api.exec_create(
+        container.id, ["tar", "-c", "-f", "-", "-C", parent or "/", name], stdout=True, stderr=False
+    )["Id"]
+    yield from api.exec_start(exec_id, stream=True)
+
+
+def _exec_read_file(container, path: str) -> bytes:
+    """Read one file with cat inside the container (blocking); follows symlinks."""
+    result = container.exec_run(["cat", "--", path], demux=True)
+    stdout, stderr = result.output
+    if result.exit_code != 0:
+        message = (stderr or b"").decode('utf-8', errors='replace').strip()
+        if "Is a directory" in message:
+            raise IsADirectoryError(f"Is a directory: {path}")
+        raise FileNotFoundError(message or f"File not found: {path}")
+    return stdout or b""
+
+
+def _hashes_command(root: Optional[str] = None, list_file: Optional[str] = None) -> str:
+    """Build one command hashing a whole tree (or a NUL-separated path list file)."""
+    if list_file:
+        command = (
+            f"xargs -0 -r -a {shlex.quote(list_file)} sha256sum -z 2>/dev/null; "
+            f"rm -f {shlex.quote(list_file)}"
+        )
+    else:
+        command = f"find {shlex.quote(root)} -type f -print0 | xargs -0 -r sha256sum -z 2>/dev/null"
+    return command + " || true"
+
+
+def _iter_hashes(output: str):
+    """Parse NUL-terminated sha256sum -z records into (path, hash) pairs."""
+    start = 0
+    length = len(output)
+    while start < length:
+        end = output.find('\0', start)
+        if end == -1:
+            end = length
+        record = output[start:end]
+        start = end + 1
+
+        # "<64 hex chars><space><space or *><path>"
+        if len(record) > 66:
+            yield record[66:], record[:64]
+
+
+def _bash_argv(command: str, timeout: Optional[float] = None) -> List[str]:
+    """
+    argv for running a command in a fresh bash. With a timeout, coreutils
+    `timeout` runs it in its own process group and kills the whole group.
+    """
+    argv = ["/bin/bash", "-c", command]
+    if timeout is None:
+        return argv
+    # An exhausted budget should kill at once rather than lift the limit
+    timeout = max(timeout, MIN_TIMEOUT_SECONDS)
+    return ["timeout", "-k", str(KILL_AFTER_SECONDS), f"{timeout:g}"] + argv
+
+
+def _backstop(timeout: Optional[float]) -> Optional[float]:
+    """Host-side deadline for a command the sandbox should already have killed."""
+    return None if timeout is None else timeout + KILL_AFTER_SECONDS + 10
+
+
+def _register_snapshot(image: Optional[str], archive: Optional[str], docker_url: Optional[str] = None) -> str:
+    """Record a new snapshot with one reference (held by its creator)."""
+    snapshot_id = uuid.uuid4().hex[:12]
+    _snapshots[snapshot_id] = {"image": image, "archive": archive, "docker_url": docker_url, "refs": 1}
+    return snapshot_id
+
+
+async def _release_snapshot(snapshot_id: str) -> None:
+    """Drop one reference; the image and archive are deleted with the last one."""
+    entry = _snapshots.get(snapshot_id)
+    if entry is None:
+        return
+    entry["refs"] -= 1
+    if entry["refs"] > 0:
+        return
+    del _snapshots[snapshot_id]
+
+    if entry["archive"]:
+        try:
+            os.unlink(entry["archive"])
+        except OSError:
+            pass
+    if entry["image"]:
+        from .docker_hosts import docker_client
+
+        def remove():
+            # The image lives on the Docker endpoint the snapshotted container ran on
+            client = docker_client(entry["docker_url"])
+            try:
+                client.images.remove(entry["image"])
+            finally:
+                client.close()
+
+        try:
+            await run_docker(remove)
+        except Exception as e:
+            print(f"Warning: Failed to remove snapshot image {entry['image']}: {e}")
 
 
 class BaseSandbox(ABC):
     """Base class for sandbox implementations."""
 
+    # Persistent shell used by execute_bash (see core/shell_session.py)
+    _shell_session: Optional[ShellSession] = None
+    _shell_disabled: bool = False
+
+    def _create_shell_session(self) -> Optional[ShellSession]:
+        """Build a persistent shell session for this backend, if it supports one."""
+        return None
+
+    async def _get_shell_session(self) -> Optional[ShellSession]:
+        """Return a running shell session, (re)starting it lazily. None means exec per command."""
+        if not PERSISTENT_SHELL or self._shell_disabled:
+            return None
+        if self._shell_session and self._shell_session.alive:
+            return self._shell_session
+
+        session = self._create_shell_session()
+        if session is None:
+            return None
+        try:
+            await session.start()
+        except Exception as e:
+            print(f"Warning: Persistent shell unavailable, using one exec per command: {e}")
+            self._shell_disabled = True
+            return None
+
+        self._shell_session = session
+        return session
+
+    async def _close_shell_session(self) -> None:
+        """Stop the persistent shell if one is running."""
+        if self._shell_session:
+            await self._shell_session.close()
+            self._shell_session = None
+
+    async def reset_shell(self) -> None:
+        """Restart the persistent shell on the next command (fresh cwd and environment)."""
+        await self._close_shell_session()
+
     @abstractmethod
-    async def execute_bash(self, command: str) -> Tuple[str, str, int]:
-        """Execute a bash command. Returns (stdout, stderr, exit_code)."""
+    async def execute_bash(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """
+        Execute a bash command. Returns (stdout, stderr, exit_code).
+        After ``timeout`` seconds the command's process group is killed inside
+        the sandbox and the exit code is 124.
+        """
         pass
 
+    async def run_command(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """
+        Run a bookkeeping command (change detection and the like) on its own,
+        outside the agent's persistent shell, so the shell's cwd, variables,
+        aliases or `set -e` cannot affect it and its output (which may hold
+        NUL bytes) comes back as is. Returns (stdout, stderr, exit_code).
+        """
+        return await self.execute_bash(command, timeout=timeout)
+
+    async def execute_bash_stream(
+        self,
+        command: str,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Execute a bash command, yielding ("stdout" | "stderr", text) chunks as they
+        arrive and finally ("exit", exit_code). Backends without streaming yield
+        the whole output once the command finishes.
+        """
+        stdout, stderr, exit_code = await self.execute_bash(command, timeout=timeout)
+        if stdout:
+            yield "stdout", stdout
+        if stderr:
+            yield "stderr", stderr
+        yield "exit", exit_code
+
+    async def _stream_from_session(
+        self,
+        session: ShellSession,
+        command: str,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream one command's output through the persistent shell."""
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(
+            session.run(
+                command,
+                on_output=lambda stream, text: queue.put_nowait((stream, text)),
+                timeout=timeout
+            )
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+            _, _, exit_code = await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+        yield "exit", exit_code
+
     @abstractmethod
-    async def write_file(self, path: str, content: str) -> bool:
+    async def write_file(self, path: str, content: Union[str, bytes]) -> bool:
         """Write content to a file. Returns success status."""
         pass
 
+    async def write_files(self, files: Dict[str, Union[str, bytes]]) -> bool:
+        """Write several files at once ({path: content}). Returns success status."""
+        results = [await self.write_file(path, content) for path, content in files.items()]
+        return all(results)
+
     @abstractmethod
     async def read_file(self, path: str) -> str:
         """Read file contents. Returns content as string."""
         pass
 
+    async def read_file_range(self, path: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Read ``length`` bytes of a file starting at ``offset`` (to the end if None)."""
+        content = await self.download_file(path)
+        end = None if length is None else offset + length
+        return content[offset:end]
+
     @abstractmethod
     async def list_files(self, directory: str = ".") -> List[str]:
         """List files in a directory."""
@@ -46,13 +522,50 @@ class BaseSandbox(ABC):
         pass
 
     @abstractmethod
-    async def copy_directory(self, local_path: str, sandbox_path: str, ignore_patterns: List[str]) -> bool:
-        """Copy entire directory to sandbox. Returns success status."""
+    async def copy_directory(
+        self,
+        local_path: str,
+        sandbox_path: str,
+        ignore_patterns: List[str],
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> bool:
+        """
+        Copy entire directory to sandbox. Returns success status.
+        progress_callback receives per-file/upload progress dicts on the event loop.
+        """
         pass
 
+    async def copy_files(
+        self,
+        local_path: str,
+        rel_paths: List[str],
+        sandbox_path: str,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> bool:
+        """Copy selected files (relative to local_path) into sandbox_path. Returns success status."""
+        from pathlib import Path
+
+        loop = asyncio.get_event_loop()
+        files = await loop.run_in_executor(
+            None,
+            lambda: {
+                f"{sandbox_path.rstrip('/')}/{rel_path}": (Path(local_path) / rel_path).read_bytes()
+                for rel_path in rel_paths
+            }
+        )
+        return await self.write_files(files)
+
     @abstractmethod
-    async def list_directory_recursive(self, path: str) -> List[Dict[str, Any]]:
-        """List all files recursively. Returns list of {path, type, size}."""
+    async def list_directory_recursive(
+        self,
+        path: str,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        List all files and directories recursively.
+        Returns list of {path, type, size, mtime}; offset/limit paginate the listing.
+        """
         pass
 
     @abstractmethod
@@ -60,6 +573,91 @@ class BaseSandbox(ABC):
         """Get file hash for change detection."""
         pass
 
+    @property
+    def has_project_mount(self) -> bool:
+        """True when /workspace mirrors the local project without a copy."""
+        return False
+
+    # True when the sandbox started from a cached image or snapshot that already holds the project
+    project_preloaded: bool = False
+
+    # Snapshot ids this sandbox holds a reference to (released on destroy)
+    _snapshot_ids: List[str]
+
+    async def snapshot(self) -> str:
+        """Capture the sandbox filesystem. Returns an id to fork from."""
+        raise NotImplementedError(f"{type(self).__name__} does not support snapshots")
+
+    async def fork(self, snapshot_id: Optional[str] = None) -> "BaseSandbox":
+        """
+        Start a new, already running sandbox from a snapshot (a fresh one of the
+        current state if none is given). The caller must destroy the fork.
+        """
+        owned = snapshot_id is None
+        if owned:
+            snapshot_id = await self.snapshot()
+        elif snapshot_id not in _snapshots:
+            raise ValueError(f"Unknown snapshot: {snapshot_id}")
+
+        try:
+            child = await self._start_fork(snapshot_id)
+            _snapshots[snapshot_id]["refs"] += 1
+            child._snapshot_ids.append(snapshot_id)
+            child.project_preloaded = True
+        finally:
+            if owned:
+                # The fork holds its own reference from here on
+                await self.delete_snapshot(snapshot_id)
+        return child
+
+    async def _start_fork(self, snapshot_id: str) -> "BaseSandbox":
+        """Create and start a sandbox holding the snapshot's filesystem."""
+        raise NotImplementedError(f"{type(self).__name__} does not support snapshots")
+
+    async def delete_snapshot(self, snapshot_id: str) -> None:
+        """Release a snapshot taken by this sandbox (kept while forks still use it)."""
+        if snapshot_id in self._snapshot_ids:
+            self._snapshot_ids.remove(snapshot_id)
+            await _release_snapshot(snapshot_id)
+
+    async def _release_snapshots(self) -> None:
+        for snapshot_id in list(self._snapshot_ids):
+            await self.delete_snapshot(snapshot_id)
+
+    async def save_project_image(self, manifest: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[str]:
+        """
+        Cache the synced sandbox for later runs, keyed by ``manifest`` (the
+        project manifest it was synced from). Returns the image name, if any.
+        """
+        return None
+
+    async def reset_workspace(self) -> bool:
+        """Discard all changes in a mounted workspace. False if unsupported."""
+        return False
+
+    async def resource_usage(self) -> Optional[Dict[str, Any]]:
+        """Current CPU/memory usage of the sandbox, if the backend reports it."""
+        return None
+
+    async def list_workspace_changes(self) -> Optional[List[Dict[str, str]]]:
+        """
+        List workspace changes ({path, type}) without hashing, if the backend can.
+        Returns None when unsupported; callers then fall back to hash comparison.
+        """
+        return None
+
+    @abstractmethod
+    async def get_file_hashes(
+        self,
+        paths: Optional[List[str]] = None,
+        root: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Hash many files in one exec. Pass explicit paths or a root to hash every file under.
+        Returns {path: sha256}; unreadable files are omitted.
+        """
+        pass
+
 
 class E2BSandbox(BaseSandbox):
     """E2B cloud sandbox implementation."""
@@ -68,23 +666,30 @@ class E2BSandbox(BaseSandbox):
         self.api_key = api_key
         self.sandbox = None
         self._playwright_installed = False
+        self._snapshot_ids = []
 
     async def __aenter__(self):
         """Async context manager entry."""
         from e2b_code_interpreter import AsyncSandbox
 
         self.sandbox = await AsyncSandbox.create(api_key=self.api_key)
+        await self.sandbox.run_code("mkdir -p /workspace", language="bash")
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
         await self.destroy()
 
-    async def execute_bash(self, command: str) -> Tuple[str, str, int]:
+    async def execute_bash(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
         """Execute bash command in E2B sandbox."""
         if not self.sandbox:
             raise RuntimeError("Sandbox not initialized")
 
+        # The persistent shell starts in /workspace and keeps cwd between calls
+        session = await self._get_shell_session()
+        if session:
+            return await session.run(command, timeout=timeout)
+
         # Wrap command to run in /workspace/ directory
         # Skip if: already has cd, creates /workspace, or uses absolute paths
         cmd_lower = command.strip().lower()
@@ -96,9 +701,14 @@ class E2BSandbox(BaseSandbox):
 
         if not skip_cd:
             command = f"cd /workspace 2>/dev/null && {command}"
+        run_options = {}
+        if timeout is not None:
+            command = shlex.join(_bash_argv(command, timeout))
+            run_options["timeout"] = _backstop(timeout)
 
         # Run bash command using run_code with bash language
-        result = await self.sandbox.run_code(command, language="bash")
+        started = time.monotonic()
+        result = await self.sandbox.run_code(command, language="bash", **run_options)
 
         # Collect stdout from results
         stdout_parts = []
@@ -113,9 +723,40 @@ class E2BSandbox(BaseSandbox):
         stdout = "".join(stdout_parts)
         stderr = "".join(stderr_parts)
         exit_code = 1 if result.error else 0
+        # run_code does not expose the exit status, so infer a timeout kill
+        if timeout is not None and result.error and time.monotonic() - started >= timeout:
+            exit_code = TIMEOUT_EXIT_CODE
+            stderr += timeout_message(timeout)
 
         return stdout, stderr, exit_code
 
+    async def run_command(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """Run a command through commands.run (neither the shell session nor the code interpreter)."""
+        if not self.sandbox:
+            raise RuntimeError("Sandbox not initialized")
+        return await self._run_command(command, timeout=timeout if timeout is not None else 60)
+
+    async def execute_bash_stream(
+        self,
+        command: str,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Execute bash command in E2B sandbox, streaming output through the shell session."""
+        if not self.sandbox:
+            raise RuntimeError("Sandbox not initialized")
+
+        session = await self._get_shell_session()
+        if session:
+            async for item in self._stream_from_session(session, command, timeout):
+                yield item
+            return
+
+        async for item in super().execute_bash_stream(command, timeout):
+            yield item
+
+    def _create_shell_session(self) -> Optional[ShellSession]:
+        return E2BShellSession(self.sandbox)
+
     async def _ensure_playwright_installed(self):
         """Ensure Playwright is installed in the E2B sandbox with all dependencies."""
         if self._playwright_installed:
@@ -135,7 +776,7 @@ class E2BSandbox(BaseSandbox):
 
         self._playwright_installed = True
 
-    async def write_file(self, path: str, content: str) -> bool:
+    async def write_file(self, path: str, content: Union[str, bytes]) -> bool:
         """Write file in E2B sandbox."""
         if not self.sandbox:
             raise RuntimeError("Sandbox not initialized")
@@ -176,102 +817,189 @@ class E2BSandbox(BaseSandbox):
 
     async def destroy(self) -> None:
         """Destroy E2B sandbox."""
+        await self._close_shell_session()
         if self.sandbox:
             await self.sandbox.kill()
             self.sandbox = None
+        await self._release_snapshots()
 
-    async def copy_directory(self, local_path: str, sandbox_path: str, ignore_patterns: List[str]) -> bool:
-        """Copy entire directory to E2B sandbox."""
+    async def snapshot(self) -> str:
+        """Snapshot /workspace as a compressed archive kept on the host (installed packages are not included)."""
         if not self.sandbox:
             raise RuntimeError("Sandbox not initialized")
 
-        from pathlib import Path
-        from core.project_utils import should_ignore
-        import base64
-
-        local = Path(local_path)
+        import tempfile
 
-        # Walk the directory and upload files
-        for root, dirs, files in os.walk(local):
-            # Filter ignored directories
-            dirs[:] = [d for d in dirs if not should_ignore(d, ignore_patterns)]
+        remote = f"/tmp/agentdocks_snapshot_{uuid.uuid4().hex[:12]}.tar.gz"
+        _, stderr, code = await self._run_command(
+            f"tar -czf {remote} -C /workspace .",
+            timeout=EXTRACT_TIMEOUT_SECONDS
+        )
+        if code != 0:
+            raise RuntimeError(f"Failed to snapshot workspace: {stderr}")
+        try:
+            data = await self.sandbox.files.read(remote, format="bytes")
+        finally:
+            await self._run_command(f"rm -f {remote}")
+
+        fd, archive_path = tempfile.mkstemp(prefix="agentdocks-snapshot-", suffix=".tar.gz")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+
+        snapshot_id = _register_snapshot(None, archive_path)
+        self._snapshot_ids.append(snapshot_id)
+        return snapshot_id
+
+    async def _start_fork(self, snapshot_id: str) -> "E2BSandbox":
+        """Create a new E2B sandbox and unpack the snapshot into /workspace."""
+        child = E2BSandbox(self.api_key)
+        await child.__aenter__()
+        try:
+            if not await child._upload_archive(_snapshots[snapshot_id]["archive"], "/workspace"):
+                raise RuntimeError("Failed to restore snapshot in forked sandbox")
+        except Exception:
+            await child.destroy()
+            raise
+        return child
+
+    async def copy_directory(
+        self,
+        local_path: str,
+        sandbox_path: str,
+        ignore_patterns: List[str],
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> bool:
+        """Copy entire directory to E2B sandbox as one compressed archive."""
+        if not self.sandbox:
+            raise RuntimeError("Sandbox not initialized")
 
-            for file in files:
-                if should_ignore(file, ignore_patterns):
-                    continue
+        from pathlib import Path
+        from core.project_utils import iter_project_files
 
-                file_path = Path(root) / file
-                # Get relative path from local root
-                rel_path = file_path.relative_to(local)
-                # Construct sandbox path
-                dest_path = f"{sandbox_path}/{rel_path}"
+        loop = asyncio.get_event_loop()
 
-                try:
-                    # Always read as binary
-                    with open(file_path, 'rb') as f:
-                        content_bytes = f.read()
-
-                    # Try to decode as text, if fails keep as binary
-                    try:
-                        content_str = content_bytes.decode('utf-8')
-                        await self.sandbox.files.write(dest_path, content_str)
-                    except UnicodeDecodeError:
-                        # Binary file - write using base64 encoding workaround
-                        # E2B files.write only accepts strings, so we create via bash
-                        b64_content = base64.b64encode(content_bytes).decode('ascii')
-                        # Create directory if needed
-                        dest_dir = str(Path(dest_path).parent)
-                        await self.sandbox.run_code(f"mkdir -p {shlex.quote(dest_dir)}", language="bash")
-                        # Write using base64
-                        await self.sandbox.run_code(
-                            f"echo {shlex.quote(b64_content)} | base64 -d > {shlex.quote(dest_path)}",
-                            language="bash"
-                        )
-                except Exception as e:
-                    print(f"Warning: Failed to copy {rel_path}: {e}")
-                    continue
+        def emit(event: Dict[str, Any]) -> None:
+            if progress_callback:
+                loop.call_soon_threadsafe(progress_callback, event)
 
-        return True
+        # Pack the project off the event loop
+        archive_path = await loop.run_in_executor(
+            None,
+            lambda: _build_project_archive(iter_project_files(Path(local_path), ignore_patterns), emit)
+        )
 
-    async def list_directory_recursive(self, path: str) -> List[Dict[str, Any]]:
-        """List all files recursively in E2B sandbox."""
+        try:
+            return await self._upload_archive(archive_path, sandbox_path, emit)
+        finally:
+            os.unlink(archive_path)
+
+    async def copy_files(
+        self,
+        local_path: str,
+        rel_paths: List[str],
+        sandbox_path: str,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> bool:
+        """Copy selected files to E2B sandbox as one compressed archive."""
         if not self.sandbox:
             raise RuntimeError("Sandbox not initialized")
 
-        # Use find command to list all files
-        stdout, _, _ = await self.execute_bash(
-            f"find {shlex.quote(path)} -type f -o -type d | head -1000"
-        )
+        from pathlib import Path
 
-        files = []
-        for line in stdout.split('\n'):
-            line = line.strip()
-            if not line or line == path:
-                continue
+        loop = asyncio.get_event_loop()
+
+        def emit(event: Dict[str, Any]) -> None:
+            if progress_callback:
+                loop.call_soon_threadsafe(progress_callback, event)
 
-            # Quote line for use in shell commands
-            line_quoted = shlex.quote(line)
+        local = Path(local_path)
+        archive_path = await loop.run_in_executor(
+            None,
+            lambda: _build_project_archive(((local / rel_path, rel_path) for rel_path in rel_paths), emit)
+        )
 
-            # Determine type
-            is_file_stdout, _, is_file_code = await self.execute_bash(f"test -f {line_quoted} && echo 'file' || echo 'dir'")
-            file_type = 'file' if 'file' in is_file_stdout else 'directory'
+        try:
+            return await self._upload_archive(archive_path, sandbox_path, emit)
+        finally:
+            os.unlink(archive_path)
+
+    async def _upload_archive(
+        self,
+        archive_path: str,
+        sandbox_path: str,
+        emit: Optional[ProgressCallback] = None
+    ) -> bool:
+        """Upload a local .tar.gz in parts and extract it at sandbox_path."""
+        loop = asyncio.get_event_loop()
+        emit = emit or (lambda event: None)
 
-            # Get size if it's a file
-            size = None
-            if file_type == 'file':
-                size_stdout, _, _ = await self.execute_bash(f"stat -f%z {line_quoted} 2>/dev/null || stat -c%s {line_quoted} 2>/dev/null")
+        # Unique per upload, so concurrent uploads into one sandbox stay apart
+        part_prefix = f"/tmp/agentdocks_upload_{uuid.uuid4().hex[:12]}.tar.gz"
+        parts = []
+        extracting = False
+        try:
+            archive_size = os.path.getsize(archive_path)
+            bytes_sent = 0
+
+            # Upload in chunks so huge projects never sit in memory at once
+            with open(archive_path, 'rb') as f:
+                while True:
+                    chunk = await loop.run_in_executor(None, f.read, UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    part = f"{part_prefix}.{len(parts):04d}"
+                    await self.sandbox.files.write(part, chunk)
+                    parts.append(part)
+                    bytes_sent += len(chunk)
+                    emit({"phase": "upload", "bytes_sent": bytes_sent, "bytes_total": archive_size})
+
+            emit({"phase": "extract"})
+            quoted_parts = " ".join(shlex.quote(part) for part in parts)
+            # The extract command removes the parts itself
+            extracting = True
+            _, stderr, code = await self._run_command(
+                f"mkdir -p {shlex.quote(sandbox_path)} && "
+                f"cat {quoted_parts} | tar -xzf - -C {shlex.quote(sandbox_path)}; "
+                f"status=$?; rm -f {quoted_parts}; exit $status",
+                timeout=EXTRACT_TIMEOUT_SECONDS
+            )
+            if code != 0:
+                print(f"Error extracting project archive: {stderr}")
+                return False
+        except Exception as e:
+            print(f"Error copying directory: {e}")
+            if parts and not extracting:
                 try:
-                    size = int(size_stdout.strip())
-                except:
+                    await self._run_command(f"rm -f {shlex.quote(part_prefix)}.*")
+                except Exception:
                     pass
+            return False
+
+        return True
+
+    async def list_directory_recursive(
+        self,
+        path: str,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """List all files recursively in E2B sandbox (single round trip)."""
+        if not self.sandbox:
+            raise RuntimeError("Sandbox not initialized")
+
+        # commands.run returns raw stdout, so NUL separators survive intact
+        stdout, _, _ = await self._run_command(_listing_command(path, offset, limit))
+        return list(_iter_listing(stdout))
 
-            files.append({
-                'path': line,
-                'type': file_type,
-                'size': size
-            })
+    async def _run_command(self, command: str, timeout: float = 60) -> Tuple[str, str, int]:
+        """Run a plain shell command (not through the code interpreter)."""
+        from e2b import CommandExitException
 
-        return files
+        try:
+            result = await self.sandbox.commands.run(command, timeout=timeout)
+        except CommandExitException as e:
+            return e.stdout, e.stderr, e.exit_code
+        return result.stdout, result.stderr, result.exit_code
 
     async def get_file_hash(self, path: str) -> str:
         """Get SHA256 hash of file in E2B sandbox."""
@@ -279,63 +1007,581 @@ class E2BSandbox(BaseSandbox):
             raise RuntimeError("Sandbox not initialized")
 
         path_quoted = shlex.quote(path)
-        stdout, _, code = await self.execute_bash(f"sha256sum {path_quoted} 2>/dev/null || shasum -a 256 {path_quoted}")
+        stdout, _, code = await self._run_command(f"sha256sum {path_quoted} 2>/dev/null || shasum -a 256 {path_quoted}")
         if code == 0 and stdout:
             # sha256sum outputs: hash filename
             return stdout.split()[0]
         return ""
 
+    async def get_file_hashes(
+        self,
+        paths: Optional[List[str]] = None,
+        root: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Hash many files in E2B sandbox with a single command."""
+        if not self.sandbox:
+            raise RuntimeError("Sandbox not initialized")
+
+        if paths is not None:
+            if not paths:
+                return {}
+            # Ship the path list as a file to stay clear of argv length limits;
+            # one per call, so concurrent calls cannot clobber it (the command deletes it)
+            list_file = f"/tmp/.agentdocks_hash_paths_{uuid.uuid4().hex[:12]}"
+            await self.sandbox.files.write(list_file, "\0".join(paths) + "\0")
+            command = _hashes_command(list_file=list_file)
+        else:
+            command = _hashes_command(root=root or "/workspace")
+
+        stdout, _, _ = await self._run_command(command)
+        return dict(_iter_hashes(stdout))
+
+
+def _run_sandbox_container(client, image: str, project_type: Optional[str] = None, **options):
+    """Start a detached sandbox container (blocking docker-py call)."""
+    from .dependency_cache import cache_volumes
+    from .sandbox_reaper import get_sandbox_reaper, sandbox_labels
+    from .sandbox_scheduler import get_resource_scheduler
+
+    # Static limits (pids) for every container; scheduled sandboxes pass their own on top
+    options = {**get_resource_scheduler().base_options(), **options}
+
+    # Shared package caches; project-specific mounts take precedence
+    options["volumes"] = {**cache_volumes(project_type), **options.get("volumes", {})}
+
+    # working_dir makes Docker create /workspace, so no extra mkdir is needed
+    container = client.containers.run(
+        image,
+        command="sleep infinity",
+        detach=True,
+        remove=True,
+        working_dir="/workspace",
+        labels=sandbox_labels(),
+        **options
+    )
+    get_sandbox_reaper().register(container.id)
+    return container
+
+
+def _remove_overlay_state(client, image: str, state_dir: str) -> None:
+    """Delete the host directories of an overlay (blocking)."""
+    import shutil
+
+    shutil.rmtree(state_dir, ignore_errors=True)
+    if os.path.exists(state_dir) and client is not None:
+        # Files copied up by the container belong to its root user
+        client.containers.run(
+            image,
+            entrypoint=["rm", "-rf", "/state/upper", "/state/work"],
+            remove=True,
+            network_disabled=True,
+            volumes={state_dir: {"bind": "/state", "mode": "rw"}}
+        )
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def _iter_lower_files(project_path: str, rel_dir: str, ignore):
+    """Yield the non-ignored files under one project directory as project-relative paths (blocking)."""
+    base = os.path.join(project_path, rel_dir)
+    for root, dirs, files in os.walk(base):
+        rel_root = os.path.relpath(root, project_path).replace(os.sep, '/')
+        dirs[:] = [d for d in dirs if not ignore.match(f"{rel_root}/{d}", is_dir=True)]
+        for name in files:
+            if not ignore.match(f"{rel_root}/{name}"):
+                yield f"{rel_root}/{name}"
+
+
+def _overlay_masks(project_path: str, ignore) -> Tuple[List[str], List[str]]:
+    """
+    Ignored directories (outermost ones only) and ignored files of a project
+    as relative paths (blocking). Symlinks are left out: they resolve inside
+    the container.
+    """
+    ignored_dirs, ignored_files = [], []
+    for root, dirs, files in os.walk(project_path):
+        rel_root = os.path.relpath(root, project_path)
+        prefix = "" if rel_root == "." else rel_root.replace(os.sep, '/') + '/'
+        kept = []
+        for d in dirs:
+            if not ignore.match(prefix + d, is_dir=True):
+                kept.append(d)
+            elif not os.path.islink(os.path.join(root, d)):
+                ignored_dirs.append(prefix + d)
+        dirs[:] = kept
+        for name in files:
+            path = os.path.join(root, name)
+            if ignore.match(prefix + name) and os.path.isfile(path) and not os.path.islink(path):
+                ignored_files.append(prefix + name)
+    return ignored_dirs, ignored_files
+
+
+def _classify_overlay_entries(project_path: str, entries: Dict[str, str], ignore):
+    """
+    Sort upper-layer entries ({relative path: find %y type}) against the
+    project directory (blocking). Returns (relative path, type) changes, the
+    copied-up files that still need a content comparison, and the lower
+    paths to look up in /workspace.
+
+    A directory that was removed and created again is opaque: it hides
+    everything below it in the lower layer without leaving whiteouts. So the
+    lower children of every upper directory that have no upper entry of
+    their own are looked up; the missing ones were deleted.
+    """
+    changes, copied_up, probe = [], [], []
+    for rel_path, kind in entries.items():
+        lower = os.path.join(project_path, rel_path)
+        if kind == 'c':
+            # Whiteout: a deleted file, or a deleted directory with everything it held
+            if os.path.lexists(lower):
+                changes.extend(_expand_deletions(project_path, [rel_path], ignore))
+        elif kind == 'f':
+            if os.path.isfile(lower) and not os.path.islink(lower):
+                copied_up.append(rel_path)
+            else:
+                changes.append((rel_path, 'created'))
+        elif kind == 'd' and os.path.isdir(lower) and not os.path.islink(lower):
+            try:
+                names = os.listdir(lower)
+            except OSError:
+                continue
+            for name in names:
+                child = f"{rel_path}/{name}"
+                if child not in entries and not ignore.match(child, os.path.isdir(os.path.join(lower, name))):
+                    probe.append(child)
+    return changes, copied_up, probe
+
+
+def _expand_deletions(project_path: str, rel_paths: List[str], ignore) -> List[Tuple[str, str]]:
+    """Deleted lower paths as (relative path, 'deleted') per file, directories expanded (blocking)."""
+    changes = []
+    for rel_path in rel_paths:
+        lower = os.path.join(project_path, rel_path)
+        if os.path.isdir(lower) and not os.path.islink(lower):
+            changes.extend((path, 'deleted') for path in _iter_lower_files(project_path, rel_path, ignore))
+        else:
+            changes.append((rel_path, 'deleted'))
+    return changes
+
 
 class DockerSandbox(BaseSandbox):
     """Local Docker sandbox implementation."""
 
-    def __init__(self, image: str = "python:3.11-slim", enable_browser: bool = False):
+    def __init__(
+        self,
+        image: str = "python:3.11-slim",
+        enable_browser: bool = False,
+        pool=None,
+        sync_mode: str = "copy",
+        project_path: Optional[str] = None,
+        image_cache=None,
+        scheduler=None,
+        hosts=None,
+        workspace_tmpfs: bool = WORKSPACE_TMPFS
+    ):
         if enable_browser:
             self.image = "agentdocks-playwright:latest"
         else:
             self.image = image
+        self.pool = pool
+        # "overlay" needs the project path at container start; without one we copy
+        self.sync_mode = sync_mode if project_path else "copy"
+        self.project_path = project_path
+        # tmpfs for /tmp, and for /workspace unless the overlay already backs it
+        self.tmp_tmpfs = workspace_tmpfs
+        self.workspace_tmpfs = workspace_tmpfs and self.sync_mode != "overlay"
+        self.image_cache = image_cache
+        self.scheduler = scheduler
+        # CPU/memory reserved from the scheduler's host budget (None when unscheduled)
+        self.allocation = None
+        # With several Docker endpoints the pool and scheduler come from the chosen one
+        self.hosts = hosts
+        self.endpoint = None
+        self.docker_url = None
+        self._placed_on = None
+        self.project_key = None
+        self.project_preloaded = False
         self.container = None
         self.client = None
+        # Overlay volume and the host directory with its upper layer
+        self.overlay_volume = None
+        self.overlay_dir = None
+        self._snapshot_ids = []
+
+    @property
+    def has_project_mount(self) -> bool:
+        """True when /workspace is an overlay volume over the project directory."""
+        return self.sync_mode == "overlay" and self.container is not None
 
     async def __aenter__(self):
         """Async context manager entry."""
+        from .docker_hosts import is_endpoint_failure
+
+        tried = []
+        while True:
+            if self.hosts:
+                self._use_endpoint(await self.hosts.place(exclude=tried))
+            if self.scheduler:
+                # Waits while the host budget is exhausted
+                self.allocation = await self.scheduler.acquire()
+            try:
+                await self._start()
+            except BaseException as e:
+                await self._release_allocation()
+                await self._abandon_container()
+                if self.endpoint and is_endpoint_failure(e):
+                    # Fail over to the next endpoint while there is one
+                    self.hosts.failed(self.endpoint, e)
+                    tried.append(self.endpoint)
+                    if len(tried) < len(self.hosts.endpoints):
+                        continue
+                raise
+
+            if self.endpoint:
+                self.endpoint.active += 1
+                self._placed_on = self.endpoint
+            return self
+
+    def _use_endpoint(self, endpoint) -> None:
+        self.endpoint = endpoint
+        self.pool = endpoint.pool
+        self.scheduler = endpoint.scheduler
+        self.docker_url = endpoint.url
+
+    async def _abandon_container(self) -> None:
+        """Drop a half-started container (best effort; the reaper's sweep catches leftovers)."""
+        from .sandbox_reaper import get_sandbox_reaper
+
+        if self.container:
+            get_sandbox_reaper().unregister(self.container.id)
+            try:
+                await run_docker(self.container.kill)
+            except Exception:
+                pass
+            self.container = None
+        await self._remove_overlay()
+        if self.client:
+            self.client.close()
+            self.client = None
+        self.project_key = None
+        self.project_preloaded = False
+
+    async def _start(self) -> None:
         import docker
+        from .docker_hosts import docker_client
+
+        options = {}
+        image = self.image
+        if self.sync_mode == "overlay" and self.docker_url is not None:
+            # The project directory and the upper layer only exist on this machine,
+            # so overlays stay on the local daemon like cached project images
+            print(f"Warning: Overlay sync needs the local Docker daemon, using copy sync on {self.docker_url}")
+            self._use_copy_sync()
+        # Overlay containers carry a per-project mount, so they never come from the pool
+        if self.sync_mode != "overlay":
+            # Cached project images live on the local daemon only, and a tmpfs
+            # workspace would hide the project baked into the image
+            if (
+                self.project_path and self.image_cache and self.image_cache.enabled
+                and self.docker_url is None and not self.workspace_tmpfs
+            ):
+                # Start from a committed image of this exact project if one exists
+                self.project_key = await self.image_cache.project_key(self.project_path, self.image)
+                cached = await self.image_cache.lookup(self.project_key)
+                if cached:
+                    image = cached
+                    self.project_preloaded = True
+
+            if self.pool and not self.project_preloaded and self.workspace_tmpfs == WORKSPACE_TMPFS:
+                # Lease a pre-started container from the warm pool if one is idle
+                # (pooled containers carry the default tmpfs setup)
+                self.container = await self.pool.acquire(self.image)
+                if self.container:
+                    if self.allocation:
+                        # Pooled containers start unscheduled; apply this sandbox's limits
+                        await run_docker(lambda: self.container.update(**self.allocation.update_options()))
+                    return
+
+        project_type = None
+        if self.project_path:
+            from pathlib import Path
+            from .project_utils import detect_project_type
+            project_type = detect_project_type(Path(self.project_path))
+
+        if self.allocation:
+            options.update(self.allocation.container_options())
+        tmpfs = {**options.get("tmpfs", {}), **_tmpfs_mounts(self.workspace_tmpfs, self.tmp_tmpfs)}
+        if tmpfs:
+            options["tmpfs"] = tmpfs
+
+        self.client = await run_docker(lambda: docker_client(self.docker_url))
+        try:
+            if self.sync_mode == "overlay":
+                options["mounts"] = await run_docker(self._create_overlay)
+            # Run container in detached mode
+            self.container = await run_docker(
+                lambda: _run_sandbox_container(self.client, image, project_type, **options)
+            )
+        except (docker.errors.APIError, OSError, ValueError) as e:
+            if self.sync_mode != "overlay":
+                raise
+            # E.g. a rootless daemon, or a state directory without overlay support
+            print(f"Warning: Overlay mount failed, falling back to copy sync: {e}")
+            await self._remove_overlay()
+            self.client.close()
+            self.client = None
+            self._use_copy_sync()
+            await self._start()
+
+    def _use_copy_sync(self) -> None:
+        """Copy the project in instead of mounting it (the workspace gets the configured tmpfs)."""
+        self.sync_mode = "copy"
+        self.workspace_tmpfs = self.tmp_tmpfs
+
+    def _create_overlay(self) -> List[Any]:
+        """
+        Create the overlay volume over the project (blocking). Returns the
+        container mounts. Docker mounts the volume itself, so the container
+        needs no extra capabilities. Ignored paths (.env, .git, ...) are
+        covered with an empty tmpfs (directories) or /dev/null (files); paths
+        that only appear in the project later are not covered.
+        """
+        import tempfile
+        from pathlib import Path
+        from docker.types import Mount
+        from .project_utils import load_ignore_matcher
+        from .sandbox_reaper import sandbox_labels
+
+        lower = os.path.abspath(self.project_path)
+        ignored_dirs, ignored_files = _overlay_masks(lower, load_ignore_matcher(Path(lower)))
+        if len(ignored_dirs) + len(ignored_files) > OVERLAY_MAX_MASKS:
+            raise ValueError(
+                f"{len(ignored_dirs) + len(ignored_files)} ignored paths to hide "
+                f"(AGENTDOCKS_OVERLAY_MAX_MASKS={OVERLAY_MAX_MASKS})"
+            )
+        os.makedirs(OVERLAY_STATE_ROOT, exist_ok=True)
+        self.overlay_dir = tempfile.mkdtemp(prefix="sandbox-", dir=OVERLAY_STATE_ROOT)
+        upper = os.path.join(self.overlay_dir, "upper")
+        work = os.path.join(self.overlay_dir, "work")
+        os.mkdir(upper)
+        os.mkdir(work)
+        if any(c in path for path in (lower, upper, work) for c in ",:"):
+            # The mount options have no way to escape them
+            raise ValueError(f"Overlay layer paths cannot contain ',' or ':': {lower}")
+
+        self.overlay_volume = f"agentdocks-overlay-{uuid.uuid4().hex[:12]}"
+        self.client.volumes.create(
+            name=self.overlay_volume,
+            driver="local",
+            driver_opts={
+                "type": "overlay",
+                "device": "overlay",
+                "o": f"lowerdir={lower},upperdir={upper},workdir={work}",
+            },
+            labels=sandbox_labels()
+        )
+        # Docker mounts nested targets after the volume they are in
+        return [
+            Mount("/workspace", self.overlay_volume, type="volume"),
+            Mount(OVERLAY_UPPER_DIR, upper, type="bind", read_only=True),
+            *(Mount(f"/workspace/{rel_path}", None, type="tmpfs") for rel_path in ignored_dirs),
+            *(
+                Mount(f"/workspace/{rel_path}", "/dev/null", type="bind", read_only=True)
+                for rel_path in ignored_files
+            ),
+        ]
+
+    async def _remove_overlay(self) -> None:
+        """Remove the overlay volume and its upper layer (best effort, after the container is gone)."""
+        if self.overlay_volume and self.client:
+            name = self.overlay_volume
+            try:
+                await run_docker(lambda: self.client.volumes.get(name).remove(force=True))
+            except Exception as e:
+                print(f"Warning: Failed to remove overlay volume {name}: {e}")
+        self.overlay_volume = None
+        if self.overlay_dir:
+            try:
+                await run_docker(_remove_overlay_state, self.client, self.image, self.overlay_dir)
+            except Exception as e:
+                print(f"Warning: Failed to remove overlay directory {self.overlay_dir}: {e}")
+            self.overlay_dir = None
+
+    async def save_project_image(self, manifest: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[str]:
+        """Commit the container with the synced project to the image cache."""
+        if not self.container or not self.project_key or self.project_preloaded or manifest is None:
+            return None
+        # The project may have changed since the lookup key was computed at start
+        key = await self.image_cache.project_key(self.project_path, self.image, manifest)
+        return await self.image_cache.commit(
+            self.container, key, self.image, os.path.abspath(self.project_path)
+        )
 
-        self.client = docker.from_env()
-        # Run container in detached mode
-        self.container = self.client.containers.run(
-            self.image,
-            command="sleep infinity",
-            detach=True,
-            remove=True,
-            working_dir="/workspace"
+    async def list_workspace_changes(self) -> Optional[List[Dict[str, str]]]:
+        """
+        List created/modified/deleted files by reading the overlay upper layer.
+        Returns None when /workspace is not an overlay.
+        """
+        if not self.has_project_mount:
+            return None
+
+        from pathlib import Path
+        from .project_utils import compute_file_hash, load_ignore_matcher
+
+        # One-shot exec, so the agent's shell state cannot interfere
+        stdout, stderr, code = await self._exec_bash(
+            f"find {OVERLAY_UPPER_DIR} -mindepth 1 \\( -type f -o -type c -o -type d \\) -printf '%y\\t%P\\0'"
         )
-        return self
+        if code != 0:
+            raise RuntimeError(f"Failed to read overlay changes: {stderr.strip()}")
+        entries = {}
+        for record in stdout.split('\0'):
+            kind, _, rel_path = record.partition('\t')
+            if rel_path:
+                entries[rel_path] = kind
+
+        # The lower layer is the local project directory
+        project = os.path.abspath(self.project_path)
+        ignore = load_ignore_matcher(Path(project))
+        loop = asyncio.get_event_loop()
+        changes, copied_up, probe = await loop.run_in_executor(
+            None, _classify_overlay_entries, project, entries, ignore
+        )
+        if probe:
+            list_file = f"/tmp/.agentdocks_probe_{uuid.uuid4().hex[:12]}"
+            await self.write_file(list_file, "\0".join(probe) + "\0")
+            stdout, stderr, code = await self._exec_bash(
+                "while IFS= read -r -d '' p; do "
+                "[ -e \"/workspace/$p\" ] || [ -L \"/workspace/$p\" ] || printf '%s\\0' \"$p\"; "
+                f"done < {list_file}; rm -f {list_file}"
+            )
+            if code != 0:
+                raise RuntimeError(f"Failed to read overlay changes: {stderr.strip()}")
+            missing = [p for p in stdout.split('\0') if p]
+            changes.extend(await loop.run_in_executor(None, _expand_deletions, project, missing, ignore))
+        if copied_up:
+            # touch/chmod copy files up too; only content changes count
+            sandbox_hashes = await self.get_file_hashes([f"/workspace/{p}" for p in copied_up])
+            local_hashes = await loop.run_in_executor(
+                None, lambda: {p: compute_file_hash(Path(project) / p) for p in copied_up}
+            )
+            changes.extend(
+                (p, 'modified') for p in copied_up if sandbox_hashes.get(f"/workspace/{p}") != local_hashes[p]
+            )
+        return [{"path": f"/workspace/{p}", "type": change_type} for p, change_type in changes]
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
         await self.destroy()
 
-    async def execute_bash(self, command: str) -> Tuple[str, str, int]:
+    async def execute_bash(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
         """Execute bash command in Docker container."""
         if not self.container:
             raise RuntimeError("Container not initialized")
 
-        # Escape single quotes in command for safe shell execution
-        escaped_command = command.replace("'", "'\"'\"'")
+        session = await self._get_shell_session()
+        if session:
+            return await session.run(command, timeout=timeout)
+        return await self._exec_bash(command, timeout)
 
-        # Run in thread pool since docker-py is blocking
+    async def run_command(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """Run a command in a fresh exec, never in the persistent shell."""
+        if not self.container:
+            raise RuntimeError("Container not initialized")
+        return await self._exec_bash(command, timeout)
+
+    async def execute_bash_stream(
+        self,
+        command: str,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Execute bash command in Docker container, yielding output as it is produced."""
+        if not self.container:
+            raise RuntimeError("Container not initialized")
+
+        session = await self._get_shell_session()
+        if session:
+            async for item in self._stream_from_session(session, command, timeout):
+                yield item
+            return
+
+        async for item in self._exec_bash_stream(command, timeout):
+            yield item
+
+    def _create_shell_session(self) -> Optional[ShellSession]:
+        return DockerShellSession(self.container)
+
+    async def _exec_bash_stream(
+        self,
+        command: str,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream a fresh exec with demultiplexed stdout/stderr."""
+        import codecs
+
+        # exec_run(stream=True) cannot report the exit code, so use the
+        # low-level API the same way and inspect the exec afterwards
+        api = self.container.client.api
         loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: self.container.exec_run(
-                f"/bin/bash -c '{escaped_command}'",
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def pump():
+            exec_id = api.exec_create(
+                self.container.id,
+                _bash_argv(command, timeout),
                 workdir="/workspace"
-            )
+            )["Id"]
+            for stdout, stderr in api.exec_start(exec_id, stream=True, demux=True):
+                if stdout:
+                    loop.call_soon_threadsafe(queue.put_nowait, ("stdout", stdout))
+                if stderr:
+                    loop.call_soon_threadsafe(queue.put_nowait, ("stderr", stderr))
+            return api.exec_inspect(exec_id).get("ExitCode")
+
+        # Holds a Docker worker for as long as the command streams
+        future = asyncio.ensure_future(run_docker(pump))
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(queue.put_nowait, None))
+        decoders = {
+            "stdout": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+            "stderr": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+        }
+
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            stream, data = item
+            text = decoders[stream].decode(data)
+            if text:
+                yield stream, text
+
+        # A truncated multi-byte sequence at the very end comes out as U+FFFD
+        for stream, decoder in decoders.items():
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield stream, text
+
+        exit_code = await future
+        if timeout is not None and exit_code == TIMEOUT_EXIT_CODE:
+            yield "stderr", timeout_message(timeout)
+        yield "exit", exit_code
+
+    async def _exec_bash(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """Execute bash command in a fresh exec (no persistent shell)."""
+        # Run in thread pool since docker-py is blocking
+        result = await asyncio.wait_for(
+            run_docker(
+                lambda: self.container.exec_run(
+                    _bash_argv(command, timeout),
+                    workdir="/workspace"
+                )
+            ),
+            _backstop(timeout)
         )
 
         exit_code = result.exit_code
         output = result.output.decode('utf-8', errors='replace')
+        if timeout is not None and exit_code == TIMEOUT_EXIT_CODE:
+            output += timeout_message(timeout)
 
         # Split stdout/stderr (simplified - docker combines them)
         if exit_code == 0:
@@ -343,36 +1589,32 @@ class DockerSandbox(BaseSandbox):
         else:
             return "", output, exit_code
 
-    async def write_file(self, path: str, content: str) -> bool:
+    @staticmethod
+    def _container_path(path: str) -> str:
+        """Resolve a path relative to /workspace."""
+        return path if path.startswith('/') else f"/workspace/{path}"
+
+    async def write_file(self, path: str, content: Union[str, bytes]) -> bool:
         """Write file to Docker container."""
+        return await self.write_files({path: content})
+
+    async def write_files(self, files: Dict[str, Union[str, bytes]]) -> bool:
+        """Write several files to the Docker container with a single put_archive."""
         if not self.container:
             raise RuntimeError("Container not initialized")
 
-        try:
-            import tarfile
-            import io
-
-            # Create tar archive with file
-            tar_stream = io.BytesIO()
-            tar = tarfile.open(fileobj=tar_stream, mode='w')
-
-            file_data = content.encode('utf-8')
-            tarinfo = tarfile.TarInfo(name=os.path.basename(path))
-            tarinfo.size = len(file_data)
-            tar.addfile(tarinfo, io.BytesIO(file_data))
-            tar.close()
-
-            tar_stream.seek(0)
+        # Extract at / so missing parent directories are created too
+        archive = _iter_tar_stream(
+            (
+                self._container_path(path).lstrip('/'),
+                content.encode('utf-8') if isinstance(content, str) else content
+            )
+            for path, content in files.items()
+        )
 
+        try:
             # Upload to container
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: self.container.put_archive(
-                    os.path.dirname(path) or "/workspace",
-                    tar_stream.getvalue()
-                )
-            )
+            await self._put_archive("/", archive)
             return True
         except Exception as e:
             print(f"Error writing file: {e}")
@@ -380,10 +1622,27 @@ class DockerSandbox(BaseSandbox):
 
     async def read_file(self, path: str) -> str:
         """Read file from Docker container."""
-        stdout, stderr, code = await self.execute_bash(f"cat {path}")
-        if code != 0:
-            raise FileNotFoundError(f"File not found: {path}")
-        return stdout
+        content = await self.download_file(path)
+        return content.decode('utf-8', errors='replace')
+
+    async def read_file_range(self, path: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Read part of a file without transferring the rest of it."""
+        if not self.container:
+            raise RuntimeError("Container not initialized")
+
+        command = [
+            "dd", f"if={self._container_path(path)}", "bs=64K",
+            "iflag=skip_bytes,count_bytes", f"skip={offset}", "status=none"
+        ]
+        if length is not None:
+            command.append(f"count={length}")
+
+        result = await run_docker(lambda: self.container.exec_run(command, demux=True))
+        stdout, stderr = result.output
+        if result.exit_code != 0:
+            message = (stderr or b"").decode('utf-8', errors='replace').strip()
+            raise FileNotFoundError(message or f"File not found: {path}")
+        return stdout or b""
 
     async def list_files(self, directory: str = ".") -> List[str]:
         """List files in Docker container."""
@@ -392,108 +1651,268 @@ class DockerSandbox(BaseSandbox):
 
     async def upload_file(self, name: str, content: bytes) -> str:
         """Upload file to Docker container."""
-        path = f"/workspace/{name}"
-        await self.write_file(path, content.decode('utf-8'))
+        path = self._container_path(name)
+        if not await self.write_file(path, content):
+            raise RuntimeError(f"Failed to upload {name}")
         return path
 
     async def download_file(self, path: str) -> bytes:
-        """Download file from Docker container."""
-        content = await self.read_file(path)
-        return content.encode('utf-8')
+        """Download file from Docker container (streamed out of get_archive)."""
+        if not self.container:
+            raise RuntimeError("Container not initialized")
+
+        return await run_docker(self._get_archive_file, self._container_path(path))
+
+    def _get_archive_file(self, path: str, follow_links: int = 8) -> bytes:
+        """Fetch one regular file with get_archive (blocking)."""
+        import docker
+
+        if self._in_container_mount(path):
+            return _exec_read_file(self.container, path)
+        try:
+            chunks, stat = self.container.get_archive(path, chunk_size=TAR_CHUNK_BYTES)
+        except docker.errors.NotFound:
+            raise FileNotFoundError(f"File not found: {path}")
+
+        member, content = _read_tar_member(chunks)
+        if member.issym():
+            # The archive holds the link itself; Docker reports where it points
+            target = stat.get("linkTarget")
+            if not target or not follow_links:
+                raise FileNotFoundError(f"Cannot resolve symlink: {path}")
+            return self._get_archive_file(target, follow_links - 1)
+        if member.isdir():
+            raise IsADirectoryError(f"Is a directory: {path}")
+        return content
 
     async def destroy(self) -> None:
         """Destroy Docker container."""
+        import docker
+        from .sandbox_reaper import get_sandbox_reaper
+
+        await self._close_shell_session()
         if self.container:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.container.stop)
+            # Nothing inside needs a graceful shutdown; stop would wait 10s for it
+            container = self.container
+            get_sandbox_reaper().unregister(container.id)
+            try:
+                await run_docker(container.kill)
+            except docker.errors.APIError as e:
+                # Already exited (and auto-removed) containers cannot be killed
+                if not isinstance(e, docker.errors.NotFound) and e.status_code != 409:
+                    raise
+            finally:
+                await self._release_allocation(container.id)
             self.container = None
+            if self.overlay_volume:
+                # The volume stays in use until the auto-removal finishes
+                try:
+                    await run_docker(lambda: container.wait(condition="removed"))
+                except docker.errors.APIError:
+                    pass
+        await self._remove_overlay()
+        await self._release_allocation()
+        if self._placed_on:
+            self._placed_on.active -= 1
+            self._placed_on = None
         if self.client:
             self.client.close()
             self.client = None
+        await self._release_snapshots()
+
+    async def _release_allocation(self, container_id: Optional[str] = None) -> None:
+        if self.scheduler:
+            await self.scheduler.release(self.allocation, container_id)
+        self.allocation = None
+
+    async def resource_usage(self) -> Optional[Dict[str, Any]]:
+        """Current CPU/memory/pids usage with the reserved limits (scheduled sandboxes only)."""
+        if not self.container or not self.allocation:
+            return None
+        usage = await self.scheduler.sample(self.container)
+        if usage is None:
+            return None
+        return {**usage, "allocation": self.allocation.to_dict()}
+
+    @property
+    def _mount_points(self) -> List[str]:
+        """Paths backed by mounts (overlay, tmpfs) that Docker's archive API and commit do not see."""
+        points = []
+        if self.has_project_mount or self.workspace_tmpfs:
+            points.append("/workspace")
+        if self.tmp_tmpfs:
+            points.append("/tmp")
+        return points
+
+    def _in_container_mount(self, path: str) -> bool:
+        return any(path == point or path.startswith(point + '/') for point in self._mount_points)
+
+    async def _put_archive(self, path: str, archive) -> None:
+        """Extract a tar stream at path, going through exec when a mount is involved."""
+        if self._in_container_mount(path) or (path == "/" and self._mount_points):
+            await run_docker(_exec_put_archive, self.container, path, archive)
+        else:
+            await run_docker(lambda: self.container.put_archive(path, archive))
+
+    @property
+    def _workspace_mounted(self) -> bool:
+        """True when /workspace is a mount, which docker commit does not capture."""
+        return "/workspace" in self._mount_points
 
-    async def copy_directory(self, local_path: str, sandbox_path: str, ignore_patterns: List[str]) -> bool:
-        """Copy directory to Docker container using tar."""
+    async def snapshot(self) -> str:
+        """Commit the container as an image (plus a /workspace archive if it is a mount)."""
         if not self.container:
             raise RuntimeError("Container not initialized")
 
-        import tarfile
-        import io
+        tag = uuid.uuid4().hex[:12]
+        await run_docker(lambda: self.container.commit(
+            repository=SNAPSHOT_REPOSITORY,
+            tag=tag,
+            conf={"Labels": {"agentdocks.snapshot": "1"}}
+        ))
+        archive_path = None
+        if self._workspace_mounted:
+            archive_path = await run_docker(self._save_workspace_archive)
+
+        snapshot_id = _register_snapshot(f"{SNAPSHOT_REPOSITORY}:{tag}", archive_path, self.docker_url)
+        self._snapshot_ids.append(snapshot_id)
+        return snapshot_id
+
+    def _save_workspace_archive(self) -> str:
+        """Stream /workspace into a local tar file (blocking)."""
+        import tempfile
+
+        chunks = _exec_get_archive(self.container, "/workspace")
+        fd, archive_path = tempfile.mkstemp(prefix="agentdocks-snapshot-", suffix=".tar")
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return archive_path
+
+    async def _start_fork(self, snapshot_id: str) -> "DockerSandbox":
+        """Run a new container from the snapshot image (on the endpoint that holds it)."""
         from pathlib import Path
-        from core.project_utils import should_ignore
+        from .docker_hosts import docker_client
+        from .project_utils import detect_project_type
 
-        local = Path(local_path)
-        tar_stream = io.BytesIO()
+        entry = _snapshots[snapshot_id]
+        # Forks always use copy mode: the snapshot already holds the workspace
+        child = DockerSandbox(
+            self.image,
+            project_path=self.project_path,
+            scheduler=self.scheduler,
+            workspace_tmpfs=self.tmp_tmpfs
+        )
+        child.docker_url = entry["docker_url"]
+        project_type = detect_project_type(Path(self.project_path)) if self.project_path else None
+
+        options = {}
+        if child.scheduler:
+            child.allocation = await child.scheduler.acquire()
+            if child.allocation:
+                options = child.allocation.container_options()
+        tmpfs = _tmpfs_mounts(child.workspace_tmpfs, child.tmp_tmpfs)
+        if tmpfs:
+            options["tmpfs"] = tmpfs
+        try:
+            child.client = await run_docker(lambda: docker_client(child.docker_url))
+            child.container = await run_docker(
+                lambda: _run_sandbox_container(child.client, entry["image"], project_type, **options)
+            )
+        except BaseException:
+            await child.destroy()
+            raise
+        if self._placed_on and self._placed_on.url == child.docker_url:
+            child._placed_on = self._placed_on
+            child._placed_on.active += 1
+        if entry["archive"]:
+            try:
+                # The archive's top-level entry is workspace/
+                with open(entry["archive"], 'rb') as f:
+                    await child._put_archive("/", f)
+            except Exception:
+                await child.destroy()
+                raise
+        return child
+
+    async def copy_directory(
+        self,
+        local_path: str,
+        sandbox_path: str,
+        ignore_patterns: List[str],
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> bool:
+        """Copy directory to Docker container, streaming the tar as it is generated."""
+        if not self.container:
+            raise RuntimeError("Container not initialized")
 
-        with tarfile.open(fileobj=tar_stream, mode='w') as tar:
-            for root, dirs, files in os.walk(local):
-                # Filter ignored dirs
-                dirs[:] = [d for d in dirs if not should_ignore(d, ignore_patterns)]
+        from pathlib import Path
+        from core.project_utils import iter_project_files
 
-                for file in files:
-                    if should_ignore(file, ignore_patterns):
-                        continue
+        local = Path(local_path)
+        loop = asyncio.get_event_loop()
 
-                    file_path = Path(root) / file
-                    arcname = file_path.relative_to(local)
-                    try:
-                        tar.add(file_path, arcname=str(arcname))
-                    except Exception as e:
-                        print(f"Warning: Failed to add {arcname}: {e}")
-                        continue
+        def on_file(arcname: str) -> None:
+            if progress_callback:
+                loop.call_soon_threadsafe(progress_callback, {"phase": "archive", "path": arcname})
 
-        tar_stream.seek(0)
+        # The walk and file reads happen lazily inside the upload's worker
+        # thread, so memory stays flat regardless of project size
+        archive = _iter_tar_stream(
+            ((arcname, file_path) for file_path, arcname in iter_project_files(local, ignore_patterns)),
+            on_file
+        )
 
-        # Upload to container
-        loop = asyncio.get_event_loop()
         try:
-            await loop.run_in_executor(
-                None,
-                lambda: self.container.put_archive(sandbox_path, tar_stream.getvalue())
-            )
+            await self._put_archive(sandbox_path, archive)
             return True
         except Exception as e:
             print(f"Error copying directory: {e}")
             return False
 
-    async def list_directory_recursive(self, path: str) -> List[Dict[str, Any]]:
-        """List all files recursively in Docker container."""
+    async def copy_files(
+        self,
+        local_path: str,
+        rel_paths: List[str],
+        sandbox_path: str,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> bool:
+        """Copy selected files to Docker container in one streamed tar."""
         if not self.container:
             raise RuntimeError("Container not initialized")
 
-        # Use find command
-        stdout, _, _ = await self.execute_bash(
-            f"find {shlex.quote(path)} -type f -o -type d | head -1000"
-        )
+        from pathlib import Path
 
-        files = []
-        for line in stdout.split('\n'):
-            line = line.strip()
-            if not line or line == path:
-                continue
+        local = Path(local_path)
+        loop = asyncio.get_event_loop()
 
-            # Quote line for use in shell commands
-            line_quoted = shlex.quote(line)
+        def on_file(arcname: str) -> None:
+            if progress_callback:
+                loop.call_soon_threadsafe(progress_callback, {"phase": "archive", "path": arcname})
 
-            # Determine type
-            is_file_stdout, _, _ = await self.execute_bash(f"test -f {line_quoted} && echo 'file' || echo 'dir'")
-            file_type = 'file' if 'file' in is_file_stdout else 'directory'
+        archive = _iter_tar_stream(((rel_path, local / rel_path) for rel_path in rel_paths), on_file)
 
-            # Get size if file
-            size = None
-            if file_type == 'file':
-                size_stdout, _, _ = await self.execute_bash(f"stat -c%s {line_quoted} 2>/dev/null")
-                try:
-                    size = int(size_stdout.strip())
-                except:
-                    pass
+        try:
+            await self._put_archive(sandbox_path, archive)
+            return True
+        except Exception as e:
+            print(f"Error copying files: {e}")
+            return False
 
-            files.append({
-                'path': line,
-                'type': file_type,
-                'size': size
-            })
+    async def list_directory_recursive(
+        self,
+        path: str,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """List all files recursively in Docker container (single round trip)."""
+        if not self.container:
+            raise RuntimeError("Container not initialized")
 
-        return files
+        stdout, _, _ = await self.run_command(
+            _listing_command(path, offset, limit), timeout=INSPECT_TIMEOUT_SECONDS
+        )
+        return list(_iter_listing(stdout))
 
     async def get_file_hash(self, path: str) -> str:
         """Get SHA256 hash of file in Docker container."""
@@ -501,11 +1920,37 @@ class DockerSandbox(BaseSandbox):
             raise RuntimeError("Container not initialized")
 
         path_quoted = shlex.quote(path)
-        stdout, _, code = await self.execute_bash(f"sha256sum {path_quoted} 2>/dev/null")
+        stdout, _, code = await self.run_command(
+            f"sha256sum {path_quoted} 2>/dev/null", timeout=INSPECT_TIMEOUT_SECONDS
+        )
         if code == 0 and stdout:
             return stdout.split()[0]
         return ""
 
+    async def get_file_hashes(
+        self,
+        paths: Optional[List[str]] = None,
+        root: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Hash many files in Docker container with a single exec."""
+        if not self.container:
+            raise RuntimeError("Container not initialized")
+
+        if paths is not None:
+            if not paths:
+                return {}
+            # Ship the path list as a file to stay clear of argv length limits;
+            # one per call, so concurrent calls cannot clobber it (the command deletes it)
+            list_file = f"/tmp/.agentdocks_hash_paths_{uuid.uuid4().hex[:12]}"
+            if not await self.write_file(list_file, "\0".join(paths) + "\0"):
+                raise RuntimeError("Failed to upload hash path list")
+            command = _hashes_command(list_file=list_file)
+        else:
+            command = _hashes_command(root=root or "/workspace")
+
+        stdout, _, _ = await self.run_command(command, timeout=INSPECT_TIMEOUT_SECONDS)
+        return dict(_iter_hashes(stdout))
+
 
 def create_sandbox(sandbox_type: str, **kwargs) -> BaseSandbox:
     """Factory function to create the appropriate sandbox."""
@@ -515,7 +1960,16 @@ def create_sandbox(sandbox_type: str, **kwargs) -> BaseSandbox:
             raise ValueError("E2B API key required")
         return E2BSandbox(api_key)
     elif sandbox_type == "docker":
+        from .docker_hosts import get_docker_hosts
+        from .image_cache import get_image_cache
+
         image = kwargs.get("image", "python:3.11-slim")
-        return DockerSandbox(image)
+        return DockerSandbox(
+            image,
+            hosts=get_docker_hosts(),
+            sync_mode=kwargs.get("sync_mode", DOCKER_SYNC_MODE),
+            project_path=kwargs.get("project_path"),
+            image_cache=get_image_cache()
+        )
     else:
         raise ValueError(f"Unknown sandbox type: {sandbox_type}")
@@ -0,0 +1,246 @@
+"""Warm pool of pre-started Docker sandbox containers.
+
+Cold-starting a container dominates time-to-first-token under load, so the
+pool keeps a few idle containers per image running and hands them out from
+``DockerSandbox.__aenter__``. Leased containers are never returned (they are
+dirty after a run); the pool refills itself in the background instead.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .docker_executor import run_docker
+
+logger = logging.getLogger(__name__)
+
+# Idle containers kept per image (0 disables the pool)
+POOL_SIZE = int(os.getenv("AGENTDOCKS_POOL_SIZE", "0"))
+# Comma-separated images to pool, optionally with a per-image size: "image=2,other"
+POOL_IMAGES = os.getenv(
+    "AGENTDOCKS_POOL_IMAGES",
+    "python:3.11-slim,agentdocks-playwright:latest"
+)
+# Idle containers older than this are recycled
+POOL_MAX_IDLE_SECONDS = int(os.getenv("AGENTDOCKS_POOL_MAX_IDLE_SECONDS", "900"))
+# How often the pool evicts stale containers and tops itself up
+POOL_MAINTENANCE_INTERVAL = 30
+
+
+def parse_pool_images(spec: str, default_size: int) -> Dict[str, int]:
+    """Parse an "image[=size],image[=size]" spec into {image: size}."""
+    sizes = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        image, _, size = item.partition('=')
+        try:
+            sizes[image.strip()] = int(size) if size else default_size
+        except ValueError:
+            logger.warning(f"⚠️ Invalid pool size for {image}: {size}")
+    return {image: size for image, size in sizes.items() if size > 0}
+
+
+class SandboxPool:
+    """Keeps idle, already-running sandbox containers per image."""
+
+    def __init__(
+        self,
+        sizes: Dict[str, int],
+        max_idle_seconds: int = POOL_MAX_IDLE_SECONDS,
+        docker_url: Optional[str] = None
+    ):
+        self.sizes = sizes
+        # Docker endpoint the pool runs on (None: the local daemon, see core/docker_hosts.py)
+        self.docker_url = docker_url
+        self.max_idle_seconds = max_idle_seconds
+        self.client = None
+        self._idle: Dict[str, List[Dict[str, Any]]] = {image: [] for image in sizes}
+        self._starting: Dict[str, int] = {image: 0 for image in sizes}
+        self._tasks: set = set()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "refills": 0,
+            "refill_failures": 0,
+            "evicted": 0,
+            "refill_seconds_total": 0.0,
+            "last_refill_seconds": None,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sizes)
+
+    async def start(self) -> None:
+        """Connect to Docker and fill the pool in the background."""
+        if not self.enabled or self.client is not None:
+            return
+
+        from .docker_hosts import docker_client
+
+        try:
+            self.client = await run_docker(lambda: docker_client(self.docker_url))
+        except Exception as e:
+            logger.warning(f"⚠️ Sandbox pool disabled, Docker unavailable: {e}")
+            return
+
+        for image in self.sizes:
+            self._refill(image)
+        self._maintenance_task = asyncio.create_task(self._maintain())
+        logger.info(f"🏊 Sandbox pool started: {self.sizes}")
+
+    async def stop(self) -> None:
+        """Stop background work and remove all idle containers."""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        for task in list(self._tasks):
+            task.cancel()
+
+        for image, entries in self._idle.items():
+            while entries:
+                await self._discard(entries.pop()["container"])
+
+        if self.client:
+            self.client.close()
+            self.client = None
+
+    async def acquire(self, image: str):
+        """
+        Lease an idle container for ``image``.
+        Returns None on a miss; the caller then cold-starts its own container.
+        """
+        if image not in self.sizes or self.client is None:
+            return None
+
+        entries = self._idle[image]
+        container = None
+        while entries:
+            entry = entries.pop(0)
+            if time.monotonic() - entry["created_at"] > self.max_idle_seconds:
+                self._stats["evicted"] += 1
+                self._spawn(self._discard(entry["container"]))
+                continue
+            if await self._is_running(entry["container"]):
+                container = entry["container"]
+                break
+            self._spawn(self._discard(entry["container"]))
+            self._stats["evicted"] += 1
+
+        self._refill(image)
+
+        if container is None:
+            self._stats["misses"] += 1
+            return None
+
+        self._stats["hits"] += 1
+        return container
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters and current occupancy."""
+        refills = self._stats["refills"]
+        return {
+            "enabled": self.enabled and self.client is not None,
+            "images": {
+                image: {
+                    "target": size,
+                    "idle": len(self._idle[image]),
+                    "starting": self._starting[image],
+                }
+                for image, size in self.sizes.items()
+            },
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "refills": refills,
+            "refill_failures": self._stats["refill_failures"],
+            "evicted": self._stats["evicted"],
+            "avg_refill_seconds": (
+                round(self._stats["refill_seconds_total"] / refills, 3) if refills else None
+            ),
+            "last_refill_seconds": self._stats["last_refill_seconds"],
+            "max_idle_seconds": self.max_idle_seconds,
+        }
+
+    def _spawn(self, coro) -> None:
+        """Run a coroutine in the background, keeping a reference to it."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _refill(self, image: str) -> None:
+        """Start containers until idle + starting reaches the target size."""
+        missing = self.sizes[image] - len(self._idle[image]) - self._starting[image]
+        for _ in range(max(missing, 0)):
+            self._starting[image] += 1
+            self._spawn(self._start_one(image))
+
+    async def _start_one(self, image: str) -> None:
+        """Cold-start one container and add it to the idle list."""
+        from .sandbox import _run_sandbox_container, _tmpfs_mounts, WORKSPACE_TMPFS
+
+        started = time.monotonic()
+        try:
+            options = {"tmpfs": _tmpfs_mounts(True, True)} if WORKSPACE_TMPFS else {}
+            container = await run_docker(lambda: _run_sandbox_container(self.client, image, **options))
+        except Exception as e:
+            self._stats["refill_failures"] += 1
+            logger.warning(f"⚠️ Failed to pre-start {image} sandbox: {e}")
+            return
+        finally:
+            self._starting[image] -= 1
+
+        elapsed = time.monotonic() - started
+        self._stats["refills"] += 1
+        self._stats["refill_seconds_total"] += elapsed
+        self._stats["last_refill_seconds"] = round(elapsed, 3)
+        self._idle[image].append({"container": container, "created_at": time.monotonic()})
+
+    async def _is_running(self, container) -> bool:
+        """Check that an idle container has not died while waiting."""
+        try:
+            await run_docker(container.reload)
+            return container.status == "running"
+        except Exception:
+            return False
+
+    async def _discard(self, container) -> None:
+        """Stop an idle container (it is auto-removed)."""
+        from .sandbox_reaper import get_sandbox_reaper
+
+        get_sandbox_reaper().unregister(container.id)
+        try:
+            await run_docker(container.kill)
+        except Exception as e:
+            logger.debug(f"Failed to discard pooled container: {e}")
+
+    async def _maintain(self) -> None:
+        """Periodically recycle stale containers and top the pool up."""
+        while True:
+            await asyncio.sleep(POOL_MAINTENANCE_INTERVAL)
+            now = time.monotonic()
+            for image, entries in self._idle.items():
+                fresh = []
+                for entry in entries:
+                    if now - entry["created_at"] > self.max_idle_seconds:
+                        self._stats["evicted"] += 1
+                        self._spawn(self._discard(entry["container"]))
+                    else:
+                        fresh.append(entry)
+                entries[:] = fresh
+                self._refill(image)
+
+
+_pool: Optional[SandboxPool] = None
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Get the process-wide sandbox pool (configured from the environment)."""
+    global _pool
+    if _pool is None:
+        _pool = SandboxPool(parse_pool_images(POOL_IMAGES, POOL_SIZE))
+    return _pool
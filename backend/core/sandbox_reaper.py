@@ -0,0 +1,188 @@
+"""Background sandbox teardown and leaked-container sweeping.
+
+Destroying a sandbox used to sit on the response path: the runner awaited
+``sandbox.destroy()`` before sending ``done``. Teardown is handed to the
+reaper instead, which destroys sandboxes in background tasks.
+
+Every Docker sandbox container is labelled with ``agentdocks.sandbox`` and
+an owner label ``<hostname>:<pid>``. The reaper periodically kills labelled
+containers whose owning process on this host is gone (crashed workers) and
+containers of this process that no sandbox or pool knows about anymore.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict, Optional, Set
+
+from .docker_executor import run_docker
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_LABEL = "agentdocks.sandbox"
+OWNER_LABEL = "agentdocks.owner"
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Seconds between sweeps for leaked containers (0 disables sweeping)
+REAPER_INTERVAL = int(os.getenv("AGENTDOCKS_REAPER_INTERVAL", "300"))
+# Containers younger than this are never considered leaked (they may still be registering)
+LEAK_GRACE_SECONDS = 120
+# How long shutdown waits for pending teardowns
+SHUTDOWN_TIMEOUT = 30
+
+
+def sandbox_labels() -> Dict[str, str]:
+    """Labels put on every sandbox container started by this process."""
+    return {SANDBOX_LABEL: "1", OWNER_LABEL: OWNER}
+
+
+def _owner_alive(owner: str) -> Optional[bool]:
+    """Whether the owning process still runs; None when it is on another host."""
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        return True
+    return True
+
+
+class SandboxReaper:
+    """Destroys sandboxes in the background and sweeps leaked containers."""
+
+    def __init__(self, interval: int = REAPER_INTERVAL):
+        self.interval = interval
+        # Ids of containers this process started and still owns
+        self._live: Set[str] = set()
+        self._pending: Set[asyncio.Task] = set()
+        self._sweeper: Optional[asyncio.Task] = None
+        self._stats = {
+            "destroyed": 0,
+            "destroy_failures": 0,
+            "leaked_found": 0,
+            "leaked_reaped": 0,
+            "last_sweep": None,
+        }
+
+    def register(self, container_id: str) -> None:
+        """Record a container started by this process."""
+        self._live.add(container_id)
+
+    def unregister(self, container_id: str) -> None:
+        """Forget a container that was destroyed (or handed over for destruction)."""
+        self._live.discard(container_id)
+
+    def schedule(self, sandbox) -> None:
+        """Destroy a sandbox in the background; returns immediately."""
+        task = asyncio.create_task(self._teardown(sandbox))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _teardown(self, sandbox) -> None:
+        started = time.monotonic()
+        try:
+            await sandbox.destroy()
+        except Exception as e:
+            self._stats["destroy_failures"] += 1
+            logger.warning(f"⚠️ Failed to destroy sandbox: {e}")
+            return
+        self._stats["destroyed"] += 1
+        logger.debug(f"Sandbox destroyed in {time.monotonic() - started:.2f}s")
+
+    async def start(self) -> None:
+        """Start the periodic leak sweep if any Docker endpoint is reachable."""
+        from .docker_hosts import get_docker_hosts
+
+        if self.interval <= 0 or self._sweeper is not None:
+            return
+
+        reachable = [await endpoint.check() for endpoint in get_docker_hosts().endpoints]
+        if not any(reachable):
+            logger.info("Sandbox leak sweep disabled, Docker unavailable")
+            return
+        self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop(self) -> None:
+        """Stop sweeping and wait (bounded) for pending teardowns."""
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self._pending:
+            await asyncio.wait(set(self._pending), timeout=SHUTDOWN_TIMEOUT)
+
+    async def sweep(self) -> int:
+        """Kill leaked AgentDocks containers on every healthy endpoint. Returns how many were found."""
+        from .docker_hosts import get_docker_hosts
+
+        found = 0
+        for endpoint in get_docker_hosts().endpoints:
+            if not endpoint.healthy:
+                continue
+            try:
+                found += await self._sweep_client(await endpoint.get_client())
+            except Exception as e:
+                logger.warning(f"⚠️ Sandbox leak sweep failed on {endpoint.name}: {e}")
+        self._stats["last_sweep"] = time.time()
+        return found
+
+    async def _sweep_client(self, client) -> int:
+        containers = await run_docker(
+            lambda: client.containers.list(filters={"label": SANDBOX_LABEL})
+        )
+        now = time.time()
+        leaked = []
+        for container in containers:
+            created = container.attrs.get("Created")
+            if isinstance(created, (int, float)) and now - created < LEAK_GRACE_SECONDS:
+                continue
+            owner = container.labels.get(OWNER_LABEL, "")
+            if owner == OWNER:
+                if container.id not in self._live:
+                    leaked.append(container)
+            elif _owner_alive(owner) is False:
+                leaked.append(container)
+
+        self._stats["leaked_found"] += len(leaked)
+        for container in leaked:
+            try:
+                await run_docker(container.kill)
+                self._stats["leaked_reaped"] += 1
+                logger.info(f"🧹 Reaped leaked sandbox container {container.short_id}")
+            except Exception as e:
+                logger.debug(f"Failed to reap {container.short_id}: {e}")
+        return len(leaked)
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"⚠️ Sandbox leak sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pending teardowns, live containers and leak counters."""
+        return {
+            "owner": OWNER,
+            "pending": len(self._pending),
+            "live_containers": len(self._live),
+            "sweep_interval": self.interval if self._sweeper else None,
+            **self._stats,
+        }
+
+
+_reaper: Optional[SandboxReaper] = None
+
+
+def get_sandbox_reaper() -> SandboxReaper:
+    """Get the process-wide sandbox reaper."""
+    global _reaper
+    if _reaper is None:
+        _reaper = SandboxReaper()
+    return _reaper
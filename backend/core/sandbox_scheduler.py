@@ -0,0 +1,262 @@
+"""CPU, memory and pids budgets for Docker sandboxes.
+
+Sandbox containers used to start without limits, so one runaway agent could
+starve every other run on the host. With the scheduler enabled, every
+sandbox gets a CPU quota (or pinned cpuset), a memory limit without extra
+swap and a pids limit, carved out of a host budget. When the budget is used
+up, new sandboxes wait for a running one to finish instead of overcommitting.
+Usage is sampled from ``docker stats`` for metrics and SSE events.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .docker_executor import run_docker
+
+logger = logging.getLogger(__name__)
+
+
+def _host_memory_mb() -> int:
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 8192
+
+
+# Set to 1 to give sandboxes CPU/memory/pids limits from a host budget
+SCHEDULER_ENABLED = os.getenv("AGENTDOCKS_RESOURCE_SCHEDULER", "0") == "1"
+# Host budget shared by all sandboxes (default: every CPU, 80% of RAM)
+HOST_CPUS = float(os.getenv("AGENTDOCKS_HOST_CPUS") or 0) or float(os.cpu_count() or 1)
+HOST_MEMORY_MB = int(os.getenv("AGENTDOCKS_HOST_MEMORY_MB") or 0) or int(_host_memory_mb() * 0.8)
+# Per-sandbox limits
+SANDBOX_CPUS = float(os.getenv("AGENTDOCKS_SANDBOX_CPUS", "1"))
+SANDBOX_MEMORY_MB = int(os.getenv("AGENTDOCKS_SANDBOX_MEMORY_MB", "2048"))
+SANDBOX_PIDS = int(os.getenv("AGENTDOCKS_SANDBOX_PIDS", "512"))
+# Set to 1 to pin each sandbox to dedicated cores instead of a CPU quota
+PIN_CPUS = os.getenv("AGENTDOCKS_PIN_CPUS", "0") == "1"
+# Seconds a new sandbox may wait for resources before the run fails
+SCHEDULE_TIMEOUT = int(os.getenv("AGENTDOCKS_SCHEDULE_TIMEOUT", "600"))
+
+CPU_PERIOD = 100_000
+
+
+class Allocation:
+    """Resources reserved for one sandbox."""
+
+    def __init__(self, cpus: float, memory_mb: int, pids: int, cpuset: Optional[List[int]] = None):
+        self.cpus = cpus
+        self.memory_mb = memory_mb
+        self.pids = pids
+        self.cpuset = cpuset
+
+    def _cpu_options(self) -> Dict[str, Any]:
+        if self.cpuset:
+            return {"cpuset_cpus": ",".join(str(cpu) for cpu in self.cpuset)}
+        return {"cpu_period": CPU_PERIOD, "cpu_quota": int(self.cpus * CPU_PERIOD)}
+
+    def container_options(self) -> Dict[str, Any]:
+        """Options for containers.run()."""
+        return {
+            **self._cpu_options(),
+            "mem_limit": f"{self.memory_mb}m",
+            "memswap_limit": f"{self.memory_mb}m",
+            "pids_limit": self.pids,
+        }
+
+    def update_options(self) -> Dict[str, Any]:
+        """Options for container.update() on an already running (pooled) container."""
+        # The update API cannot change pids_limit; pooled containers start with the default
+        return {
+            **self._cpu_options(),
+            "mem_limit": f"{self.memory_mb}m",
+            "memswap_limit": f"{self.memory_mb}m",
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cpus": self.cpus,
+            "memory_mb": self.memory_mb,
+            "pids": self.pids,
+            "cpuset": self.cpuset,
+        }
+
+
+class ResourceScheduler:
+    """Reserves sandbox resources from a host budget, queueing when it is exhausted."""
+
+    def __init__(
+        self,
+        enabled: bool = SCHEDULER_ENABLED,
+        cpus: float = HOST_CPUS,
+        memory_mb: int = HOST_MEMORY_MB,
+        pin_cpus: bool = PIN_CPUS
+    ):
+        self.enabled = enabled
+        self.cpus = cpus
+        self.memory_mb = memory_mb
+        self.pin_cpus = pin_cpus
+        self._cond = asyncio.Condition()
+        self._allocated_cpus = 0.0
+        self._allocated_memory_mb = 0
+        self._free_cpus = set(range(int(cpus)))
+        self._allocations: List[Allocation] = []
+        self._waiting = 0
+        # container id -> latest usage sample, and the raw counters it was computed from
+        self._usage: Dict[str, Dict[str, Any]] = {}
+        self._counters: Dict[str, tuple] = {}
+        self._stats = {"scheduled": 0, "queued": 0, "timeouts": 0, "wait_seconds_total": 0.0}
+
+    def resize(self, cpus: Optional[float], memory_mb: Optional[float]) -> None:
+        """Set the host budget (e.g. from a remote daemon's info) before anything is scheduled."""
+        if self._allocations:
+            return
+        if cpus:
+            self.cpus = float(cpus)
+            self._free_cpus = set(range(int(cpus)))
+        if memory_mb:
+            self.memory_mb = int(memory_mb)
+
+    def base_options(self) -> Dict[str, Any]:
+        """Limits every sandbox container gets at start, even before it is scheduled."""
+        return {"pids_limit": SANDBOX_PIDS} if self.enabled else {}
+
+    def _request(self, cpus: Optional[float], memory_mb: Optional[int]):
+        # Clamp to the budget so an oversized request waits for an empty host instead of forever
+        cpus = min(cpus or SANDBOX_CPUS, self.cpus)
+        if self.pin_cpus:
+            cpus = float(max(math.ceil(cpus), 1))
+        return cpus, min(memory_mb or SANDBOX_MEMORY_MB, self.memory_mb)
+
+    def _fits(self, cpus: float, memory_mb: int) -> bool:
+        if self._allocated_memory_mb + memory_mb > self.memory_mb:
+            return False
+        if self.pin_cpus:
+            return len(self._free_cpus) >= cpus
+        return self._allocated_cpus + cpus <= self.cpus + 1e-9
+
+    @property
+    def saturated(self) -> bool:
+        """True when a default-sized sandbox would have to wait."""
+        return self.enabled and not self._fits(*self._request(None, None))
+
+    async def acquire(self, cpus: Optional[float] = None, memory_mb: Optional[int] = None) -> Optional[Allocation]:
+        """Reserve resources for a sandbox, waiting while the host is full. None when disabled."""
+        if not self.enabled:
+            return None
+
+        cpus, memory_mb = self._request(cpus, memory_mb)
+        started = time.monotonic()
+        async with self._cond:
+            if not self._fits(cpus, memory_mb):
+                self._stats["queued"] += 1
+                logger.info(f"⏳ Host budget exhausted, sandbox queued ({self._waiting + 1} waiting)")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._fits(cpus, memory_mb)),
+                    timeout=SCHEDULE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                raise RuntimeError(f"No sandbox resources became free within {SCHEDULE_TIMEOUT}s")
+            finally:
+                self._waiting -= 1
+
+            cpuset = None
+            if self.pin_cpus:
+                cpuset = sorted(self._free_cpus)[:int(cpus)]
+                self._free_cpus.difference_update(cpuset)
+            self._allocated_cpus += cpus
+            self._allocated_memory_mb += memory_mb
+            allocation = Allocation(cpus, memory_mb, SANDBOX_PIDS, cpuset)
+            self._allocations.append(allocation)
+
+        self._stats["scheduled"] += 1
+        self._stats["wait_seconds_total"] += time.monotonic() - started
+        return allocation
+
+    async def release(self, allocation: Optional[Allocation], container_id: Optional[str] = None) -> None:
+        """Return a sandbox's resources to the budget and wake queued sandboxes."""
+        if container_id:
+            self._usage.pop(container_id, None)
+            self._counters.pop(container_id, None)
+        if allocation is None or allocation not in self._allocations:
+            return
+
+        async with self._cond:
+            self._allocations.remove(allocation)
+            self._allocated_cpus -= allocation.cpus
+            self._allocated_memory_mb -= allocation.memory_mb
+            if allocation.cpuset:
+                self._free_cpus.update(allocation.cpuset)
+            self._cond.notify_all()
+
+    async def sample(self, container) -> Optional[Dict[str, Any]]:
+        """Read a container's current CPU, memory and pids usage from docker stats."""
+        try:
+            raw = await run_docker(lambda: container.stats(stream=False, one_shot=True))
+        except Exception as e:
+            logger.debug(f"Failed to read stats for {container.short_id}: {e}")
+            return None
+
+        cpu = raw.get("cpu_stats", {})
+        total = cpu.get("cpu_usage", {}).get("total_usage", 0)
+        system = cpu.get("system_cpu_usage", 0)
+        online = cpu.get("online_cpus") or len(cpu.get("cpu_usage", {}).get("percpu_usage") or []) or 1
+
+        # One-shot stats carry no previous reading, so CPU% comes from our last sample
+        cpu_percent = None
+        previous = self._counters.get(container.id)
+        if previous and system > previous[1]:
+            cpu_percent = round((total - previous[0]) / (system - previous[1]) * online * 100, 1)
+        self._counters[container.id] = (total, system)
+
+        memory = raw.get("memory_stats", {})
+        # Page cache is reclaimable; docker stats reports usage without it too
+        cache = memory.get("stats", {}).get("inactive_file", 0)
+        usage = {
+            "container": container.short_id,
+            "cpu_percent": cpu_percent,
+            "memory_bytes": max(memory.get("usage", 0) - cache, 0),
+            "memory_limit_bytes": memory.get("limit"),
+            "pids": raw.get("pids_stats", {}).get("current"),
+            "sampled_at": time.time(),
+        }
+        self._usage[container.id] = usage
+        return usage
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget, current reservations, queue and the latest per-sandbox usage."""
+        scheduled = self._stats["scheduled"]
+        return {
+            "enabled": self.enabled,
+            "budget": {"cpus": self.cpus, "memory_mb": self.memory_mb, "pin_cpus": self.pin_cpus},
+            "allocated": {
+                "cpus": round(self._allocated_cpus, 2),
+                "memory_mb": self._allocated_memory_mb,
+                "sandboxes": len(self._allocations),
+            },
+            "waiting": self._waiting,
+            "scheduled": scheduled,
+            "queued": self._stats["queued"],
+            "timeouts": self._stats["timeouts"],
+            "avg_wait_seconds": (
+                round(self._stats["wait_seconds_total"] / scheduled, 3) if scheduled else None
+            ),
+            "usage": list(self._usage.values()),
+        }
+
+
+_scheduler: Optional[ResourceScheduler] = None
+
+
+def get_resource_scheduler() -> ResourceScheduler:
+    """Get the process-wide sandbox resource scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ResourceScheduler()
+    return _scheduler
@@ -0,0 +1,163 @@
+"""Warm sandbox sessions reused across runs on the same project.
+
+By default every agent run creates a sandbox, copies the project in and
+destroys it afterwards. In session mode the sandbox of a finished run is
+parked here, keyed by sandbox type and project path, and the next run on
+that project picks it up again: no container start, no project upload, only
+a re-sync of what changed locally. Parked sessions expire after an idle TTL.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sandbox_reaper import get_sandbox_reaper
+
+logger = logging.getLogger(__name__)
+
+# Parked sandboxes are destroyed after this many idle seconds
+SESSION_IDLE_TTL = int(os.getenv("AGENTDOCKS_SESSION_IDLE_TTL", "900"))
+# How often idle sessions are checked for expiry
+SESSION_SWEEP_INTERVAL = 30
+
+
+class SandboxSession:
+    """A live sandbox and its project manager, parked between runs."""
+
+    def __init__(self, key: Tuple[str, str], sandbox, project_manager):
+        self.key = key
+        self.sandbox = sandbox
+        self.project_manager = project_manager
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.runs = 1
+        self.in_use = False
+
+
+class SandboxSessionManager:
+    """Parks sandboxes per (sandbox type, project path) with an idle TTL."""
+
+    def __init__(self, idle_ttl: int = SESSION_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._sessions: Dict[Tuple[str, str], SandboxSession] = {}
+        # Sessions closed while a run was using them; never parked again
+        self._retired: List[SandboxSession] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._stats = {"reused": 0, "parked": 0, "expired": 0}
+
+    def acquire(self, sandbox_type: str, project_path: str) -> Optional[SandboxSession]:
+        """Take the parked session for a project, or None if there is none (or it is busy)."""
+        session = self._sessions.get((sandbox_type, project_path))
+        if session is None or session.in_use:
+            return None
+        if time.monotonic() - session.last_used > self.idle_ttl:
+            self._expire(session)
+            return None
+
+        session.in_use = True
+        session.runs += 1
+        self._stats["reused"] += 1
+        return session
+
+    def release(
+        self,
+        sandbox_type: str,
+        project_path: str,
+        sandbox,
+        project_manager,
+        reset: bool = False
+    ) -> bool:
+        """
+        Park a sandbox after a run. Returns False when it should not be kept
+        (another sandbox holds the slot, its session was closed meanwhile, or
+        the next run needs a ``reset`` its mounted workspace cannot do); the
+        caller then destroys it.
+        """
+        for retired in self._retired:
+            if retired.sandbox is sandbox:
+                self._retired.remove(retired)
+                return False
+
+        if reset and sandbox.has_project_mount:
+            # The next sync(reset=True) would fail on it anyway
+            return False
+
+        key = (sandbox_type, project_path)
+        session = self._sessions.get(key)
+        if session is None:
+            session = SandboxSession(key, sandbox, project_manager)
+            self._sessions[key] = session
+            self._stats["parked"] += 1
+        elif session.sandbox is not sandbox:
+            return False
+
+        session.project_manager = project_manager
+        session.in_use = False
+        session.last_used = time.monotonic()
+
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+        return True
+
+    def discard(self, session: SandboxSession) -> None:
+        """Forget a session whose sandbox is no longer usable (the caller destroys it)."""
+        if self._sessions.get(session.key) is session:
+            del self._sessions[session.key]
+
+    async def close(self, project_path: Optional[str] = None) -> None:
+        """Destroy parked sessions (all of them, or those of one project) in the background."""
+        for key, session in list(self._sessions.items()):
+            if project_path is not None and key[1] != project_path:
+                continue
+            del self._sessions[key]
+            if session.in_use:
+                # Its run destroys the sandbox instead of parking it again
+                self._retired.append(session)
+            else:
+                get_sandbox_reaper().schedule(session.sandbox)
+
+    def stats(self) -> Dict[str, Any]:
+        """Parked sessions and reuse counters."""
+        now = time.monotonic()
+        return {
+            "idle_ttl": self.idle_ttl,
+            "sessions": [
+                {
+                    "sandbox_type": key[0],
+                    "project_path": key[1],
+                    "in_use": session.in_use,
+                    "runs": session.runs,
+                    "idle_seconds": None if session.in_use else round(now - session.last_used, 1),
+                }
+                for key, session in self._sessions.items()
+            ],
+            **self._stats,
+        }
+
+    def _expire(self, session: SandboxSession) -> None:
+        del self._sessions[session.key]
+        self._stats["expired"] += 1
+        get_sandbox_reaper().schedule(session.sandbox)
+
+    async def _sweep(self) -> None:
+        """Destroy sessions that stayed idle past the TTL; stop once none are left."""
+        while self._sessions:
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+            now = time.monotonic()
+            for session in list(self._sessions.values()):
+                if not session.in_use and now - session.last_used > self.idle_ttl:
+                    logger.info(f"⏱️ Sandbox session for {session.key[1]} expired")
+                    self._expire(session)
+
+
+_manager: Optional[SandboxSessionManager] = None
+
+
+def get_session_manager() -> SandboxSessionManager:
+    """Get the process-wide sandbox session manager."""
+    global _manager
+    if _manager is None:
+        _manager = SandboxSessionManager()
+    return _manager
@@ -0,0 +1,367 @@
+"""Persistent shell sessions for sandboxes.
+
+Instead of spawning a fresh ``bash -c`` for every tool call, a sandbox keeps
+one long-lived bash process and sends it framed commands over stdin. Each
+command is followed by unique end markers on stdout (carrying the exit code)
+and stderr, so output can be split per command while cwd and exported
+variables carry over between calls. The markers are written to copies of the
+shell's original stdout and stderr (fds 3 and 4), so commands that redirect
+the shell's own output with ``exec`` do not swallow them.
+"""
+
+import asyncio
+import base64
+import codecs
+import logging
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple
+
+from .docker_executor import run_docker
+
+logger = logging.getLogger(__name__)
+
+# Set to 0 to run every command in its own exec again
+PERSISTENT_SHELL = os.getenv("AGENTDOCKS_PERSISTENT_SHELL", "1") == "1"
+
+SHELL_COMMAND = ["/bin/bash", "--noprofile", "--norc"]
+
+# Receives ("stdout" | "stderr", text) chunks while a command runs
+OutputCallback = Callable[[str, str], None]
+
+# Exit code reported for timed-out commands (same as coreutils `timeout`)
+TIMEOUT_EXIT_CODE = 124
+
+# Kills a process group, or the whole process tree when the pid is not a
+# group leader. Formatted with the pid of the shell or command to kill.
+KILL_TREE_SCRIPT = (
+    'kill_tree() {{ for child in $(cat /proc/$1/task/*/children 2>/dev/null); '
+    'do kill_tree "$child"; done; kill -KILL "$1" 2>/dev/null; }}; '
+    'kill -KILL -- -{pid} 2>/dev/null || kill_tree {pid}'
+)
+
+
+def timeout_message(timeout: float) -> str:
+    """Line appended to stderr when a command is killed for running too long."""
+    return f"\nCommand timed out after {timeout:g}s and was killed\n"
+
+
+def _partial_marker_length(buffer: str, marker: str) -> int:
+    """Length of the longest buffer suffix that is a proper prefix of marker."""
+    position = buffer.find(marker[0], max(0, len(buffer) - len(marker) + 1))
+    while position != -1:
+        if marker.startswith(buffer[position:]):
+            return len(buffer) - position
+        position = buffer.find(marker[0], position + 1)
+    return 0
+
+
+class _PendingCommand:
+    """Output state of the command currently running in a session."""
+
+    def __init__(self, marker: str, on_output: Optional[OutputCallback]):
+        self.marker = marker
+        self.on_output = on_output
+        self.parts: Dict[str, list] = {"stdout": [], "stderr": []}
+        self.pending: Dict[str, str] = {"stdout": "", "stderr": ""}
+        self.done: Dict[str, bool] = {"stdout": False, "stderr": False}
+        self.exit_code: Optional[int] = None
+        self.finished = asyncio.Event()
+
+    def emit(self, stream: str, text: str) -> None:
+        if not text:
+            return
+        if self.on_output:
+            # Streamed output is the callback's to keep; long-running
+            # commands would otherwise pile it all up here as well
+            self.on_output(stream, text)
+        else:
+            self.parts[stream].append(text)
+
+    def result(self) -> Tuple[str, str, int]:
+        exit_code = self.exit_code if self.exit_code is not None else -1
+        return "".join(self.parts["stdout"]), "".join(self.parts["stderr"]), exit_code
+
+
+class ShellSession(ABC):
+    """A long-lived bash process that runs one framed command at a time."""
+
+    def __init__(self):
+        self.alive = False
+        self.pid: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self._current: Optional[_PendingCommand] = None
+        self._decoders = {
+            "stdout": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+            "stderr": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+        }
+
+    @abstractmethod
+    async def start(self) -> None:
+        """Spawn the shell process."""
+        pass
+
+    @abstractmethod
+    async def _send(self, data: bytes) -> None:
+        """Write raw bytes to the shell's stdin."""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Terminate the shell process."""
+        pass
+
+    @abstractmethod
+    async def _run_detached(self, command: str) -> None:
+        """Run a one-off command next to the session (used to kill it)."""
+        pass
+
+    async def _prepare(self) -> None:
+        """
+        Keep copies of the shell's stdout and stderr for the end markers, and
+        remember its pid so a timed-out command can be killed.
+        """
+        await self._send(b"exec 3>&1 4>&2\n")
+        stdout, _, _ = await self.run('printf "%s" "$$"')
+        self.pid = int(stdout) if stdout.strip().isdigit() else None
+
+    async def _kill(self) -> None:
+        """Kill the shell and everything it started, then close the session."""
+        self.alive = False
+        if self.pid:
+            try:
+                await self._run_detached(KILL_TREE_SCRIPT.format(pid=self.pid))
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to kill timed-out shell: {e}")
+        await self.close()
+
+    async def run(
+        self,
+        command: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None
+    ) -> Tuple[str, str, int]:
+        """
+        Run a command in the session. Returns (stdout, stderr, exit_code);
+        with ``on_output`` the output only goes to the callback and the
+        returned stdout and stderr are empty. After ``timeout`` seconds the
+        shell's process group is killed and the session closed (cwd and
+        variables are lost); the exit code is 124.
+        """
+        async with self._lock:
+            if not self.alive:
+                raise RuntimeError("Shell session is not running")
+
+            token = uuid.uuid4().hex
+            marker = f"__AGENTDOCKS_END_{token}__"
+            self._current = _PendingCommand(marker, on_output)
+
+            # base64 keeps arbitrary quoting/newlines in the command intact;
+            # stdin is detached so commands cannot eat the protocol stream, and
+            # the protocol fds are closed for them so they cannot write to it
+            encoded = base64.b64encode(command.encode("utf-8")).decode("ascii")
+            frame = (
+                f"{{ eval \"$(printf '%s' '{encoded}' | base64 -d)\"; }} </dev/null 3>&- 4>&-; "
+                f"printf '{marker}:%d\\n' \"$?\" >&3; printf '{marker}\\n' >&4\n"
+            )
+
+            try:
+                await self._send(frame.encode("utf-8"))
+                await asyncio.wait_for(self._current.finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                # Commands run inside the shell itself, so the shell goes too
+                await self._kill()
+                current = self._current
+                for stream in ("stdout", "stderr"):
+                    if not current.done[stream]:
+                        current.emit(stream, current.pending[stream])
+                        current.pending[stream] = ""
+                        current.done[stream] = True
+                current.emit("stderr", timeout_message(timeout))
+                current.exit_code = TIMEOUT_EXIT_CODE
+            except asyncio.CancelledError:
+                # The command may still be running; this session can no longer be trusted
+                self.alive = False
+                asyncio.ensure_future(self.close())
+                raise
+            finally:
+                pending, self._current = self._current, None
+
+            return pending.result()
+
+    def _feed(self, stream: str, data: bytes) -> None:
+        """Handle an output chunk from the shell (called on the event loop)."""
+        text = self._decoders[stream].decode(data)
+        current = self._current
+        if current is None or current.done[stream]:
+            # Output from background jobs between commands
+            return
+
+        buffer = current.pending[stream] + text
+        index = buffer.find(current.marker)
+
+        if index == -1:
+            # Hold back only a possible partial marker at the end of the buffer
+            keep = _partial_marker_length(buffer, current.marker)
+            current.emit(stream, buffer[:len(buffer) - keep])
+            current.pending[stream] = buffer[len(buffer) - keep:]
+            return
+
+        if stream == "stdout":
+            line_end = buffer.find("\n", index)
+            if line_end == -1:
+                # Exit code not fully received yet
+                current.pending[stream] = buffer
+                return
+            try:
+                current.exit_code = int(buffer[index + len(current.marker) + 1:line_end])
+            except ValueError:
+                current.exit_code = -1
+
+        current.emit(stream, buffer[:index])
+        current.pending[stream] = ""
+        current.done[stream] = True
+        if current.done["stdout"] and current.done["stderr"]:
+            current.finished.set()
+
+    def _on_exit(self, exit_code: Optional[int]) -> None:
+        """The shell exited (e.g. the command ran `exit`); finish what is running."""
+        self.alive = False
+        current = self._current
+        if current is None:
+            return
+        for stream in ("stdout", "stderr"):
+            if not current.done[stream]:
+                current.emit(stream, current.pending[stream])
+                current.pending[stream] = ""
+        if current.exit_code is None:
+            current.exit_code = exit_code if exit_code is not None else -1
+        current.finished.set()
+
+
+class DockerShellSession(ShellSession):
+    """Shell session over a docker exec with an attached stdin socket."""
+
+    def __init__(self, container):
+        super().__init__()
+        self.container = container
+        self._exec_id = None
+        self._socket = None
+        self._loop = None
+
+    async def start(self) -> None:
+        api = self.container.client.api
+        self._loop = asyncio.get_event_loop()
+
+        def spawn():
+            exec_id = api.exec_create(
+                self.container.id,
+                SHELL_COMMAND,
+                stdin=True,
+                stdout=True,
+                stderr=True,
+                tty=False,
+                workdir="/workspace"
+            )["Id"]
+            return exec_id, api.exec_start(exec_id, socket=True)
+
+        self._exec_id, self._socket = await run_docker(spawn)
+        self.alive = True
+
+        # Reads block for the whole session lifetime, so they get their own
+        # thread instead of occupying a pool worker
+        threading.Thread(target=self._read_frames, daemon=True).start()
+        await self._prepare()
+
+    def _raw_socket(self):
+        return getattr(self._socket, "_sock", self._socket)
+
+    def _read_frames(self) -> None:
+        """Demultiplex the exec stream and hand chunks to the event loop."""
+        from docker.utils.socket import frames_iter, STDOUT, STDERR
+
+        try:
+            for stream_id, data in frames_iter(self._socket, tty=False):
+                if stream_id == STDOUT:
+                    self._loop.call_soon_threadsafe(self._feed, "stdout", data)
+                elif stream_id == STDERR:
+                    self._loop.call_soon_threadsafe(self._feed, "stderr", data)
+        except Exception as e:
+            logger.debug(f"Shell session stream closed: {e}")
+
+        exit_code = None
+        try:
+            exit_code = self.container.client.api.exec_inspect(self._exec_id).get("ExitCode")
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._on_exit, exit_code)
+
+    async def _send(self, data: bytes) -> None:
+        await run_docker(self._raw_socket().sendall, data)
+
+    async def _run_detached(self, command: str) -> None:
+        await run_docker(lambda: self.container.exec_run(["/bin/bash", "-c", command]))
+
+    async def close(self) -> None:
+        self.alive = False
+        if self._socket is not None:
+            try:
+                self._raw_socket().close()
+            except Exception:
+                pass
+            self._socket = None
+
+
+class E2BShellSession(ShellSession):
+    """Shell session over an E2B background command with stdin."""
+
+    def __init__(self, sandbox):
+        super().__init__()
+        self.sandbox = sandbox
+        self._handle = None
+        self._wait_task = None
+
+    async def start(self) -> None:
+        self._handle = await self.sandbox.commands.run(
+            " ".join(SHELL_COMMAND),
+            background=True,
+            stdin=True,
+            cwd="/workspace",
+            timeout=0,
+            on_stdout=lambda text: self._feed("stdout", text.encode("utf-8")),
+            on_stderr=lambda text: self._feed("stderr", text.encode("utf-8")),
+        )
+        self.alive = True
+        self._wait_task = asyncio.create_task(self._wait())
+        await self._prepare()
+
+    async def _wait(self) -> None:
+        exit_code = None
+        try:
+            result = await self._handle.wait()
+            exit_code = result.exit_code
+        except Exception as e:
+            exit_code = getattr(e, "exit_code", None)
+        self._on_exit(exit_code)
+
+    async def _send(self, data: bytes) -> None:
+        await self.sandbox.commands.send_stdin(self._handle.pid, data.decode("utf-8"))
+
+    async def _run_detached(self, command: str) -> None:
+        from e2b import CommandExitException
+
+        try:
+            await self.sandbox.commands.run(command, timeout=30)
+        except CommandExitException:
+            pass
+
+    async def close(self) -> None:
+        self.alive = False
+        if self._handle is not None:
+            try:
+                await self._handle.kill()
+            except Exception:
+                pass
+            self._handle = None
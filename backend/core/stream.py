@@ -25,6 +25,11 @@ async def stream_tool_result(result: Any, is_error: bool = False) -> str:
     return format_sse("tool_result", {"result": result, "is_error": is_error})
 
 
+async def stream_tool_output(stream: str, content: str) -> str:
+    """Stream incremental output (stdout/stderr) of a running tool."""
+    return format_sse("tool_output", {"stream": stream, "content": content})
+
+
 async def stream_text(content: str) -> str:
     """Stream AI text response."""
     return format_sse("text", {"content": content})
@@ -40,6 +45,11 @@ async def stream_error(message: str) -> str:
     return format_sse("error", {"message": message})
 
 
+async def stream_resource_usage(usage: Dict[str, Any]) -> str:
+    """Stream a sandbox's CPU/memory/pids usage sample."""
+    return format_sse("resource_usage", usage)
+
+
 async def stream_done(message: str = "Task complete. Sandbox destroyed.") -> str:
     """Stream completion event."""
     return format_sse("done", {"message": message})
@@ -53,3 +63,8 @@ async def stream_browser_action(action: str, details: Dict[str, Any]) -> str:
 async def stream_screenshot(screenshot_data: str, path: str) -> str:
     """Stream a browser screenshot."""
     return format_sse("screenshot", {"data": screenshot_data, "path": path})
+
+
+async def stream_sync_progress(progress: Dict[str, Any]) -> str:
+    """Stream project sync progress (per-file archive and upload events)."""
+    return format_sse("sync_progress", progress)
@@ -18,7 +18,10 @@ class AgentRunRequest(BaseModel):
     query: str
     model: Optional[str] = None
     max_turns: int = 10
-    timeout: int = 300  # seconds
+    timeout: int = 300  # wall-clock budget for the whole run, in seconds
+    tool_timeouts: Optional[Dict[str, int]] = None  # per-command limits by tool name
+    reuse_sandbox: bool = False  # keep the sandbox warm for the next run on this project
+    reset_sandbox: bool = True  # on reuse, start from the local project instead of the last run's edits
 
 class ToolUse(BaseModel):
     id: str
@@ -70,7 +73,8 @@ class ProjectTreeNode(BaseModel):
 class FileChange(BaseModel):
     """Tracked file change"""
     path: str  # Relative to project root
-    type: Literal["created", "modified", "deleted"]
+    type: Literal["created", "modified", "deleted", "renamed"]
+    old_path: Optional[str] = None  # Previous path of a renamed file
     original_content: Optional[str] = None
     new_content: Optional[str] = None
     diff: Optional[str] = None
@@ -82,12 +86,17 @@ class ProjectChanges(BaseModel):
     created_count: int
     modified_count: int
     deleted_count: int
+    renamed_count: int = 0
 
 class ApplyChangesRequest(BaseModel):
     """Request to apply changes to local filesystem"""
     approved_changes: List[str]  # List of file paths to apply
     create_backup: bool = True
 
+class ProjectSyncRequest(BaseModel):
+    """Request to push local project edits into the active sandbox"""
+    reset: bool = False  # True discards the agent's unapplied edits as well
+
 # Multi-Agent schemas
 class MultiAgentRunRequest(BaseModel):
     """Request to run multi-agent workflow"""
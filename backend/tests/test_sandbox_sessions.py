@@ -0,0 +1,45 @@
+import asyncio
+
+from core.sandbox_sessions import SandboxSessionManager
+
+
+class FakeSandbox:
+    def __init__(self, has_project_mount: bool):
+        self.has_project_mount = has_project_mount
+
+
+def test_parked_overlay_sandbox_is_reused():
+    async def scenario():
+        sessions = SandboxSessionManager()
+        sandbox = FakeSandbox(has_project_mount=True)
+        project_manager = object()
+
+        assert sessions.release("docker", "/project", sandbox, project_manager, reset=False)
+        session = sessions.acquire("docker", "/project")
+        assert session is not None
+        assert session.sandbox is sandbox
+        assert session.project_manager is project_manager
+        assert sessions.stats()["reused"] == 1
+
+        # Released again after the second run, still the same session
+        assert sessions.release("docker", "/project", sandbox, project_manager, reset=False)
+        assert sessions.acquire("docker", "/project") is session
+        sessions._sweeper.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_overlay_sandbox_is_not_parked_when_reset_is_needed():
+    async def scenario():
+        sessions = SandboxSessionManager()
+        overlay = FakeSandbox(has_project_mount=True)
+        copied = FakeSandbox(has_project_mount=False)
+
+        assert not sessions.release("docker", "/overlay", overlay, object(), reset=True)
+        assert sessions.acquire("docker", "/overlay") is None
+
+        assert sessions.release("docker", "/copied", copied, object(), reset=True)
+        assert sessions.acquire("docker", "/copied").sandbox is copied
+        sessions._sweeper.cancel()
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+import asyncio
+import os
+
+from core.shell_session import SHELL_COMMAND, ShellSession
+
+
+class LocalShellSession(ShellSession):
+    """Shell session over a local bash subprocess."""
+
+    def __init__(self, cwd: str):
+        super().__init__()
+        self.cwd = cwd
+        self._process = None
+        self._readers = []
+
+    async def start(self) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            *SHELL_COMMAND,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            start_new_session=True,
+        )
+        self.alive = True
+        self._readers = [
+            asyncio.create_task(self._read("stdout", self._process.stdout)),
+            asyncio.create_task(self._read("stderr", self._process.stderr)),
+        ]
+        await self._prepare()
+
+    async def _read(self, stream: str, reader) -> None:
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                break
+            self._feed(stream, data)
+
+    async def _send(self, data: bytes) -> None:
+        self._process.stdin.write(data)
+        await self._process.stdin.drain()
+
+    async def _run_detached(self, command: str) -> None:
+        process = await asyncio.create_subprocess_exec("/bin/bash", "-c", command)
+        await process.wait()
+
+    async def close(self) -> None:
+        self.alive = False
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+        for reader in self._readers:
+            reader.cancel()
+
+
+def run_session(tmp_path, scenario):
+    async def main():
+        session = LocalShellSession(str(tmp_path))
+        await session.start()
+        try:
+            return await scenario(session)
+        finally:
+            await session.close()
+
+    return asyncio.run(main())
+
+
+def test_run_keeps_state_between_commands(tmp_path):
+    async def scenario(session):
+        await session.run("cd /tmp && export GREETING=hello")
+        return await session.run('echo "$PWD $GREETING"; echo oops >&2; (exit 3)', timeout=5)
+
+    assert run_session(tmp_path, scenario) == ("/tmp hello\n", "oops\n", 3)
+
+
+def test_run_survives_exec_redirecting_stderr(tmp_path):
+    async def scenario(session):
+        first = await session.run("exec 2>/dev/null", timeout=5)
+        second = await session.run("echo still here; echo hidden >&2", timeout=5)
+        return first, second
+
+    first, second = run_session(tmp_path, scenario)
+    assert first == ("", "", 0)
+    assert second == ("still here\n", "", 0)
+
+
+def test_run_survives_exec_redirecting_stdout(tmp_path):
+    async def scenario(session):
+        await session.run("exec >build.log", timeout=5)
+        return await session.run("echo logged; echo visible >&2", timeout=5)
+
+    assert run_session(tmp_path, scenario) == ("", "visible\n", 0)
+    with open(os.path.join(tmp_path, "build.log")) as f:
+        assert f.read() == "logged\n"
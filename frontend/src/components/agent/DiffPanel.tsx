@@ -6,7 +6,8 @@ import { clsx } from 'clsx';
 
 interface FileChange {
   path: string;
-  type: 'created' | 'modified' | 'deleted';
+  type: 'created' | 'modified' | 'deleted' | 'renamed';
+  old_path?: string;
   original_content?: string;
   new_content?: string;
   diff?: string;
@@ -154,10 +155,12 @@ const ChangeItem = ({ change, selected, onToggle }: ChangeItemProps) => {
         />
         <Icon className={clsx('w-5 h-5 flex-shrink-0 mt-0.5', iconColor)} />
         <div className="flex-1 min-w-0">
-          <div className="font-mono text-sm truncate font-semibold">{change.path}</div>
+          <div className="font-mono text-sm truncate font-semibold">
+            {change.type === 'renamed' && change.old_path ? `${change.old_path} → ${change.path}` : change.path}
+          </div>
           <div className="text-xs text-muted-foreground mt-1 capitalize flex items-center gap-2">
             <span>{change.type}</span>
-            {change.type === 'modified' && change.diff && (
+            {(change.type === 'modified' || change.type === 'renamed') && change.diff && (
               <span className="text-muted-foreground">
                 • {change.diff.split('\n').filter(l => l.startsWith('+')).length} additions,{' '}
                 {change.diff.split('\n').filter(l => l.startsWith('-')).length} deletions
@@ -187,7 +190,7 @@ const ChangeItem = ({ change, selected, onToggle }: ChangeItemProps) => {
 
       {expanded && (
         <div className="border-t border-border p-4 bg-background/50">
-          {change.type === 'modified' && change.diff ? (
+          {(change.type === 'modified' || change.type === 'renamed') && change.diff ? (
             <DiffViewer diff={change.diff} />
           ) : change.type === 'created' && change.new_content ? (
             <div>